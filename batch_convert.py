@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Vectorized batch conversion of raw SFAF field columns with pandas.
+
+Each function takes a column of raw strings (a pandas Series or any sequence)
+and returns a DataFrame with float columns and a boolean validity mask,
+following the same rules as the scalar convert_* functions in main.py:
+
+- coordinates that fail to parse become 0/0
+- emission designators that fail to parse get the 10 kHz default bandwidth
+- frequencies and powers that fail to parse become NaN; a power must be a
+  plain finite decimal after its W/K unit (main.POWER_NUMBER_PATTERN), so
+  float() spellings such as "Wnan" or "W1_0" are invalid in both paths
+
+Example:
+    records = pandas.DataFrame(main.col_import('export.txt'))
+    converted = convert_columns(records)
+"""
+import numpy as np
+import pandas as pd
+
+import main
+
+
+# Same patterns as main.convert_frequency / main.convert_emission_designator / main.convert_power,
+# anchored because Series.str.extract searches rather than matches; line 303
+# coordinates that use only digits are decoded without per-row Python calls
+LINE_110_PATTERN = '^' + main.LINE_110_PATTERN.pattern
+LINE_114_PATTERN = '^' + main.LINE_114_PATTERN.pattern
+LINE_303_PATTERN = "[0-9]{6}[NS][0-9]{7}[EW]"
+POWER_NUMBER_PATTERN = main.POWER_NUMBER_PATTERN.pattern
+
+DEFAULT_BANDWIDTH = main.DEFAULT_BANDWIDTH
+
+_FREQUENCY_MULTIPLIERS = {'K': 1000, 'M': 1e6, 'G': 1e9}
+_BANDWIDTH_MULTIPLIERS = {'H': 1, 'K': 1000, 'M': 1e6, 'G': 1e9}
+_POWER_MULTIPLIERS = {'W': 1, 'K': 1000}
+
+
+def _convert_unique(values, convert) -> pd.DataFrame:
+    """
+    Apply a column converter to the distinct values of a column only.
+
+    SFAF exports repeat the same frequencies, designators and sites many times,
+    so the column is factorized, the (much shorter) array of unique strings is
+    converted, and the results are gathered back to every row.
+
+    Args:
+        values: pandas Series or sequence of raw strings; other values count as missing
+        convert: Function converting an object Series of strings or NaN into a DataFrame
+
+    Returns:
+        DataFrame with one row per input value, indexed like values
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    codes, uniques = pd.factorize(series)
+    uniques = pd.Series(uniques, dtype=object)
+    uniques = uniques.where(uniques.map(lambda v: isinstance(v, str)), np.nan)
+    # Missing values (code -1) are looked up in an extra trailing row
+    table = convert(pd.concat([uniques, pd.Series([np.nan], dtype=object)], ignore_index=True))
+    result = table.take(np.where(codes < 0, len(uniques), codes))
+    result.index = series.index
+    return result
+
+
+def _digits_to_float(values: pd.Series) -> pd.Series:
+    """Parse strings matched by a [0-9]*[.]?[0-9]* group; strings without digits become NaN."""
+    has_digit = values.str.contains('[0-9]', regex=True).fillna(False).astype(bool)
+    return values.where(has_digit, 'nan').astype(float)
+
+
+def _convert_dms_to_dd_unique(series: pd.Series) -> pd.DataFrame:
+    """Column converter behind convert_dms_to_dd_batch(), applied to unique values."""
+    latitude = np.zeros(len(series))
+    longitude = np.zeros(len(series))
+    valid = np.zeros(len(series), dtype=bool)
+
+    strict = series.str.fullmatch(LINE_303_PATTERN).fillna(False).to_numpy(dtype=bool)
+    if strict.any():
+        chars = np.array(series[strict].tolist(), dtype='S15').view(np.uint8).reshape(-1, 15)
+        digits = chars.astype(np.int64) - ord('0')
+        lat = (digits[:, 0] * 10 + digits[:, 1]) + ((digits[:, 2] * 10 + digits[:, 3]) / 60) \
+            + ((digits[:, 4] * 10 + digits[:, 5]) / 3600)
+        lon = (digits[:, 7] * 100 + digits[:, 8] * 10 + digits[:, 9]) \
+            + ((digits[:, 10] * 10 + digits[:, 11]) / 60) + ((digits[:, 12] * 10 + digits[:, 13]) / 3600)
+        latitude[strict] = np.where(chars[:, 6] == ord('S'), -lat, lat)
+        longitude[strict] = np.where(chars[:, 14] == ord('W'), -lon, lon)
+        valid[strict] = True
+
+    # int() also accepts signs and padding in the DMS components
+    loose = ~strict & (series.str.len() == 15).to_numpy(dtype=bool)
+    for i in np.flatnonzero(loose):
+        try:
+            latitude[i], longitude[i] = main.convert_dms_to_dd(series.iat[i])
+            valid[i] = True
+        except ValueError:
+            pass
+
+    return pd.DataFrame({
+        'latitude': latitude,
+        'longitude': longitude,
+        'valid': valid,
+    }, index=series.index)
+
+
+def convert_dms_to_dd_batch(coordinates) -> pd.DataFrame:
+    """
+    Convert a column of SXXI DMS coordinates (line 303) to decimal degrees.
+
+    Well-formed coordinates are decoded with NumPy arithmetic on their ASCII
+    digits; the rare remaining 15 character strings are checked one by one
+    with main.convert_dms_to_dd so the accepted inputs match exactly.
+
+    Args:
+        coordinates: Coordinate strings in DMS format (e.g., "395900N0222630E")
+
+    Returns:
+        DataFrame with float columns 'latitude' and 'longitude' and a boolean
+        'valid' column; invalid or missing coordinates are set to 0/0
+    """
+    return _convert_unique(coordinates, _convert_dms_to_dd_unique)
+
+
+def _convert_frequency_unique(series: pd.Series) -> pd.DataFrame:
+    """Column converter behind convert_frequency_batch(), applied to unique values."""
+    parts = series.str.extract(LINE_110_PATTERN)
+    matched = parts[0].notna()
+    multiplier = parts[0].map(_FREQUENCY_MULTIPLIERS).astype(float)
+    is_band = parts[2] == '-'
+
+    center = (parts[1].fillna('nan').astype(float) * multiplier).where(~is_band, 0.0)
+    has_reference = parts[6].fillna('') != ''
+    reference_value = _digits_to_float(parts[6].fillna(''))
+    reference = (reference_value * multiplier).where(has_reference)
+
+    # Mirrors the ValueErrors raised by convert_frequency
+    valid = matched & (is_band | multiplier.notna())
+    valid &= ~(has_reference & multiplier.notna() & reference_value.isna())
+
+    return pd.DataFrame({
+        'center_frequency': center.where(valid),
+        'reference_frequency': reference.where(valid),
+        'valid': valid,
+    }, index=series.index)
+
+
+def convert_frequency_batch(frequencies) -> pd.DataFrame:
+    """
+    Convert a column of SXXI line 110 frequencies into Hz.
+
+    Args:
+        frequencies: Frequency strings in SXXI format (e.g., "M138.025")
+
+    Returns:
+        DataFrame with float columns 'center_frequency' and 'reference_frequency'
+        and a boolean 'valid' column. Band entries ("M30-M88") have a center
+        frequency of 0, as in convert_frequency; missing reference frequencies
+        and rows convert_frequency would reject are NaN
+    """
+    return _convert_unique(frequencies, _convert_frequency_unique)
+
+
+def _convert_emission_designator_unique(series: pd.Series) -> pd.DataFrame:
+    """Column converter behind convert_emission_designator_batch(), applied to unique values."""
+    parts = series.str.extract(LINE_114_PATTERN)
+    valid = parts[0].notna()
+    multiplier = parts[1].map(_BANDWIDTH_MULTIPLIERS).astype(float)
+    fraction = parts[2].fillna('').replace('', '0').astype(float)
+    bandwidth = (parts[0].fillna('nan').astype(float) + fraction / 100) * multiplier
+
+    return pd.DataFrame({
+        'bandwidth': bandwidth.where(valid, DEFAULT_BANDWIDTH),
+        'valid': valid,
+    }, index=series.index)
+
+
+def convert_emission_designator_batch(designators) -> pd.DataFrame:
+    """
+    Extract bandwidths from a column of line 114 emission designators.
+
+    Args:
+        designators: Emission designator strings (e.g., "16K0F3E")
+
+    Returns:
+        DataFrame with a float 'bandwidth' column in Hz and a boolean 'valid'
+        column; rows that do not parse get the 10 kHz default bandwidth
+    """
+    return _convert_unique(designators, _convert_emission_designator_unique)
+
+
+def _convert_power_unique(series: pd.Series) -> pd.DataFrame:
+    """Column converter behind convert_power_batch(), applied to unique values."""
+    multiplier = series.str[:1].map(_POWER_MULTIPLIERS).astype(float)
+    numbers = series.str[1:].str.strip()
+    # astype(float) rounds like float(); pd.to_numeric can be off by an ulp for large exponents
+    numbers = numbers.where(numbers.str.fullmatch(POWER_NUMBER_PATTERN).fillna(False).astype(bool))
+    power = numbers.astype(float) * multiplier
+    valid = power.notna() & np.isfinite(power)
+    power = power.where(valid)
+
+    return pd.DataFrame({
+        'transmitter_power': power,
+        'valid': valid,
+    }, index=series.index)
+
+
+def convert_power_batch(powers) -> pd.DataFrame:
+    """
+    Convert a column of SXXI transmitter powers (line 115) into Watts.
+
+    Args:
+        powers: Power strings (e.g., "W100" or "K1.5")
+
+    Returns:
+        DataFrame with a float 'transmitter_power' column in Watts (NaN where
+        invalid) and a boolean 'valid' column
+    """
+    return _convert_unique(powers, _convert_power_unique)
+
+
+def convert_columns(records: pd.DataFrame) -> pd.DataFrame:
+    """
+    Batch-convert the raw SFAF columns of a DataFrame built from col_import().
+
+    Args:
+        records: DataFrame with any of the columns 'TX ANTENNA COORDINATES',
+            'FREQUENCY', 'EMISSION DESIGNATOR[01]' and 'TRANSMITTER POWER[01]'
+            (e.g., pandas.DataFrame(col_import(path)))
+
+    Returns:
+        DataFrame aligned with records holding the converted values and a
+        '<name>_valid' mask for every converted column group
+    """
+    converters = (
+        ('TX ANTENNA COORDINATES', convert_dms_to_dd_batch, 'coordinates_valid'),
+        ('FREQUENCY', convert_frequency_batch, 'frequency_valid'),
+        ('EMISSION DESIGNATOR[01]', convert_emission_designator_batch, 'bandwidth_valid'),
+        ('TRANSMITTER POWER[01]', convert_power_batch, 'transmitter_power_valid'),
+    )
+    frames = []
+    for column, converter, mask_name in converters:
+        raw = records[column] if column in records else pd.Series(np.nan, index=records.index, dtype=object)
+        frames.append(converter(raw).rename(columns={'valid': mask_name}))
+    return pd.concat(frames, axis=1)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the SFAF line dispatcher in main.col_import.
+
+Writes a synthetic multi-million-line SFAF 1-column file with synthetic_sfaf.py
+and reports lines/sec for the previous startswith() chain parser and the
+table-driven col_import.
+
+Usage:
+    python benchmarks/bench_col_import.py --records 100000
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import main as sfaf  # noqa: E402
+from synthetic_sfaf import write_sfaf_file  # noqa: E402
+
+
+def legacy_col_import(col_file: str) -> list:
+    """The startswith() chain that col_import used before the dispatch table."""
+    list_of_dict = []
+    with open(col_file, 'r', encoding='utf-8') as sfaf1col:
+        parse = False
+        data_dict = {}
+        for line in sfaf1col:
+            if line.startswith('005'):
+                if parse and data_dict:
+                    list_of_dict.append(data_dict)
+                data_dict = {}
+                exclude_n = 1
+                station_class_n = 1
+                transmitter_power_n = 1
+                emission_designator_n = 1
+                erp_n = 1
+                user_net_code_n = 1
+                operating_unit_n = 1
+                parse = True
+                continue
+            elif line.startswith('924'):
+                parse = False
+                list_of_dict.append(data_dict)
+            elif parse:
+                try:
+                    if line.startswith('010'):
+                        data_dict['TYPE OF ACTION'] = line.split('.     ')[1].strip()
+                    if line.startswith('102'):
+                        data_dict['AGENCY SERIAL NUMBER'] = line.split('.     ')[1].strip()
+                    if line.startswith('105'):
+                        data_dict['LIST SERIAL NUMBER'] = line.split('.     ')[1].strip()
+                    if line.startswith('110'):
+                        data_dict['FREQUENCY'] = line.split('.     ')[1].strip()
+                    if line.startswith('111'):
+                        data_dict[f'EXCLUDED FREQUENCY BAND[{"{0:0=2d}".format(station_class_n)}]'] = line.split('.     ')[
+                            1].strip()
+                        exclude_n += 1
+                    if line.startswith('113'):
+                        data_dict[f'STATION CLASS[{"{0:0=2d}".format(station_class_n)}]'] = line.split('.     ')[1].strip()
+                        station_class_n += 1
+                    if line.startswith('114'):
+                        data_dict[f'EMISSION DESIGNATOR[{"{0:0=2d}".format(emission_designator_n)}]'] = \
+                            line.split('.     ')[1].strip()
+                        emission_designator_n += 1
+                    if line.startswith('115'):
+                        data_dict[f'TRANSMITTER POWER[{"{0:0=2d}".format(transmitter_power_n)}]'] = line.split('.     ')[
+                            1].strip()
+                        transmitter_power_n += 1
+                    if line.startswith('117'):
+                        data_dict[f'EFFECTIVE RADIATED POWER[{"{0:0=2d}".format(erp_n)}]'] = line.split('.     ')[1].strip()
+                        erp_n += 1
+                    if line.startswith('140'):
+                        data_dict['REQUIRED DATE (YYYYMMDD)'] = line.split('.     ')[1].strip()
+                    if line.startswith('141'):
+                        data_dict['EXPIRATION DATE (YYYYMMDD)'] = line.split('.     ')[1].strip()
+                    if line.startswith('142'):
+                        data_dict['REVIEW DATE (YYYYMMDD)'] = line.split('.     ')[1].strip()
+                    if line.startswith('200'):
+                        data_dict['AGENCY'] = line.split('.     ')[1].strip()
+                    if line.startswith('203'):
+                        data_dict['BUREAU'] = line.split('.     ')[1].strip()
+                    if line.startswith('204'):
+                        data_dict['COMMAND'] = line.split('.     ')[1].strip()
+                    if line.startswith('205'):
+                        data_dict['SUBCOMMAND'] = line.split('.     ')[1].strip()
+                    if line.startswith('206'):
+                        data_dict['INSTALLATION FREQUENCY MANAGER'] = line.split('.     ')[1].strip()
+                    if line.startswith('207'):
+                        data_dict[f'OPERATING UNIT[{"{0:0=2d}".format(operating_unit_n)}]'] = line.split('.     ')[
+                            1].strip()
+                        operating_unit_n += 1
+                    if line.startswith('208'):
+                        data_dict[f'USER NET/CODE[{"{0:0=2d}".format(user_net_code_n)}]'] = line.split('.     ')[1].strip()
+                        user_net_code_n += 1
+                    if line.startswith('303'):
+                        data_dict['TX ANTENNA COORDINATES'] = line.split('.     ')[1].strip()
+                    if line.startswith('306'):
+                        data_dict['TX AUTHORIZED RADIUS'] = line.split('.     ')[1].strip()
+                    if line.startswith('340'):
+                        data_dict['EQUIPMENT NOMENCLATURE'] = line.split('.     ')[1].strip()
+                    if line.startswith('346'):
+                        data_dict['PULSE DURATION'] = line.split('.     ')[1].strip()
+                    if line.startswith('347'):
+                        data_dict['PULSE REPETITION RATE'] = line.split('.     ')[1].strip()
+                    if line.startswith('357'):
+                        data_dict['ANTENNA GAIN'] = line.split('.     ')[1].strip()
+                    if line.startswith('359'):
+                        data_dict['TX ANTENNA FEEDPOINT HEIGHT'] = line.split('.     ')[1].strip()
+                    if line.startswith('511'):
+                        data_dict['MAJOR FUNCTION IDENTIFIER'] = line.split('.     ')[1].strip()
+                    if line.startswith('512'):
+                        data_dict['INTERMEDIATE FUNCTION IDENTIFIER'] = line.split('.     ')[1].strip()
+                except IndexError:
+                    continue
+        if parse and data_dict:
+            list_of_dict.append(data_dict)
+    return list_of_dict
+
+
+def best_of(func, path: str, repeat: int) -> float:
+    """Return the fastest of `repeat` runs of func(path) in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark SFAF line dispatch in col_import')
+    parser.add_argument('--records', type=int, default=100000,
+                        help='Number of synthetic records to generate (default: 100000, ~2.9M lines)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of timed runs per parser; the best is reported (default: 3)')
+    parser.add_argument('--file', default=None,
+                        help='Benchmark an existing SFAF file instead of a synthetic one')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    tmp_path = None
+    if args.file:
+        path = args.file
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = sum(1 for _ in f)
+    else:
+        fd, tmp_path = tempfile.mkstemp(suffix='.txt', prefix='sfaf_bench_')
+        os.close(fd)
+        path = tmp_path
+        lines = write_sfaf_file(path, args.records, malformed=0)['lines']
+
+    try:
+        legacy = best_of(legacy_col_import, path, args.repeat)
+        table = best_of(sfaf.col_import, path, args.repeat)
+    finally:
+        if tmp_path:
+            os.remove(tmp_path)
+
+    print(f"{lines} lines")
+    print(f"startswith chain: {legacy:8.3f} s  {lines / legacy:12,.0f} lines/sec")
+    print(f"dispatch table:   {table:8.3f} s  {lines / table:12,.0f} lines/sec")
+    print(f"speedup:          {legacy / table:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark of a shared SfafConverter called from several threads.
+
+Writes a synthetic SFAF export with synthetic_sfaf.py, then for each thread
+count has every thread call SfafConverter.convert_bytes() on it in a tight
+loop, all threads sharing one converter. Reports calls/sec and records/sec,
+and checks every call's output against a single-threaded reference, so the
+benchmark fails if sharing the converter changes any result.
+
+Conversion is CPU-bound Python, so threads share one interpreter lock: the
+numbers show the cost of sharing the converter (which should be none), not
+parallel speed-up. Use worker processes (main.py --workers) for that.
+
+Usage:
+    python benchmarks/bench_converter_threads.py --records 200 --threads 1 2 4 8 --seconds 5
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sfaf_converter import SfafConverter  # noqa: E402
+from synthetic_sfaf import write_sfaf_file  # noqa: E402
+
+
+def run_threads(converter: SfafConverter, data: bytes, threads: int, seconds: float, reference) -> dict:
+    """Call convert_bytes(data) from threads threads until seconds elapsed; returns calls and mismatches."""
+    calls = [0] * threads
+    mismatches = [0] * threads
+    start_barrier = threading.Barrier(threads + 1)
+    deadline = []
+
+    def worker(i):
+        start_barrier.wait()
+        while time.perf_counter() < deadline[0]:
+            result = converter.convert_bytes(data)
+            if (result.csv, result.json, result.counts) != reference:
+                mismatches[i] += 1
+            calls[i] += 1
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    start = time.perf_counter()
+    deadline.append(start + seconds)
+    start_barrier.wait()
+    for thread in pool:
+        thread.join()
+    return {'calls': sum(calls), 'mismatches': sum(mismatches), 'seconds': time.perf_counter() - start,
+            'per_thread': calls}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark a shared SfafConverter across threads')
+    parser.add_argument('--records', type=int, default=200,
+                        help='Records per converted export (default: 200)')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help='Thread counts to benchmark (default: 1 2 4 8)')
+    parser.add_argument('--seconds', type=float, default=3.0,
+                        help='Seconds each thread count runs for (default: 3)')
+    parser.add_argument('--fields', default=None,
+                        help='Comma-separated JSON fields of the converter (default: all)')
+    parser.add_argument('--json-format', choices=['pretty', 'compact', 'jsonl'], default='jsonl',
+                        help='JSON format of the converter (default: jsonl)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'synthetic.txt')
+        write_sfaf_file(path, args.records)
+        with open(path, 'rb') as f:
+            data = f.read()
+
+    logging.disable(logging.CRITICAL)
+    fields = args.fields.split(',') if args.fields else None
+    converter = SfafConverter(fields, json_format=args.json_format)
+    expected = converter.convert_bytes(data)
+    reference = (expected.csv, expected.json, expected.counts)
+    records = expected.counts['processed'] + expected.counts['skipped']
+
+    print(f"{os.cpu_count()} CPUs, {records} records ({len(data):,} bytes) per call, "
+          f"{len(converter.plan.fields)} JSON fields, {args.json_format}")
+    print(f"{'threads':>7} {'calls':>7} {'calls/sec':>10} {'records/sec':>12} {'min/max calls per thread':>25}")
+    failed = False
+    for threads in args.threads:
+        result = run_threads(converter, data, threads, args.seconds, reference)
+        rate = result['calls'] / result['seconds']
+        spread = f"{min(result['per_thread'])}/{max(result['per_thread'])}"
+        print(f"{threads:>7} {result['calls']:>7} {rate:>10.1f} {rate * records:>12,.0f} {spread:>25}")
+        if result['mismatches']:
+            print(f"  {result['mismatches']} calls returned output different from the single-threaded reference")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
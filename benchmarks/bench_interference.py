@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for the interference candidate finder.
+
+Generates synthetic assignments clustered around a few sites on a 12.5 kHz
+channel raster and times interference.find_candidates for each record count
+and worker count. For the smallest record count the naive all-pairs scan is
+timed as well.
+
+Usage:
+    python benchmarks/bench_interference.py --records 10000 50000 200000 --workers 1 2 4
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import interference  # noqa: E402
+from spatial_index import haversine_km  # noqa: E402
+
+
+def synthetic_assignments(records: int, seed: int = 1) -> dict:
+    """Random assignments around 20 sites, on VHF/UHF channels with typical bandwidths."""
+    rng = np.random.default_rng(seed)
+    sites = np.column_stack([rng.uniform(35.0, 41.5, 20), rng.uniform(19.5, 28.0, 20)])
+    site = rng.integers(0, len(sites), records)
+    latitude = sites[site, 0] + rng.normal(0, 0.3, records)
+    longitude = sites[site, 1] + rng.normal(0, 0.3, records)
+    band_start = rng.choice([30e6, 138e6, 225e6, 400e6], records)
+    center = band_start + rng.integers(0, 4000, records) * 12500.0
+    bandwidth = rng.choice([3000.0, 12500.0, 16000.0, 25000.0, 2e6], records, p=[0.2, 0.3, 0.3, 0.19, 0.01])
+    return {
+        'latitude': latitude,
+        'longitude': longitude,
+        'center_frequency': center,
+        'bandwidth': bandwidth,
+        'agency_serial': np.array([f'AF  {i:06d}' for i in range(records)], dtype=object),
+        'transmitter_power': rng.choice([5.0, 50.0, 100.0, 1000.0], records),
+    }
+
+
+def naive_pairs(assignments: dict, distance_km: float) -> int:
+    """All-pairs scan: compare every assignment with every later one."""
+    lat, lon = assignments['latitude'], assignments['longitude']
+    low = assignments['center_frequency'] - assignments['bandwidth'] / 2
+    high = assignments['center_frequency'] + assignments['bandwidth'] / 2
+    found = 0
+    for a in range(len(lat) - 1):
+        overlap = np.minimum(high[a], high[a + 1:]) - np.maximum(low[a], low[a + 1:])
+        distance = haversine_km(lat[a], lon[a], lat[a + 1:], lon[a + 1:])
+        found += int(np.count_nonzero((overlap > 0) & (distance <= distance_km)))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark interference candidate finding')
+    parser.add_argument('--records', type=int, nargs='+', default=[10000, 50000, 200000],
+                        help='Record counts to benchmark (default: 10000 50000 200000)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4],
+                        help='Worker counts to benchmark (default: 1 2 4)')
+    parser.add_argument('--distance', type=float, default=20.0,
+                        help='Search distance in km (default: 20)')
+    parser.add_argument('--top', type=int, default=1000,
+                        help='Number of ranked candidates kept (default: 1000)')
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, distance {args.distance} km")
+    print(f"{'records':>9} {'workers':>7} {'seconds':>9} {'pairs examined':>15} {'records/sec':>12}")
+    for records in args.records:
+        assignments = synthetic_assignments(records)
+        for workers in args.workers:
+            counts = {}
+            start = time.perf_counter()
+            interference.find_candidates(assignments, args.distance, top=args.top, workers=workers, counts=counts)
+            elapsed = time.perf_counter() - start
+            print(f"{records:>9} {workers:>7} {elapsed:>9.3f} {counts['examined']:>15,} {records / elapsed:>12,.0f}")
+
+    records = min(args.records)
+    assignments = synthetic_assignments(records)
+    start = time.perf_counter()
+    found = naive_pairs(assignments, args.distance)
+    elapsed = time.perf_counter() - start
+    candidates = interference.find_candidates(assignments, args.distance, top=0)
+    print(f"naive all-pairs, {records} records: {elapsed:.3f} s, {found} pairs "
+          f"(indexed finder: {len(candidates['a'])} pairs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Start-up benchmark for the main.py command line.
+
+Measures the import time of main with ``python -X importtime`` (best of
+several fresh interpreters), lists the slowest modules it pulls in, and times
+end-to-end ``python main.py`` runs on a small synthetic file. Exits with
+status 1 if a heavy module is imported at start-up or the import takes longer
+than --max-import-ms, so it can run as a regression check.
+
+Usage:
+    python benchmarks/bench_startup.py --repeat 10 --max-import-ms 100
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from synthetic_sfaf import write_sfaf_file  # noqa: E402
+
+
+# Modules that only optional features may import
+HEAVY_MODULES = ('pandas', 'numpy', 'orjson')
+
+
+def import_times(module: str) -> dict:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Returns:
+        Dictionary of module name -> (self_us, cumulative_us, depth)
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        times[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return times
+
+
+def best_cli_run(path: str, repeat: int) -> float:
+    """Return the fastest of `repeat` end-to-end main.py runs on path, in seconds."""
+    best = float('inf')
+    with tempfile.TemporaryDirectory() as out:
+        command = [sys.executable, os.path.join(REPO_DIR, 'main.py'), path,
+                   '-o', os.path.join(out, 'out.csv'), '-j', os.path.join(out, 'out.json')]
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(command, cwd=REPO_DIR, capture_output=True, check=True)
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark main.py start-up time')
+    parser.add_argument('--repeat', type=int, default=10,
+                        help='Number of fresh interpreters per measurement; the best is reported (default: 10)')
+    parser.add_argument('--records', type=int, default=10,
+                        help='Records in the synthetic file for the end-to-end run (default: 10)')
+    parser.add_argument('--top', type=int, default=8,
+                        help='Number of slowest imported modules to list (default: 8)')
+    parser.add_argument('--max-import-ms', type=float, default=None,
+                        help='Fail if importing main takes longer than this')
+    args = parser.parse_args()
+
+    runs = [import_times('main') for _ in range(args.repeat)]
+    best = min(runs, key=lambda times: times['main'][1])
+    import_ms = best['main'][1] / 1000
+
+    fd, path = tempfile.mkstemp(suffix='.txt', prefix='sfaf_startup_')
+    os.close(fd)
+    try:
+        write_sfaf_file(path, args.records, malformed=0)
+        cli_seconds = best_cli_run(path, args.repeat)
+    finally:
+        os.remove(path)
+    interpreter_seconds = float('inf')
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], check=True)
+        interpreter_seconds = min(interpreter_seconds, time.perf_counter() - start)
+
+    print(f"import main:           {import_ms:8.1f} ms (cumulative, best of {args.repeat})")
+    print(f"main.py on {args.records} records: {cli_seconds * 1000:8.1f} ms wall "
+          f"(bare interpreter: {interpreter_seconds * 1000:.1f} ms)")
+    print("slowest imports under main:")
+    direct = sorted(((times[1], name) for name, times in best.items() if times[2] == 1), reverse=True)
+    for cumulative_us, name in direct[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    heavy = [name for name in best if name.split('.')[0] in HEAVY_MODULES]
+    if heavy:
+        print(f"FAIL: heavy modules imported at start-up: {', '.join(sorted({n.split('.')[0] for n in heavy}))}")
+        failed = True
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        print(f"FAIL: import main took {import_ms:.1f} ms, budget {args.max_import_ms:.1f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmark suite for the SFAF converter.
+
+For each record count, writes a synthetic SFAF file with synthetic_sfaf.py
+(kept in --data-dir so later runs reuse it) and times:
+
+- col_import on the file, and the memory-mapped reader
+- each convert_* function on the raw values of its SFAF item
+- the end-to-end ``python main.py`` command line
+- json_to_csv on the JSON written by main.py
+
+Each measurement is the best of --repeat runs. Results are written as JSON
+together with the commit, Python version and machine they were measured on;
+--compare prints the speedup of every measurement against an earlier result
+file, so runs on different commits can be compared.
+
+Usage:
+    python benchmarks/bench_suite.py --records 10000 100000 1000000 -o results.json
+    git checkout other-branch
+    python benchmarks/bench_suite.py --records 10000 100000 1000000 --compare results.json
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import main as sfaf  # noqa: E402
+from json_to_csv import json_to_csv  # noqa: E402
+from synthetic_sfaf import write_sfaf_file  # noqa: E402
+
+
+# Format version of the results file
+RESULTS_VERSION = 1
+# Converter -> SFAF items whose raw values it is benchmarked on
+CONVERTER_ITEMS = (
+    ('convert_dms_to_dd', ('303',)),
+    ('convert_frequency', ('110',)),
+    ('convert_emission_designator', ('114',)),
+    ('convert_power', ('115', '117')),
+    ('convert_date', ('140', '141', '142')),
+)
+
+
+def git_commit() -> str:
+    """Commit of the benchmarked tree, with '-dirty' if it has local changes, or 'unknown'."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return commit + ('-dirty' if dirty else '')
+
+
+def dataset(data_dir: str, records: int, seed: int) -> str:
+    """Path of the synthetic file for records/seed, generated on first use."""
+    path = os.path.join(data_dir, f'synthetic_{records}_{seed}.txt')
+    if not os.path.exists(path):
+        start = time.perf_counter()
+        partial = path + '.partial'
+        write_sfaf_file(partial, records, seed)
+        os.replace(partial, path)
+        print(f"generated {path} in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+    return path
+
+
+def best_of(func, repeat: int) -> float:
+    """Return the fastest of `repeat` calls of func() in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def time_converter(convert, values: list, repeat: int) -> float:
+    """Time convert over values, failures included, with the decode caches cleared before each run."""
+    def run():
+        sfaf._decode_frequency.cache_clear()
+        sfaf._decode_emission_designator.cache_clear()
+        for value in values:
+            try:
+                convert(value)
+            except ValueError:
+                pass
+    return best_of(run, repeat)
+
+
+def run_suite(path: str, records: int, repeat: int, work_dir: str) -> list:
+    """
+    Run every benchmark on one synthetic file.
+
+    Returns:
+        List of result dictionaries (name, records, items, seconds, items_per_second)
+    """
+    results = []
+
+    def add(name, seconds, items):
+        results.append({'name': name, 'records': records, 'items': items, 'seconds': round(seconds, 6),
+                        'items_per_second': round(items / seconds, 1) if seconds > 0 else None})
+        print(f"{records:>9} {name:<28} {seconds:>9.3f} s {items:>10} items {items / seconds:>14,.0f} /s")
+
+    parsed = sfaf.col_import(path)
+    add('col_import', best_of(lambda: sfaf.col_import(path), repeat), len(parsed))
+    add('iter_sfaf_records_mmap', best_of(lambda: list(sfaf.iter_sfaf_records_mmap(path)), repeat), len(parsed))
+
+    for name, items in CONVERTER_ITEMS:
+        keys = {spec.name for tag, spec in sfaf.SFAF_FIELDS.items() if tag in items}
+        values = [value for record in parsed for key, value in record.items()
+                  if key in keys or key.split('[')[0] in keys]
+        add(name, time_converter(getattr(sfaf, name), values, repeat), len(values))
+    del parsed
+
+    csv_file = os.path.join(work_dir, 'out.csv')
+    json_file = os.path.join(work_dir, 'out.json')
+    command = [sys.executable, os.path.join(REPO_DIR, 'main.py'), path, '-o', csv_file, '-j', json_file]
+    add('main', best_of(lambda: subprocess.run(command, cwd=REPO_DIR, capture_output=True, check=True), repeat),
+        records)
+
+    full_csv = os.path.join(work_dir, 'full.csv')
+    def convert_json():
+        with contextlib.redirect_stdout(io.StringIO()):
+            json_to_csv(json_file, full_csv)
+    add('json_to_csv', best_of(convert_json, repeat), records)
+    return results
+
+
+def compare(results: list, baseline_file: str) -> None:
+    """Print the speedup of each result over the matching entry of a previous results file."""
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    previous = {(r['name'], r['records']): r for r in baseline['results']}
+    print(f"\ncompared with {baseline_file} (commit {baseline['commit']}):")
+    print(f"{'records':>9} {'benchmark':<28} {'before':>9} {'after':>9} {'speedup':>8}")
+    for result in results:
+        before = previous.get((result['name'], result['records']))
+        if before is None:
+            continue
+        speedup = before['seconds'] / result['seconds'] if result['seconds'] else float('inf')
+        print(f"{result['records']:>9} {result['name']:<28} {before['seconds']:>9.3f} "
+              f"{result['seconds']:>9.3f} {speedup:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the SFAF converter benchmark suite')
+    parser.add_argument('--records', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help='Record counts to benchmark (default: 10000 100000 1000000)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Timed runs per measurement; the best is reported (default: 3)')
+    parser.add_argument('--seed', type=int, default=1,
+                        help='Seed of the synthetic files (default: 1)')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'sfaf_bench_data'),
+                        help='Directory the synthetic files are kept in between runs')
+    parser.add_argument('-o', '--output', default=None,
+                        help='Write the results as JSON to this file')
+    parser.add_argument('--compare', metavar='RESULTS', default=None,
+                        help='Compare with a results file written by an earlier run')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    results = []
+    print(f"{'records':>9} {'benchmark':<28} {'seconds':>11} {'items':>16} {'per second':>16}")
+    for records in args.records:
+        path = dataset(args.data_dir, records, args.seed)
+        with tempfile.TemporaryDirectory() as work_dir:
+            results.extend(run_suite(path, records, args.repeat, work_dir))
+
+    report = {
+        'version': RESULTS_VERSION,
+        'commit': git_commit(),
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4)
+        print(f"results saved to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
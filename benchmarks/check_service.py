@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+End-to-end check of the conversion service against main.py.
+
+Writes a synthetic SFAF export with synthetic_sfaf.py (or uses --input),
+converts it with main.py, then starts a ConversionService on an ephemeral
+port and uploads the same file with the standard library's http.client as a
+stand-in client, both with Content-Length and with chunked transfer encoding,
+for the csv and jsonl formats. Every response body must be byte for byte the
+same as main.py's CSV and JSON Lines output; the script exits non-zero if any
+differs.
+
+A small --batch-bytes makes the service cut the upload into many batches, so
+record boundaries between batches are exercised as well. The upload is
+repeated with CR-only line breaks, checked against main.py's output for that
+copy of the file.
+
+Usage:
+    python benchmarks/check_service.py --records 5000 --workers 2
+    python benchmarks/check_service.py --input your_sfaf_file.txt
+"""
+import argparse
+import asyncio
+import http.client
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sfaf_service  # noqa: E402
+from synthetic_sfaf import write_sfaf_file  # noqa: E402
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+# Size of the chunks of a chunked upload
+CHUNK_BYTES = 16 * 1024
+
+
+class RunningService:
+    """ConversionService listening on an ephemeral port, served by an event loop in a background thread."""
+
+    def __init__(self, workers: int, batch_bytes: int):
+        self.service = sfaf_service.ConversionService(workers, max_uploads=4, batch_bytes=batch_bytes)
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(asyncio.start_server(
+            self.service.handle, '127.0.0.1', 0, limit=sfaf_service.MAX_HEADER_BYTES))
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def close(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.server.close()
+        self.loop.run_until_complete(self.server.wait_closed())
+        self.loop.close()
+        self.service.close()
+
+
+def post(port: int, output_format: str, data: bytes, chunked: bool) -> bytes:
+    """Upload data to /convert with http.client; returns the response body."""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    try:
+        url = f'/convert?format={output_format}'
+        if chunked:
+            chunks = (data[i:i + CHUNK_BYTES] for i in range(0, len(data), CHUNK_BYTES))
+            connection.request('POST', url, body=chunks, encode_chunked=True,
+                               headers={'Transfer-Encoding': 'chunked'})
+        else:
+            connection.request('POST', url, body=data)
+        response = connection.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"{response.status} {response.reason}: {body.decode('utf-8', 'replace').strip()}")
+        return body
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the conversion service against main.py output')
+    parser.add_argument('--input', default=None, help='SFAF file to upload (default: a synthetic export)')
+    parser.add_argument('--records', type=int, default=5000,
+                        help='Records of the synthetic export (default: 5000)')
+    parser.add_argument('--workers', type=int, default=2, help='Service worker processes (default: 2)')
+    parser.add_argument('--batch-bytes', type=int, default=64 * 1024,
+                        help='Service record batch size (default: 65536)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.input
+        if path is None:
+            path = os.path.join(tmp, 'synthetic.txt')
+            write_sfaf_file(path, args.records, terminator=False)
+        with open(path, 'rb') as f:
+            data = f.read()
+        uploads = {'': data, 'CR-only ': data.replace(b'\r\n', b'\n').replace(b'\n', b'\r')}
+
+        expected = {}
+        for name, upload in uploads.items():
+            upload_file = os.path.join(tmp, 'upload.txt')
+            with open(upload_file, 'wb') as f:
+                f.write(upload)
+            csv_file, jsonl_file = os.path.join(tmp, 'records.csv'), os.path.join(tmp, 'records.jsonl')
+            subprocess.run([sys.executable, MAIN_SCRIPT, upload_file, '-o', csv_file, '-j', jsonl_file,
+                            '--json-format', 'jsonl'], check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            for output_format, output_file in (('csv', csv_file), ('jsonl', jsonl_file)):
+                with open(output_file, 'rb') as f:
+                    expected[name, output_format] = f.read()
+
+    logging.disable(logging.CRITICAL)
+    print(f"{len(data):,} bytes uploaded, {args.workers} workers, {args.batch_bytes:,} byte batches")
+    service = RunningService(args.workers, args.batch_bytes)
+    failed = False
+    try:
+        for name, upload in uploads.items():
+            for output_format in ('csv', 'jsonl'):
+                for chunked in (False, True):
+                    start = time.perf_counter()
+                    body = post(service.port, output_format, upload, chunked)
+                    elapsed = time.perf_counter() - start
+                    same = body == expected[name, output_format]
+                    failed |= not same
+                    print(f"{output_format:>5} {name + ('chunked' if chunked else 'Content-Length'):>22}: "
+                          f"{len(body):>10,} bytes in {elapsed:.2f} s, "
+                          f"{'identical to main.py' if same else 'DIFFERENT from main.py'}")
+    finally:
+        service.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Generator of realistic synthetic SFAF 1-column files.
+
+Records use every tag col_import understands, with repeated 111, 113-117 and
+207/208 groups, assignments clustered around a handful of sites on common
+VHF/UHF channel rasters, and the defects found in real exports: records
+without 303 coordinates, malformed lines (missing separator, empty or garbled
+values) and, optionally, a last record without its 924 terminator. Output is
+fully determined by the record count and seed, so files can be regenerated
+anywhere instead of being shared.
+
+Usage:
+    python benchmarks/synthetic_sfaf.py synthetic.txt --records 100000
+    python benchmarks/synthetic_sfaf.py dirty.txt --records 10000 --missing-coordinates 0.4 --malformed 0.05
+"""
+import argparse
+import os
+import random
+from typing import Dict
+
+
+# Sites assignments are clustered around (latitude, longitude)
+SITES = (
+    (39.6390, 22.4191), (37.9838, 23.7275), (40.6401, 22.9444), (38.2466, 21.7346),
+    (35.3387, 25.1442), (39.3622, 22.9420), (41.1171, 25.4063), (36.4349, 28.2176),
+)
+# (unit, first channel, channel spacing, channels) of the bands frequencies are drawn from
+BANDS = (
+    ('M', 30.0, 0.025, 2400),
+    ('M', 138.0, 0.0125, 1600),
+    ('M', 225.0, 0.025, 7000),
+    ('M', 406.1, 0.0125, 1100),
+    ('K', 2000.0, 0.5, 56000),
+    ('G', 2.2, 0.001, 100),
+)
+EMISSION_DESIGNATORS = ('16K0F3E', '25K0F3E', '11K2F3E', '3K00J3E', '6K00A3E', '20K0G7W', '2M00G7W', '100KF1D')
+STATION_CLASSES = ('FX', 'FB', 'ML', 'MO', 'FA', 'MA', 'FB2')
+POWERS = ('W5', 'W10', 'W25', 'W50', 'W100', 'K1', 'K1.5', 'K10')
+ACTIONS = ('N', 'M', 'R', 'D')
+AGENCIES = (('USAF', 'ACC'), ('USA', 'FORSCOM'), ('USN', 'NAVEUR'), ('USMC', 'MARFOREUR'))
+FUNCTIONS = ('AIR OPERATIONS', 'GROUND OPERATIONS', 'C2', 'TRAINING', 'RANGE OPERATIONS')
+EQUIPMENT = ('G,AN/PRC-117', 'G,AN/PRC-152', 'G,AN/ARC-210', 'G,AN/GRC-240', 'C,MOTOROLA XTS')
+# Malformed variants of a line; the value argument is the well-formed value
+MALFORMED_LINES = (
+    lambda tag, value: f'{tag}.{value}',            # separator missing
+    lambda tag, value: f'{tag}.     ',              # empty value
+    lambda tag, value: f'{tag}.     ?{value[::-1]}',  # garbled value
+    lambda tag, value: f'{tag}',                    # truncated line
+)
+
+
+def _dms(latitude: float, longitude: float) -> str:
+    """Format a position as a 15 character SXXI DMS string (e.g. "395900N0222630E")."""
+    def part(value, width):
+        value = abs(value)
+        degrees = int(value)
+        minutes = int((value - degrees) * 60)
+        seconds = int(round(((value - degrees) * 60 - minutes) * 60)) % 60
+        return f'{degrees:0{width}d}{minutes:02d}{seconds:02d}'
+    return (part(latitude, 2) + ('N' if latitude >= 0 else 'S')
+            + part(longitude, 3) + ('E' if longitude >= 0 else 'W'))
+
+
+def _frequency(rng: random.Random) -> str:
+    """A line 110 frequency on one of BANDS, occasionally with a reference frequency."""
+    unit, first, spacing, channels = rng.choice(BANDS)
+    value = first + rng.randrange(channels) * spacing
+    text = f'{unit}{value:.4f}'.rstrip('0').rstrip('.')
+    if rng.random() < 0.05:
+        text += f'({value - spacing:.4f})'.replace('.0000)', ')')
+    return text
+
+
+def synthetic_record(rng: random.Random, index: int, missing_coordinates: float = 0.1) -> list:
+    """
+    Build the lines of one synthetic record, without the 005/924 delimiters.
+
+    Args:
+        rng: Random generator the record is drawn from
+        index: Record number, used for the serial numbers
+        missing_coordinates: Probability that the record has no 303 line
+
+    Returns:
+        List of (tag, value) tuples in export order
+    """
+    agency, command = rng.choice(AGENCIES)
+    fields = [
+        ('010', rng.choice(ACTIONS)),
+        ('102', f'{agency[:2]}  {index:06d}'),
+        ('105', f'L{index % 100000:05d}'),
+        ('110', _frequency(rng)),
+    ]
+    if rng.random() < 0.1:
+        fields.append(('111', f'M{rng.randint(30, 400)}-M{rng.randint(401, 500)}'))
+    for _ in range(rng.choices((1, 2, 3, 4), (0.55, 0.25, 0.15, 0.05))[0]):
+        fields.append(('113', rng.choice(STATION_CLASSES)))
+        fields.append(('114', rng.choice(EMISSION_DESIGNATORS)))
+        fields.append(('115', rng.choice(POWERS)))
+        fields.append(('117', rng.choice(POWERS)))
+    required = rng.randint(2015, 2026) * 10000 + rng.randint(1, 12) * 100 + rng.randint(1, 28)
+    fields.append(('140', str(required)))
+    fields.append(('141', str(required + rng.randint(1, 10) * 10000)))
+    if rng.random() < 0.5:
+        fields.append(('142', str(required + 50000)))
+    fields.append(('200', agency))
+    fields.append(('204', command))
+    for _ in range(rng.randint(1, 2)):
+        fields.append(('207', f'UNIT{rng.randint(1, 500)}'))
+    for _ in range(rng.randint(1, 3)):
+        fields.append(('208', f'NET{rng.randint(1, 2000)}'))
+    if rng.random() >= missing_coordinates:
+        latitude, longitude = rng.choice(SITES)
+        fields.append(('303', _dms(latitude + rng.gauss(0, 0.2), longitude + rng.gauss(0, 0.2))))
+        if rng.random() < 0.3:
+            fields.append(('306', f'{rng.choice((5, 10, 20, 50))}B'))
+    fields.append(('340', rng.choice(EQUIPMENT)))
+    if rng.random() < 0.2:
+        fields.append(('346', f'{rng.randint(1, 100)}U'))
+        fields.append(('347', str(rng.randint(100, 5000))))
+    fields.append(('357', str(rng.randint(0, 30))))
+    fields.append(('359', str(rng.randint(2, 60))))
+    fields.append(('511', rng.choice(FUNCTIONS)))
+    fields.append(('512', 'COMMUNICATIONS'))
+    fields.append(('701', 'C10'))
+    return fields
+
+
+def write_sfaf_file(path: str, records: int, seed: int = 1, missing_coordinates: float = 0.1,
+                    malformed: float = 0.01, terminator: bool = True) -> Dict[str, int]:
+    """
+    Write a synthetic SFAF 1-column file.
+
+    Args:
+        path: File to write
+        records: Number of records
+        seed: Random seed; the same arguments always produce the same file
+        missing_coordinates: Fraction of records without a 303 line
+        malformed: Fraction of lines replaced by a malformed variant
+        terminator: End the last record with a 924 line; real exports are
+            sometimes cut off without one
+
+    Returns:
+        Dictionary with the 'records', 'lines', 'bytes', 'malformed_lines' and
+        'missing_coordinates' written
+    """
+    rng = random.Random(seed)
+    stats = {'records': records, 'lines': 0, 'malformed_lines': 0, 'missing_coordinates': 0}
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(records):
+            fields = synthetic_record(rng, i, missing_coordinates)
+            if not any(tag == '303' for tag, _ in fields):
+                stats['missing_coordinates'] += 1
+            out = ['005.     UE']
+            for tag, value in fields:
+                if malformed and rng.random() < malformed:
+                    out.append(rng.choice(MALFORMED_LINES)(tag, value))
+                    stats['malformed_lines'] += 1
+                else:
+                    out.append(f'{tag}.     {value}')
+            if terminator or i < records - 1:
+                out.append('924.     EOR')
+            out.append('')
+            f.write('\n'.join(out))
+            stats['lines'] += len(out) - 1
+    stats['bytes'] = os.path.getsize(path)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a synthetic SFAF 1-column file')
+    parser.add_argument('output', help='SFAF file to write')
+    parser.add_argument('--records', type=int, default=10000,
+                        help='Number of records (default: 10000)')
+    parser.add_argument('--seed', type=int, default=1,
+                        help='Random seed (default: 1)')
+    parser.add_argument('--missing-coordinates', type=float, default=0.1,
+                        help='Fraction of records without 303 coordinates (default: 0.1)')
+    parser.add_argument('--malformed', type=float, default=0.01,
+                        help='Fraction of malformed lines (default: 0.01)')
+    parser.add_argument('--no-terminator', action='store_true',
+                        help='Leave the last record without its 924 line')
+    args = parser.parse_args()
+
+    stats = write_sfaf_file(args.output, args.records, args.seed, args.missing_coordinates,
+                            args.malformed, not args.no_terminator)
+    print(f"Wrote {stats['records']} records, {stats['lines']} lines ({stats['bytes']:,} bytes) to {args.output}: "
+          f"{stats['missing_coordinates']} without coordinates, {stats['malformed_lines']} malformed lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Columnar cache of processed SFAF records backed by memory-mapped NumPy files.
+
+A cache is a directory holding one file per column plus a meta.json index:
+
+- float columns are raw float64 arrays (``<table>.<column>.f8``)
+- integer columns are raw int64 arrays (``<table>.<column>.i8``)
+- string columns are an int64 end-offset array (``.offsets``) into UTF-8 bytes (``.data``)
+- json columns are string columns holding JSON-encoded values of mixed type
+
+The nested ``stations`` list of every record is flattened into a child table
+whose ``record_index`` column points at the owning row of the records table.
+Readers memory-map only the columns they ask for, so selecting latitude,
+longitude, center_frequency and bandwidth never touches the other columns.
+"""
+import json
+import os
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import main as sfaf
+
+
+COLUMNAR_VERSION = 1
+META_FILE = 'meta.json'
+RECORDS_TABLE = 'records'
+STATIONS_TABLE = 'stations'
+
+# Storage kind of the known columns of main.process_record() output
+RECORD_COLUMN_KINDS = {name: field.kind for name, field in sfaf.OUTPUT_FIELDS.items()
+                       if field.kind != 'stations'}
+STATION_COLUMNS = (
+    ('record_index', 'int'),
+    ('station_class', 'str'),
+    ('transmitter_power', 'json'),
+    ('effective_radiated_power', 'json'),
+)
+
+# Number of buffered values per column before they are appended to disk
+_FLUSH_EVERY = 65536
+
+
+class _ColumnFile:
+    """Append-only on-disk column of one storage kind."""
+
+    def __init__(self, base: str, kind: str):
+        self.kind = kind
+        if kind in ('float', 'int'):
+            self.values = array('d' if kind == 'float' else 'q')
+            self.fp = open(base + ('.f8' if kind == 'float' else '.i8'), 'wb')
+        else:
+            self.offset = 0
+            self.offsets = array('q', [0])
+            self.chunks = []
+            self.offsets_fp = open(base + '.offsets', 'wb')
+            self.fp = open(base + '.data', 'wb')
+
+    def append(self, value) -> None:
+        if self.kind == 'float':
+            self.values.append(float('nan') if value is None or value == '' else float(value))
+            pending = len(self.values)
+        elif self.kind == 'int':
+            self.values.append(value)
+            pending = len(self.values)
+        else:
+            if self.kind == 'json':
+                text = json.dumps(value)
+            else:
+                text = '' if value is None else str(value)
+            encoded = text.encode('utf-8')
+            self.chunks.append(encoded)
+            self.offset += len(encoded)
+            self.offsets.append(self.offset)
+            pending = len(self.chunks)
+        if pending >= _FLUSH_EVERY:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.kind in ('float', 'int'):
+            self.values.tofile(self.fp)
+            del self.values[:]
+        else:
+            self.offsets.tofile(self.offsets_fp)
+            del self.offsets[:]
+            self.fp.write(b''.join(self.chunks))
+            self.chunks = []
+
+    def close(self) -> None:
+        self.flush()
+        self.fp.close()
+        if self.kind not in ('float', 'int'):
+            self.offsets_fp.close()
+
+    def remove(self) -> None:
+        """Close the column without flushing it and delete its files."""
+        files = [self.fp] if self.kind in ('float', 'int') else [self.fp, self.offsets_fp]
+        for fp in files:
+            fp.close()
+            if os.path.exists(fp.name):
+                os.remove(fp.name)
+
+
+class ColumnarWriter:
+    """
+    Stream processed records into a columnar cache directory.
+
+    The record columns are fixed by the first record written: known columns use
+    the kinds in RECORD_COLUMN_KINDS, any other key is stored as a json column.
+    Used as a context manager, the cache is completed if the block succeeds and
+    discarded if it raises.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self.station_rows = 0
+        self.record_columns: Optional[List[Tuple[str, str]]] = None
+        # Whether the records have a 'stations' list (a --fields projection may leave it out)
+        self.record_stations = True
+        self._files: Dict[Tuple[str, str], _ColumnFile] = {}
+        # Only a directory created by this writer is removed by discard()
+        self._created = not os.path.isdir(path)
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, META_FILE)
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        for name, kind in STATION_COLUMNS:
+            self._open(STATIONS_TABLE, name, kind)
+
+    def _open(self, table: str, name: str, kind: str) -> None:
+        self._files[(table, name)] = _ColumnFile(os.path.join(self.path, f'{table}.{name}'), kind)
+
+    def write(self, record: Dict) -> None:
+        """Append one processed record (as produced by main.process_record())."""
+        if self.record_columns is None:
+            self.record_columns = [(name, RECORD_COLUMN_KINDS.get(name, 'json'))
+                                   for name in record if name != STATIONS_TABLE]
+            self.record_stations = STATIONS_TABLE in record
+            for name, kind in self.record_columns:
+                self._open(RECORDS_TABLE, name, kind)
+
+        for name, _ in self.record_columns:
+            self._files[(RECORDS_TABLE, name)].append(record.get(name))
+        for station in record.get(STATIONS_TABLE, ()):
+            self._files[(STATIONS_TABLE, 'record_index')].append(self.rows)
+            for name, _ in STATION_COLUMNS[1:]:
+                self._files[(STATIONS_TABLE, name)].append(station.get(name))
+            self.station_rows += 1
+        self.rows += 1
+
+    def close(self, complete: bool = True) -> None:
+        """
+        Flush all columns and write meta.json, which marks the cache as complete.
+
+        Args:
+            complete: False to close the column files without writing meta.json,
+                leaving the cache unreadable (see discard() to delete it instead)
+        """
+        for column in self._files.values():
+            column.close()
+        if not complete:
+            return
+        meta = {
+            'version': COLUMNAR_VERSION,
+            'tables': {
+                RECORDS_TABLE: {'rows': self.rows, 'columns': self.record_columns or [],
+                                'stations': self.record_stations},
+                STATIONS_TABLE: {'rows': self.station_rows, 'columns': list(STATION_COLUMNS)},
+            },
+        }
+        with open(os.path.join(self.path, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=4)
+
+    def discard(self) -> None:
+        """
+        Delete the partial cache after a failed conversion.
+
+        The column files are closed and deleted, and so is the directory if
+        this writer created it; other files in an existing directory are kept.
+        """
+        for column in self._files.values():
+            column.remove()
+        self._files.clear()
+        if self._created:
+            try:
+                os.rmdir(self.path)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def read_meta(path: str) -> Dict:
+    """
+    Read the index of a columnar cache.
+
+    Raises:
+        FileNotFoundError: If path is not a complete columnar cache
+        ValueError: If the cache was written by an unsupported version
+    """
+    with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('version') != COLUMNAR_VERSION:
+        raise ValueError(f"Unsupported columnar cache version: {meta.get('version')}")
+    return meta
+
+
+def has_record_stations(meta: Dict) -> bool:
+    """Return True if the records of a cache (given its read_meta()) had a 'stations' list."""
+    # Caches written before this was recorded always had one
+    return meta['tables'][RECORDS_TABLE].get('stations', True)
+
+
+def is_columnar(path: str) -> bool:
+    """Return True if path is a columnar cache directory."""
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+class StringColumn:
+    """Lazily decoded view of a memory-mapped string or json column."""
+
+    def __init__(self, base: str, kind: str, rows: int):
+        self.kind = kind
+        self.rows = rows
+        if rows:
+            self.offsets = np.memmap(base + '.offsets', dtype='i8', mode='r', shape=(rows + 1,))
+            self.data = np.memmap(base + '.data', dtype=np.uint8, mode='r') if self.offsets[-1] else None
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, i: int):
+        if not 0 <= i < self.rows:
+            raise IndexError(i)
+        start, end = self.offsets[i], self.offsets[i + 1]
+        text = self.data[start:end].tobytes().decode('utf-8') if end > start else ''
+        return json.loads(text) if self.kind == 'json' else text
+
+    def to_numpy(self) -> np.ndarray:
+        """Decode every value into an object array."""
+        values = np.empty(self.rows, dtype=object)
+        for i in range(self.rows):
+            values[i] = self[i]
+        return values
+
+
+def _open_column(path: str, table: str, name: str, kind: str, rows: int):
+    """Memory-map one column without decoding it."""
+    base = os.path.join(path, f'{table}.{name}')
+    if kind in ('float', 'int'):
+        dtype = 'f8' if kind == 'float' else 'i8'
+        if rows == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(base + ('.f8' if kind == 'float' else '.i8'), dtype=dtype, mode='r', shape=(rows,))
+    return StringColumn(base, kind, rows)
+
+
+def _open_table(path: str, table: str, columns: Optional[Iterable[str]] = None) -> Dict:
+    """Open the selected columns of a table without decoding them."""
+    meta = read_meta(path)
+    info = meta['tables'][table]
+    kinds = dict((name, kind) for name, kind in info['columns'])
+    selected = list(kinds) if columns is None else list(columns)
+    missing = [name for name in selected if name not in kinds]
+    if missing:
+        raise KeyError(f"Unknown {table} column(s): {', '.join(missing)}")
+    return {name: _open_column(path, table, name, kinds[name], info['rows']) for name in selected}
+
+
+def read_columns(path: str, columns: Optional[Iterable[str]] = None,
+                 table: str = RECORDS_TABLE) -> Dict[str, np.ndarray]:
+    """
+    Load selected columns of a columnar cache.
+
+    Args:
+        path: Columnar cache directory
+        columns: Column names to load (default: all columns of the table)
+        table: 'records' or 'stations'
+
+    Returns:
+        Dictionary of column name -> array; numeric columns are read-only
+        memory maps, string and json columns are decoded into object arrays
+
+    Raises:
+        KeyError: If a requested column does not exist
+    """
+    columns = _open_table(path, table, columns)
+    return {name: column.to_numpy() if isinstance(column, StringColumn) else column
+            for name, column in columns.items()}
+
+
+def read_dataframe(path: str, columns: Optional[Iterable[str]] = None, table: str = RECORDS_TABLE):
+    """Load selected columns of a columnar cache as a pandas DataFrame."""
+    import pandas as pd
+
+    return pd.DataFrame(read_columns(path, columns, table))
+
+
+def iter_records(path: str) -> Iterator[Dict]:
+    """
+    Rebuild processed record dictionaries from a columnar cache.
+
+    Missing reference frequencies come back as None and numeric columns as
+    floats, so a record that had integer 0/0 coordinates yields 0.0/0.0.
+
+    Yields:
+        One dictionary per record, with its 'stations' list restored if the
+        records written had one
+    """
+    meta = read_meta(path)
+    record_columns = meta['tables'][RECORDS_TABLE]['columns']
+    record_stations = has_record_stations(meta)
+    records = _open_table(path, RECORDS_TABLE)
+    stations = _open_table(path, STATIONS_TABLE)
+    owners = stations['record_index']
+    station_count = len(owners)
+    station_start = 0
+
+    for i in range(meta['tables'][RECORDS_TABLE]['rows']):
+        station_end = station_start
+        while station_end < station_count and owners[station_end] == i:
+            station_end += 1
+        record = {}
+        if record_stations:
+            record[STATIONS_TABLE] = [{name: stations[name][j] for name, _ in STATION_COLUMNS[1:]}
+                                      for j in range(station_start, station_end)]
+        station_start = station_end
+        for name, kind in record_columns:
+            value = records[name][i]
+            if kind == 'float':
+                value = None if np.isnan(value) else float(value)
+            record[name] = value
+        yield record
@@ -0,0 +1,223 @@
+"""
+Content-addressed cache of conversion outputs, used by main.py --cache-dir.
+
+Entries are keyed on a hash of the input file contents, the output options
+and the converter version, so a cached output is only reused when converting
+again would produce the same bytes. The cache directory can be shared between
+users and machines: entries are assembled in a private temporary directory and
+published with an atomic rename, and an advisory file lock keeps eviction from
+deleting an entry while it is being copied out. The least recently used
+entries are evicted once the cache grows beyond its size limit.
+
+Layout:
+    <cache_dir>/entries/<key>/meta.json    counts, size and the entry's outputs
+    <cache_dir>/entries/<key>/<output>     one file (or directory) per output
+    <cache_dir>/tmp/                       entries being written
+    <cache_dir>/lock                       advisory lock file
+"""
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: rely on the atomic rename alone
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+# Default size limit of a cache directory
+DEFAULT_MAX_BYTES = 4 * 1024 ** 3
+# Bytes hashed at a time
+HASH_BLOCK_SIZE = 1024 * 1024
+# Temporary entries older than this are left over from crashed writers
+STALE_TMP_SECONDS = 24 * 3600
+META_FILE = 'meta.json'
+# Completion marker of a columnar output directory (columnar.META_FILE)
+COLUMNAR_META_FILE = 'meta.json'
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _tree_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
+def _copy_output(source: str, destination: str) -> None:
+    """Copy a cached or converted output file or columnar directory."""
+    if os.path.isdir(source):
+        # Like columnar.ColumnarWriter, drop the meta file first and write it last:
+        # it marks the directory as a complete columnar cache
+        os.makedirs(destination, exist_ok=True)
+        if os.path.exists(os.path.join(destination, COLUMNAR_META_FILE)):
+            os.remove(os.path.join(destination, COLUMNAR_META_FILE))
+        for name in sorted(os.listdir(source), key=lambda name: (name == COLUMNAR_META_FILE, name)):
+            shutil.copyfile(os.path.join(source, name), os.path.join(destination, name))
+    else:
+        shutil.copyfile(source, destination)
+
+
+class ConversionCache:
+    """
+    On-disk cache of conversion outputs.
+
+    Args:
+        cache_dir: Cache directory, created if needed
+        max_bytes: Size limit; least recently used entries are evicted beyond it
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.entries_dir = os.path.join(cache_dir, 'entries')
+        self.tmp_dir = os.path.join(cache_dir, 'tmp')
+        os.makedirs(self.entries_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def key(self, col_file: str, options: Dict) -> str:
+        """
+        Compute the cache key of converting col_file with the given options.
+
+        Args:
+            col_file: Input file; its contents are hashed, not its name or time stamps
+            options: JSON-serializable options that affect the output bytes,
+                including the converter version
+
+        Returns:
+            Hex digest identifying the conversion
+        """
+        digest = hashlib.sha256()
+        digest.update(file_digest(col_file).encode('ascii'))
+        digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    @contextlib.contextmanager
+    def _lock(self, exclusive: bool):
+        """Hold the cache lock: shared while copying entries out, exclusive to publish or evict."""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.cache_dir, 'lock'), 'a+') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def restore(self, key: str, outputs: Dict[str, str]) -> Optional[Dict]:
+        """
+        Copy the outputs of a cached conversion to their destinations.
+
+        Args:
+            key: Key returned by key()
+            outputs: Output name -> destination path, with the names used by store()
+
+        Returns:
+            The counts stored with the entry, or None on a cache miss
+        """
+        entry = os.path.join(self.entries_dir, key)
+        with self._lock(exclusive=False):
+            meta_path = os.path.join(entry, META_FILE)
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+            except FileNotFoundError:
+                return None
+            except ValueError as e:
+                logger.warning(f"Ignoring damaged cache entry {entry}: {e}")
+                return None
+            if set(meta['outputs']) != set(outputs):
+                return None
+            for name, destination in outputs.items():
+                _copy_output(os.path.join(entry, name), destination)
+            # The meta file's modification time orders entries for eviction
+            os.utime(meta_path)
+        return meta['counts']
+
+    def store(self, key: str, outputs: Dict[str, str], counts: Dict) -> None:
+        """
+        Add the outputs of a finished conversion to the cache.
+
+        The outputs are copied outside the lock; if another process stored the
+        same key meanwhile, its entry is kept. Evicts old entries afterwards.
+
+        Args:
+            key: Key returned by key()
+            outputs: Output name -> path of the file or columnar directory written
+            counts: JSON-serializable counts to return from restore()
+        """
+        entry = os.path.join(self.entries_dir, key)
+        if os.path.exists(entry):
+            return
+        staging = tempfile.mkdtemp(prefix=f'{key[:16]}.', dir=self.tmp_dir)
+        try:
+            for name, source in outputs.items():
+                _copy_output(source, os.path.join(staging, name))
+            size = _tree_size(staging)
+            with open(os.path.join(staging, META_FILE), 'w', encoding='utf-8') as f:
+                json.dump({'key': key, 'bytes': size, 'created': time.time(),
+                           'outputs': sorted(outputs), 'counts': counts}, f)
+            with self._lock(exclusive=True):
+                if not os.path.exists(entry):
+                    os.rename(staging, entry)
+                    logger.info(f"Stored conversion in cache: {entry} ({size:,} bytes)")
+                self._evict()
+        finally:
+            if os.path.exists(staging):
+                shutil.rmtree(staging, ignore_errors=True)
+
+    def evict(self) -> int:
+        """Evict least recently used entries down to max_bytes; returns the number removed."""
+        with self._lock(exclusive=True):
+            return self._evict()
+
+    def _evict(self) -> int:
+        entries = []
+        total = 0
+        for name in os.listdir(self.entries_dir):
+            meta_path = os.path.join(self.entries_dir, name, META_FILE)
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    size = json.load(f)['bytes']
+                used = os.path.getmtime(meta_path)
+            except (OSError, ValueError, KeyError):
+                size, used = _tree_size(os.path.join(self.entries_dir, name)), 0.0
+            entries.append((used, name, size))
+            total += size
+
+        removed = 0
+        for used, name, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(os.path.join(self.entries_dir, name), ignore_errors=True)
+            total -= size
+            removed += 1
+        if removed:
+            logger.info(f"Evicted {removed} cache entries, {total:,} bytes remain")
+
+        now = time.time()
+        for name in os.listdir(self.tmp_dir):
+            path = os.path.join(self.tmp_dir, name)
+            try:
+                if now - os.path.getmtime(path) > STALE_TMP_SECONDS:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                pass
+        return removed
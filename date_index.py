@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Time-window index over assignment dates for as-of and date range queries.
+
+Every converted assignment is active from its REQUIRED DATE (140) through its
+EXPIRATION DATE (141), both days included. A missing required date means the
+assignment has always been active and a missing expiration date that it never
+expires; an assignment that expires before it is required is never active.
+
+Windows with both dates are grouped by length class (powers of two days) and
+sorted by first day, like the spans of frequency_index.FrequencyIndex: a window
+can only intersect [first, last] if it starts in [first - longest window of the
+class, last], so each class answers a query with two binary searches and a
+filter over a slice at most about twice the size of the result. Open-ended
+windows are sorted by their one known end, and expiration and review dates are
+kept sorted for "expiring between" and "review due" queries.
+
+The index is built from converted output (records.json, JSON Lines or a
+columnar cache), so the SFAF file is not parsed again, and matches can be
+written as a CRFS overlay in the same 5-column format as main.py.
+
+Example:
+    python date_index.py records.json --active-on 2026-11-01 -o mission_overlay.csv
+    python date_index.py records.cols --expiring-within 90
+    python date_index.py records.json --review-due 20261001 20261231
+"""
+import argparse
+import datetime
+import sys
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from spatial_index import OVERLAY_FIELDS, load_assignments, write_overlay
+
+
+# Date fields of the records written by main.py
+DATE_FIELDS = ('required_date', 'expiration_date', 'review_date')
+# Day number of a missing or invalid date
+MISSING_DAY = np.iinfo(np.int64).min
+EPOCH = datetime.date(1970, 1, 1)
+
+
+def parse_day(value) -> Optional[int]:
+    """
+    Convert a date into a day number (days since 1970-01-01).
+
+    Args:
+        value: ISO date or timestamp as written by main.py (e.g. "2026-11-01T00:00:00Z"),
+            "YYYY-MM-DD", SXXI "YYYYMMDD", or None
+
+    Returns:
+        Day number, or None if the value is missing or not a valid calendar date
+    """
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        if len(value) == 8 and value.isdigit():
+            date = datetime.date(int(value[:4]), int(value[4:6]), int(value[6:]))
+        else:
+            date = datetime.date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+    return (date - EPOCH).days
+
+
+def format_day(day: int) -> str:
+    """Format a day number as YYYY-MM-DD ('' for MISSING_DAY)."""
+    if day == MISSING_DAY:
+        return ''
+    return (EPOCH + datetime.timedelta(days=int(day))).isoformat()
+
+
+def day_numbers(values: Iterable) -> np.ndarray:
+    """
+    Convert a column of dates into day numbers.
+
+    Returns:
+        int64 array, MISSING_DAY where a date is missing or invalid
+    """
+    cache: Dict = {}
+    days = []
+    for value in values:
+        day = cache.get(value, cache)
+        if day is cache:
+            day = parse_day(value)
+            day = cache[value] = MISSING_DAY if day is None else day
+        days.append(day)
+    return np.array(days, dtype=np.int64)
+
+
+class DateIndex:
+    """
+    Interval index over the active windows of assignments.
+
+    Query results are indices into the arrays the index was built from.
+    Dates are day numbers (see parse_day()) and ranges include both ends.
+    """
+
+    def __init__(self, required_dates, expiration_dates, review_dates=None):
+        """
+        Args:
+            required_dates: REQUIRED DATE of every assignment (any form accepted by parse_day())
+            expiration_dates: EXPIRATION DATE of every assignment
+            review_dates: Optional REVIEW DATE of every assignment
+        """
+        self.starts = day_numbers(required_dates)
+        self.ends = day_numbers(expiration_dates)
+        self.reviews = day_numbers(review_dates) if review_dates is not None else \
+            np.full(len(self.starts), MISSING_DAY, dtype=np.int64)
+        self.size = len(self.starts)
+        ids = np.arange(self.size)
+
+        has_start, has_end = self.starts != MISSING_DAY, self.ends != MISSING_DAY
+        finite = has_start & has_end
+        self.inverted = int(np.count_nonzero(finite & (self.ends < self.starts)))
+        finite &= self.ends >= self.starts
+
+        starts, ends, owners = self.starts[finite], self.ends[finite], ids[finite]
+        order = np.lexsort((ends, starts))
+        starts, ends, owners = starts[order], ends[order], owners[order]
+        classes = np.floor(np.log2(ends - starts + 1)).astype(np.int64)
+        self.classes = []
+        for length_class in np.unique(classes):
+            members = np.flatnonzero(classes == length_class)
+            self.classes.append((starts[members], ends[members], owners[members],
+                                 int((ends[members] - starts[members]).max())))
+
+        self.open_end = self._sorted(self.starts, ids[has_start & ~has_end])
+        self.open_start = self._sorted(self.ends, ids[~has_start & has_end])
+        self.unbounded = ids[~has_start & ~has_end]
+        self.by_expiration = self._sorted(self.ends, ids[has_end])
+        self.by_review = self._sorted(self.reviews, ids[self.reviews != MISSING_DAY])
+
+    @staticmethod
+    def _sorted(days: np.ndarray, ids: np.ndarray):
+        """(days, ids) of the given assignments, sorted by day."""
+        order = np.argsort(days[ids], kind='stable')
+        return days[ids][order], ids[order]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def active(self, first: int, last: Optional[int] = None) -> np.ndarray:
+        """
+        Find assignments active on at least one day of [first, last].
+
+        Args:
+            first: First day number
+            last: Last day number, first if None (an as-of query)
+
+        Returns:
+            Sorted array of assignment indices
+        """
+        if last is None:
+            last = first
+        found = [self.unbounded]
+        for starts, ends, owners, longest in self.classes:
+            start = np.searchsorted(starts, first - longest, side='left')
+            end = np.searchsorted(starts, last, side='right')
+            found.append(owners[start:end][ends[start:end] >= first])
+        days, owners = self.open_end
+        found.append(owners[:np.searchsorted(days, last, side='right')])
+        days, owners = self.open_start
+        found.append(owners[np.searchsorted(days, first, side='left'):])
+        return np.unique(np.concatenate(found))
+
+    def expiring(self, first: int, last: int) -> np.ndarray:
+        """
+        Find assignments whose EXPIRATION DATE is in [first, last].
+
+        Returns:
+            Array of assignment indices, ordered by expiration date
+        """
+        return self._between(self.by_expiration, first, last)
+
+    def review_due(self, first: int, last: int) -> np.ndarray:
+        """
+        Find assignments whose REVIEW DATE is in [first, last].
+
+        Returns:
+            Array of assignment indices, ordered by review date
+        """
+        return self._between(self.by_review, first, last)
+
+    @staticmethod
+    def _between(by_day, first: int, last: int) -> np.ndarray:
+        days, owners = by_day
+        return owners[np.searchsorted(days, first, side='left'):np.searchsorted(days, last, side='right')]
+
+
+def parse_date_argument(value: str) -> int:
+    """argparse type for dates given as YYYY-MM-DD or YYYYMMDD."""
+    day = parse_day(value)
+    if day is None:
+        raise argparse.ArgumentTypeError(f"invalid date: {value!r} (expected YYYY-MM-DD or YYYYMMDD)")
+    return day
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description='Query converted SFAF assignments by their active window, expiration and review dates'
+    )
+    parser.add_argument('records', help='records.json, JSON Lines file or columnar cache directory')
+    query = parser.add_mutually_exclusive_group(required=True)
+    query.add_argument('--active-on', type=parse_date_argument, metavar='DATE',
+                       help='Assignments active on a date, e.g. a mission date')
+    query.add_argument('--active-between', nargs=2, type=parse_date_argument, metavar=('FIRST', 'LAST'),
+                       help='Assignments active on at least one day of a date range')
+    query.add_argument('--expiring-within', type=int, metavar='DAYS',
+                       help='Assignments expiring in the next DAYS days after --as-of')
+    query.add_argument('--expiring-between', nargs=2, type=parse_date_argument, metavar=('FIRST', 'LAST'),
+                       help='Assignments whose EXPIRATION DATE is in a date range')
+    query.add_argument('--review-due', nargs=2, type=parse_date_argument, metavar=('FIRST', 'LAST'),
+                       help='Assignments whose REVIEW DATE is in a date range')
+    parser.add_argument('--as-of', type=parse_date_argument, default=None, metavar='DATE',
+                       help='With --expiring-within: day the period starts after (default: today)')
+    parser.add_argument('--output', '-o', default=None,
+                       help='Write the matches as a CRFS overlay CSV (default: print them)')
+    args = parser.parse_args(argv)
+    if args.as_of is not None and args.expiring_within is None:
+        parser.error('--as-of only applies to --expiring-within')
+    if args.expiring_within is not None and args.expiring_within < 0:
+        parser.error('--expiring-within must not be negative')
+
+    try:
+        assignments = load_assignments(args.records, OVERLAY_FIELDS + DATE_FIELDS)
+    except FileNotFoundError:
+        print(f"Error: File {args.records} not found")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    index = DateIndex(assignments['required_date'], assignments['expiration_date'], assignments['review_date'])
+    built = time.perf_counter()
+
+    if args.active_on is not None:
+        ids = index.active(args.active_on)
+    elif args.active_between:
+        ids = index.active(*sorted(args.active_between))
+    elif args.expiring_within is not None:
+        as_of = args.as_of if args.as_of is not None else (datetime.date.today() - EPOCH).days
+        ids = index.expiring(as_of + 1, as_of + args.expiring_within)
+    elif args.expiring_between:
+        ids = index.expiring(*sorted(args.expiring_between))
+    else:
+        ids = index.review_due(*sorted(args.review_due))
+    queried = time.perf_counter()
+
+    print(f"Indexed {len(index)} assignments in {(built - start) * 1000:.1f} ms"
+          + (f" ({index.inverted} expire before they are required)" if index.inverted else '')
+          + f", query matched {len(ids)} in {(queried - built) * 1000:.3f} ms")
+
+    if args.output:
+        count = write_overlay(args.output, assignments, ids)
+        print(f"Wrote {count} assignments to {args.output}")
+    else:
+        serials = assignments['agency_serial']
+        for i in ids:
+            print(f"{serials[i]}\t{format_day(index.starts[i])}\t{format_day(index.ends[i])}"
+                  f"\t{format_day(index.reviews[i])}")
+
+
+if __name__ == "__main__":
+    main()
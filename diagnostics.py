@@ -0,0 +1,157 @@
+"""
+Aggregated diagnostics for problems found in SFAF records during conversion.
+
+Instead of logging a warning per problem, the converter reports each one to a
+Diagnostics object, which counts them by category, keeps the serial numbers of
+the first few records of each category (records without one are listed as
+"record #<number>") and optionally writes every problem to a rejects file
+(JSON Lines with the record number, serial, reason and detail).
+A summary with one line per category is logged at the end of a conversion.
+Per-record messages are only formatted when DEBUG logging is enabled.
+
+Diagnostics collected in worker processes are sent back to the parent and
+combined with merge(), which renumbers their records and writes their problems
+to the parent's rejects file in input order.
+"""
+import json
+import logging
+from typing import Dict, List, Optional, TextIO, Union
+
+
+logger = logging.getLogger(__name__)
+
+# Problem category -> (description, whether the record is left out of the outputs)
+CATEGORIES = {
+    'malformed_line': ('malformed line ignored', False),
+    'missing_field': ('missing required item, record skipped', True),
+    'missing_emission_designator': ('missing EMISSION DESIGNATOR, record skipped', True),
+    'zero_frequency': ('frequency converts to 0, record skipped', True),
+    'conversion_error': ('conversion failed, record skipped', True),
+    'missing_coordinates': ('missing TX ANTENNA COORDINATES, lat/long set to 0', False),
+    'invalid_coordinates': ('invalid TX ANTENNA COORDINATES, lat/long set to 0', False),
+    'invalid_emission_designator': ('unparsable EMISSION DESIGNATOR, default bandwidth used', False),
+    'invalid_transmitter_power': ('invalid TRANSMITTER POWER, default used', False),
+    'invalid_date': ('invalid REQUIRED/EXPIRATION/REVIEW DATE, left empty', False),
+}
+# Serial numbers kept per category for the summary
+SAMPLE_SERIALS = 5
+
+
+def log_record_problem(category: str, n: int, serial: Optional[str], detail: Optional[str] = None) -> None:
+    """
+    Log one problem as a warning; used when no Diagnostics object collects them.
+
+    Takes the same arguments as Diagnostics.report().
+    """
+    description = CATEGORIES[category][0]
+    if detail is None:
+        logger.warning("Record %d (Serial: %s) - %s", n + 1, serial, description)
+    else:
+        logger.warning("Record %d (Serial: %s) - %s: %s", n + 1, serial, description, detail)
+
+
+class Diagnostics:
+    """
+    Collects the problems reported while converting records.
+
+    Args:
+        rejects: Optional open text file receiving one JSON line per problem
+        keep_events: Keep every problem in memory, so that merge() can write
+            them to another Diagnostics' rejects file (used in worker processes)
+        sample_size: Serial numbers kept per category
+
+    Attributes:
+        counts: Category -> number of problems
+        samples: Category -> distinct serial numbers of the first records with the
+            problem; the zero-based index of a record without a serial number stands in for it
+    """
+
+    def __init__(self, rejects: Optional[TextIO] = None, keep_events: bool = False,
+                 sample_size: int = SAMPLE_SERIALS):
+        self.counts: Dict[str, int] = {}
+        self.samples: Dict[str, List[Union[str, int]]] = {}
+        self.events: Optional[list] = [] if keep_events else None
+        self.rejects = rejects
+        self.sample_size = sample_size
+
+    def __getstate__(self):
+        # The rejects file stays in the process that opened it
+        state = self.__dict__.copy()
+        state['rejects'] = None
+        return state
+
+    def report(self, category: str, n: int, serial: Optional[str], detail: Optional[str] = None) -> None:
+        """
+        Record one problem.
+
+        Args:
+            category: Key of CATEGORIES
+            n: Zero-based index of the record in the input
+            serial: AGENCY SERIAL NUMBER of the record, or None if it has none
+            detail: Optional offending value or error message
+        """
+        self.counts[category] = self.counts.get(category, 0) + 1
+        samples = self.samples.setdefault(category, [])
+        sample = n if serial is None else serial
+        if len(samples) < self.sample_size and sample not in samples:
+            samples.append(sample)
+        if self.events is not None:
+            self.events.append((n, serial, category, detail))
+        if self.rejects is not None:
+            self._write_reject(n, serial, category, detail)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Record %d (Serial: %s) - %s: %s", n + 1, serial, CATEGORIES[category][0], detail)
+
+    def merge(self, other: 'Diagnostics', offset: int = 0, source: Optional[str] = None) -> None:
+        """
+        Add the problems collected by another Diagnostics object.
+
+        Args:
+            other: Diagnostics of a later part of the input, e.g. from a worker process
+            offset: Number of records before that part, added to its record numbers
+            source: Optional input file name written to the rejects file with its problems
+        """
+        for category, count in other.counts.items():
+            self.counts[category] = self.counts.get(category, 0) + count
+            samples = self.samples.setdefault(category, [])
+            for sample in other.samples.get(category, []):
+                if isinstance(sample, int):
+                    sample += offset
+                if len(samples) < self.sample_size and sample not in samples:
+                    samples.append(sample)
+        for n, serial, category, detail in other.events or ():
+            if self.events is not None:
+                self.events.append((n + offset, serial, category, detail))
+            if self.rejects is not None:
+                self._write_reject(n + offset, serial, category, detail, source)
+
+    def _write_reject(self, n: int, serial: Optional[str], category: str, detail: Optional[str],
+                      source: Optional[str] = None) -> None:
+        row = {'record': n + 1, 'serial': serial, 'reason': category, 'detail': detail,
+               'skipped': CATEGORIES[category][1]}
+        if source is not None:
+            row['file'] = source
+        self.rejects.write(json.dumps(row) + '\n')
+
+    def log_summary(self) -> None:
+        """Log one warning per category with its count and sample serial numbers."""
+        for category, (description, _) in CATEGORIES.items():
+            count = self.counts.get(category, 0)
+            if not count:
+                continue
+            serials = ', '.join(f'record #{sample + 1}' if isinstance(sample, int) else sample
+                                for sample in self.samples.get(category, []))
+            more = ', ...' if count > len(self.samples.get(category, [])) else ''
+            logger.warning("%d x %s (serials: %s%s)", count, description, serials, more)
+
+    def to_dict(self) -> Dict:
+        """JSON-serializable counts and samples, restored with from_dict()."""
+        return {'counts': self.counts, 'samples': self.samples}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Diagnostics':
+        """Rebuild the counts and samples saved by to_dict()."""
+        diagnostics = cls()
+        diagnostics.counts = dict(data.get('counts', {}))
+        diagnostics.samples = {category: list(serials) for category, serials in data.get('samples', {}).items()}
+        return diagnostics
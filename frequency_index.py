@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Frequency interval index for band overlap and co-channel conflict queries.
+
+Every converted assignment occupies center_frequency +/- bandwidth / 2. When
+the index is built from the SFAF file itself, the EXCLUDED FREQUENCY BAND
+(line 111) entries of a record are cut out of its span, which may split it
+into several segments.
+
+Segments are grouped by width class (powers of two) and sorted by start
+frequency. A span can only overlap [f1, f2] if its start lies in
+[f1 - widest span of the class, f2], so each class answers a query with two
+binary searches and a filter over a slice that is at most about twice the
+size of the result.
+
+Example:
+    python frequency_index.py export.txt --band M150 M151
+    python frequency_index.py records.json --report conflicts.csv
+"""
+import argparse
+import csv
+import logging
+import os
+import re
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import main as sfaf
+from diagnostics import Diagnostics
+from spatial_index import OVERLAY_FIELDS, load_assignments as load_converted, write_overlay
+
+
+logger = logging.getLogger(__name__)
+
+FREQUENCY_UNITS = {'K': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12}
+# Line 111 excluded band, e.g. "M225-M400" or "K14000-14350"
+EXCLUDED_BAND_PATTERN = re.compile(r"([KMGT])([0-9]+[.]?[0-9]*)-([KMGT]?)([0-9]+[.]?[0-9]*)$")
+
+# Maximum number of segment pairs materialized at once by iter_overlap_pairs
+PAIR_BLOCK_SIZE = 1 << 20
+
+REPORT_HEADER = ['agency_serial_a', 'center_frequency_a', 'bandwidth_a',
+                 'agency_serial_b', 'center_frequency_b', 'bandwidth_b',
+                 'overlap_hz', 'co_channel']
+
+
+def parse_excluded_band(value: str) -> Tuple[float, float]:
+    """
+    Convert a line 111 excluded band into Hz.
+
+    Args:
+        value: Band in SXXI format (e.g., "M225-M400"); the second unit defaults to the first
+
+    Returns:
+        Tuple of (low, high) in Hz
+
+    Raises:
+        ValueError: If the band cannot be parsed
+    """
+    matches = EXCLUDED_BAND_PATTERN.match(value.strip())
+    if not matches:
+        raise ValueError(f"Invalid excluded frequency band: {value}")
+    low = float(matches.group(2)) * FREQUENCY_UNITS[matches.group(1)]
+    high = float(matches.group(4)) * FREQUENCY_UNITS[matches.group(3) or matches.group(1)]
+    return min(low, high), max(low, high)
+
+
+def subtract_bands(low: float, high: float, excluded: Sequence[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """
+    Remove excluded bands from the span [low, high].
+
+    Returns:
+        Remaining sub-spans in ascending order (the whole span if nothing is excluded)
+    """
+    segments = [(low, high)]
+    for ex_low, ex_high in sorted(excluded):
+        remaining = []
+        for seg_low, seg_high in segments:
+            if ex_high <= seg_low or ex_low >= seg_high:
+                remaining.append((seg_low, seg_high))
+                continue
+            if ex_low > seg_low:
+                remaining.append((seg_low, ex_low))
+            if ex_high < seg_high:
+                remaining.append((ex_high, seg_high))
+        segments = remaining
+    return segments
+
+
+def _is_json_source(path: str) -> bool:
+    """Return True for a converted JSON/JSON Lines file, False for an SFAF text file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                return line.lstrip()[0] in '[{'
+    return True
+
+
+def max_station_power(stations: Sequence[Dict]) -> float:
+    """Highest converted transmitter power in Watts of a record's stations (NaN if none)."""
+    powers = [station['transmitter_power'] for station in stations
+              if isinstance(station.get('transmitter_power'), (int, float))]
+    return float(max(powers)) if powers else float('nan')
+
+
+def load_sfaf_assignments(col_file: str) -> Dict[str, np.ndarray]:
+    """
+    Convert an SFAF file and collect the assignment fields with their excluded bands.
+
+    Records are converted with main.process_record, so the same records are
+    skipped as by main.py; only the items of the CSV columns, the stations and
+    the excluded bands are parsed.
+
+    Returns:
+        Dictionary of OVERLAY_FIELDS arrays, a 'transmitter_power' array with the
+        highest station power in Watts, and an 'excluded_bands' object array
+        holding a list of (low, high) tuples per assignment
+    """
+    columns = {name: [] for name in OVERLAY_FIELDS}
+    columns['transmitter_power'] = []
+    excluded_bands = []
+    invalid = 0
+    plan = sfaf.compile_plan(['stations'])
+    diagnostics = Diagnostics()
+    records = sfaf.iter_sfaf_records(col_file, compact=True, diagnostics=diagnostics, tags=plan.tags | {'111'})
+    counts = {'processed': 0, 'skipped': 0}
+    for n, record in enumerate(records):
+        result = sfaf._process_record_counted(record, n, counts, diagnostics, plan)
+        if result is None:
+            continue
+        for name, value in zip(OVERLAY_FIELDS, result[1]):
+            columns[name].append(value)
+        columns['transmitter_power'].append(max_station_power(result[0]['stations']))
+        bands = []
+        for value in record.get('111', []):
+            try:
+                bands.append(parse_excluded_band(value))
+            except ValueError:
+                invalid += 1
+        excluded_bands.append(bands)
+    logger.info(f"Converted {counts['processed']} assignments, skipped {counts['skipped']} records of {col_file}")
+    diagnostics.log_summary()
+    if invalid:
+        logger.warning(f"Ignored {invalid} invalid excluded frequency bands in {col_file}")
+
+    arrays = {name: np.array(values, dtype=float) for name, values in columns.items() if name != 'agency_serial'}
+    arrays['agency_serial'] = np.array(columns['agency_serial'], dtype=object)
+    arrays['excluded_bands'] = np.empty(len(excluded_bands), dtype=object)
+    arrays['excluded_bands'][:] = excluded_bands
+    return arrays
+
+
+def load_assignments(path: str) -> Dict[str, np.ndarray]:
+    """
+    Load assignments from an SFAF file, records.json, JSON Lines or a columnar cache.
+
+    Only SFAF input carries excluded bands; converted output does not keep them.
+
+    Returns:
+        Dictionary of OVERLAY_FIELDS arrays, plus 'excluded_bands' for SFAF input
+    """
+    if os.path.isdir(path) or _is_json_source(path):
+        return load_converted(path)
+    return load_sfaf_assignments(path)
+
+
+def iter_sweep_pairs(lows: np.ndarray, highs: np.ndarray,
+                     block_size: int = PAIR_BLOCK_SIZE) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Sweep spans sorted by start and produce every overlapping pair.
+
+    A span overlaps exactly the later spans (in start order) that start before
+    it ends, so the partners of every span form one contiguous run found with a
+    binary search. Pairs are produced in blocks of at most block_size pairs.
+
+    Args:
+        lows: Span starts in ascending order
+        highs: Span ends
+        block_size: Maximum number of pairs held in memory at once
+
+    Yields:
+        Tuples of (i, j, overlap) arrays with i < j positions into lows/highs
+    """
+    count = len(lows)
+    positions = np.arange(1, count + 1)
+    partners = np.maximum(np.searchsorted(lows, highs, side='left'), positions) - positions
+
+    first = 0
+    while first < count:
+        # Take as many spans as fit in one block (at least one)
+        totals = np.cumsum(partners[first:])
+        last = first + max(int(np.searchsorted(totals, block_size, side='right')), 1)
+        counts = partners[first:last]
+        total = int(counts.sum())
+        if total:
+            i = np.repeat(np.arange(first, last), counts)
+            run_starts = np.repeat(np.cumsum(counts) - counts, counts)
+            j = i + 1 + (np.arange(total) - run_starts)
+            yield i, j, np.minimum(highs[i], highs[j]) - lows[j]
+        first = last
+
+
+class FrequencyIndex:
+    """
+    Sorted-endpoint index over the occupied spectrum of assignments.
+
+    Query results are indices into the arrays the index was built from.
+    Queries use closed intervals; pairs must overlap by more than zero Hz, so
+    adjacent channels that only touch are not reported.
+    """
+
+    def __init__(self, center_frequencies, bandwidths, excluded_bands: Optional[Sequence] = None):
+        """
+        Args:
+            center_frequencies: Center frequencies in Hz
+            bandwidths: Bandwidths in Hz
+            excluded_bands: Optional list of (low, high) excluded bands in Hz per assignment
+        """
+        centers = np.asarray(center_frequencies, dtype=float)
+        half = np.asarray(bandwidths, dtype=float) / 2
+        self.size = len(centers)
+        self.centers = centers
+        self.bandwidths = half * 2
+
+        lows, highs, owners = centers - half, centers + half, np.arange(self.size)
+        if excluded_bands is not None:
+            split = [i for i, bands in enumerate(excluded_bands) if bands]
+            if split:
+                keep = np.ones(self.size, dtype=bool)
+                keep[split] = False
+                extra = [(low, high, i) for i in split
+                         for low, high in subtract_bands(lows[i], highs[i], excluded_bands[i])]
+                extra = np.array(extra, dtype=float).reshape(-1, 3)
+                lows = np.concatenate([lows[keep], extra[:, 0]])
+                highs = np.concatenate([highs[keep], extra[:, 1]])
+                owners = np.concatenate([owners[keep], extra[:, 2].astype(np.int64)])
+        valid = np.isfinite(lows) & np.isfinite(highs)
+        lows, highs, owners = lows[valid], highs[valid], owners[valid]
+
+        # Assignments cut into several segments need their pairs merged
+        self.split_owners = np.bincount(owners, minlength=self.size) > 1
+
+        order = np.lexsort((highs, lows))
+        self.lows, self.highs, self.owners = lows[order], highs[order], owners[order]
+        self.by_owner = np.argsort(self.owners, kind='stable')
+
+        widths = self.highs - self.lows
+        classes = np.floor(np.log2(np.maximum(widths, 1.0))).astype(np.int64)
+        self.classes = []
+        for width_class in np.unique(classes):
+            members = np.flatnonzero(classes == width_class)
+            self.classes.append((self.lows[members], self.highs[members], self.owners[members],
+                                 float(widths[members].max())))
+
+    def __len__(self) -> int:
+        return len(self.lows)
+
+    def overlapping(self, low: float, high: float) -> np.ndarray:
+        """
+        Find assignments whose spectrum intersects [low, high].
+
+        Returns:
+            Sorted array of assignment indices
+        """
+        found = []
+        for lows, highs, owners, widest in self.classes:
+            start = np.searchsorted(lows, low - widest, side='left')
+            end = np.searchsorted(lows, high, side='right')
+            hits = highs[start:end] >= low
+            found.append(owners[start:end][hits])
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+    def _segments(self, i: int) -> np.ndarray:
+        """Positions of the segments of assignment i in the sorted arrays."""
+        start, end = np.searchsorted(self.owners[self.by_owner], [i, i + 1])
+        return self.by_owner[start:end]
+
+    def overlap_hz(self, a: int, b: int) -> float:
+        """Total overlap in Hz of the spectrum of two assignments."""
+        seg_a, seg_b = self._segments(a), self._segments(b)
+        overlap = np.minimum.outer(self.highs[seg_a], self.highs[seg_b]) - \
+            np.maximum.outer(self.lows[seg_a], self.lows[seg_b])
+        return float(np.clip(overlap, 0, None).sum())
+
+    def conflicts(self, i: int) -> np.ndarray:
+        """
+        Find the other assignments whose spectrum overlaps assignment i by more than zero Hz.
+
+        Returns:
+            Sorted array of assignment indices
+        """
+        found = [self.overlapping(self.lows[s], self.highs[s]) for s in self._segments(i)]
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        found = np.unique(np.concatenate(found))
+        return np.array([j for j in found.tolist() if j != i and self.overlap_hz(i, j) > 0], dtype=np.int64)
+
+    def iter_overlap_pairs(self, min_overlap: float = 0.0,
+                           block_size: int = PAIR_BLOCK_SIZE) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Sweep the sorted segments and report every overlapping pair of assignments.
+
+        Args:
+            min_overlap: Report only pairs overlapping by more than this many Hz
+            block_size: Maximum number of segment pairs held in memory at once
+
+        Yields:
+            Tuples of (assignment a, assignment b, overlap in Hz) arrays with a < b
+        """
+        owners = self.owners
+        split_pairs: Dict[Tuple[int, int], float] = {}
+
+        for i, j, overlap in iter_sweep_pairs(self.lows, self.highs, block_size):
+            a, b = owners[i], owners[j]
+            a, b = np.minimum(a, b), np.maximum(a, b)
+
+            split = self.split_owners[a] | self.split_owners[b]
+            if split.any():
+                for pa, pb, hz in zip(a[split].tolist(), b[split].tolist(), overlap[split].tolist()):
+                    if pa != pb:
+                        split_pairs[(pa, pb)] = split_pairs.get((pa, pb), 0.0) + hz
+                keep = ~split & (overlap > min_overlap)
+            else:
+                keep = overlap > min_overlap
+            if keep.any():
+                yield a[keep], b[keep], overlap[keep]
+
+        if split_pairs:
+            pairs = [(pa, pb, hz) for (pa, pb), hz in sorted(split_pairs.items()) if hz > min_overlap]
+            if pairs:
+                a, b, overlap = zip(*pairs)
+                yield np.array(a, dtype=np.int64), np.array(b, dtype=np.int64), np.array(overlap)
+
+
+def write_overlap_report(csv_file: str, index: FrequencyIndex, serials: Sequence,
+                         min_overlap: float = 0.0) -> int:
+    """
+    Write every overlapping pair of assignments to a CSV file.
+
+    Returns:
+        Number of pairs written
+    """
+    centers, bandwidths = index.centers, index.bandwidths
+    written = 0
+    with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(REPORT_HEADER)
+        for a, b, overlap in index.iter_overlap_pairs(min_overlap):
+            co_channel = centers[a] == centers[b]
+            writer.writerows(zip((serials[x] for x in a), centers[a].tolist(), bandwidths[a].tolist(),
+                                 (serials[x] for x in b), centers[b].tolist(), bandwidths[b].tolist(),
+                                 overlap.tolist(), co_channel.tolist()))
+            written += len(a)
+    return written
+
+
+def parse_frequency(value: str) -> float:
+    """Parse a frequency given in Hz or in SXXI notation (e.g., "M150.5") into Hz."""
+    value = value.strip()
+    if value[:1].upper() in FREQUENCY_UNITS:
+        return float(value[1:]) * FREQUENCY_UNITS[value[:1].upper()]
+    return float(value)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description='Query converted SFAF assignments by frequency and report spectrum overlaps'
+    )
+    parser.add_argument('source', help='SFAF file (uses excluded bands), records.json, JSON Lines '
+                                       'file or columnar cache directory')
+    query = parser.add_mutually_exclusive_group(required=True)
+    query.add_argument('--band', nargs=2, type=parse_frequency, metavar=('LOW', 'HIGH'),
+                       help='Assignments overlapping a band, in Hz or SXXI notation (e.g., M150 M151)')
+    query.add_argument('--report', metavar='CSV_FILE',
+                       help='Write every pair of assignments with overlapping spectrum')
+    parser.add_argument('--output', '-o', default=None,
+                       help='With --band: write the matches as an overlay CSV')
+    parser.add_argument('--min-overlap', type=float, default=0.0,
+                       help='With --report: minimum overlap in Hz (default: 0)')
+    args = parser.parse_args(argv)
+    sfaf.configure_logging()
+
+    try:
+        assignments = load_assignments(args.source)
+    except FileNotFoundError:
+        print(f"Error: File {args.source} not found")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    index = FrequencyIndex(assignments['center_frequency'], assignments['bandwidth'],
+                           assignments.get('excluded_bands'))
+    built = time.perf_counter()
+    print(f"Indexed {len(index)} segments of {index.size} assignments in {(built - start) * 1000:.1f} ms")
+
+    serials = assignments['agency_serial']
+    if args.report:
+        count = write_overlap_report(args.report, index, serials, args.min_overlap)
+        print(f"Wrote {count} overlapping pairs to {args.report} in {time.perf_counter() - built:.2f} s")
+        return
+
+    low, high = sorted(args.band)
+    ids = index.overlapping(low, high)
+    print(f"Query matched {len(ids)} in {(time.perf_counter() - built) * 1000:.3f} ms")
+    if args.output:
+        count = write_overlay(args.output, assignments, ids)
+        print(f"Wrote {count} assignments to {args.output}")
+    else:
+        for i in ids:
+            print(f"{serials[i]}\t{index.centers[i]:.0f} Hz\t{index.bandwidths[i]:.0f} Hz")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Find candidate interference pairs: assignments that are close together and
+overlap in frequency.
+
+Assignments are bucketed into a latitude/longitude grid whose cells are at
+least the search distance wide, so a pair within range is always in the same
+or an adjacent cell. Each cell is swept together with its four "forward"
+neighbours (east, and the three cells of the next row) using the sorted-span
+sweep of frequency_index, which yields only frequency-overlapping pairs; those
+are then filtered by great-circle distance. Cells are independent, so groups
+of cells are evaluated across a process pool.
+
+Every pair gets a free-space estimate of the interference each assignment
+causes the other:
+
+    P_tx [dBW] - FSPL(distance, frequency) [dB] + 10 log10(overlap / victim bandwidth)
+
+using the highest transmitter_power of the transmitting assignment's
+stations, and the pairs are ranked by the larger of the two directions.
+
+Example:
+    python interference.py records.json --distance 20 --top 500 -o candidates.csv
+"""
+import argparse
+import csv
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from main import configure_logging
+from frequency_index import (FrequencyIndex, _is_json_source, iter_sweep_pairs,
+                             load_sfaf_assignments, max_station_power)
+from spatial_index import KM_PER_DEGREE, OVERLAY_FIELDS, haversine_km, load_assignments as load_converted
+
+
+DEFAULT_TOP = 1000
+# Co-sited assignments are treated as this far apart in the path loss estimate
+MIN_DISTANCE_KM = 0.01
+# Power assumed for assignments without a converted transmitter power (as in main.py)
+DEFAULT_POWER_WATTS = 1.0
+
+REPORT_HEADER = ['rank', 'agency_serial_a', 'center_frequency_a', 'bandwidth_a',
+                 'agency_serial_b', 'center_frequency_b', 'bandwidth_b',
+                 'distance_km', 'overlap_hz', 'interference_dbw', 'victim']
+
+# Forward neighbours of a cell (row, column offsets); with the cell itself these
+# cover every adjacent cell pair exactly once
+_FORWARD_NEIGHBOURS = ((0, 1), (1, -1), (1, 0), (1, 1))
+
+# Arrays shared with worker processes, set by _init_worker()
+_shared: Dict[str, np.ndarray] = {}
+
+
+def load_assignments(path: str) -> Dict[str, np.ndarray]:
+    """
+    Load the fields used for interference analysis from any supported source.
+
+    Args:
+        path: SFAF file (excluded bands are applied), records.json, JSON Lines
+            file or columnar cache directory
+
+    Returns:
+        Dictionary of OVERLAY_FIELDS arrays and a 'transmitter_power' array
+        holding the highest station power in Watts (NaN if unknown), plus
+        'excluded_bands' for SFAF input
+    """
+    if os.path.isdir(path):
+        import columnar
+
+        assignments = load_converted(path)
+        stations = columnar.read_columns(path, ['record_index', 'transmitter_power'], columnar.STATIONS_TABLE)
+        powers = np.array([p if isinstance(p, (int, float)) else np.nan
+                           for p in stations['transmitter_power']], dtype=float)
+        power = np.full(len(assignments['latitude']), np.nan)
+        located = ~np.isnan(powers)
+        np.fmax.at(power, np.asarray(stations['record_index'])[located], powers[located])
+        assignments['transmitter_power'] = power
+        return assignments
+    if _is_json_source(path):
+        assignments = load_converted(path, OVERLAY_FIELDS + ('stations',))
+        stations = assignments.pop('stations')
+        assignments['transmitter_power'] = np.array(
+            [max_station_power(s) if isinstance(s, list) else np.nan for s in stations], dtype=float)
+        return assignments
+    return load_sfaf_assignments(path)
+
+
+def _cell_size(distance_km: float, latitudes: np.ndarray) -> Tuple[float, float]:
+    """
+    Grid cell size in degrees so that points within distance_km are in adjacent cells.
+
+    The longitude size holds at the highest latitude present; near the poles
+    it degenerates to a single column.
+    """
+    lat_size = max(distance_km / KM_PER_DEGREE, 1e-6)
+    max_lat = float(np.abs(latitudes).max()) if len(latitudes) else 0.0
+    # Widest longitude difference of two points this close at the highest latitude
+    sin_spread = math.sin(math.radians(lat_size)) / max(math.cos(math.radians(max_lat)), 1e-12)
+    lon_size = 360.0 if sin_spread >= 1 else min(math.degrees(math.asin(sin_spread)), 360.0)
+    return lat_size, max(lon_size, 1e-6)
+
+
+def _init_worker(shared: Dict[str, np.ndarray]) -> None:
+    """Process pool initializer: keep the segment and assignment arrays for the tasks."""
+    _shared.clear()
+    _shared.update(shared)
+
+
+def _score(power_dbw: np.ndarray, center: np.ndarray, victim_bw: np.ndarray,
+           distance: np.ndarray, overlap: np.ndarray) -> np.ndarray:
+    """Received interference in dBW using free-space path loss."""
+    fspl = 20 * np.log10(np.maximum(distance, MIN_DISTANCE_KM)) + 20 * np.log10(center / 1e6) + 32.44
+    fraction = np.minimum(overlap / np.where(victim_bw > 0, victim_bw, overlap), 1.0)
+    return power_dbw - fspl + 10 * np.log10(fraction)
+
+
+def _evaluate_cells(job: Tuple[List[Tuple[int, List[int]]], float, float, int]) -> Tuple[Dict[str, np.ndarray], int]:
+    """
+    Find, score and rank the candidate pairs of a group of grid cells.
+
+    Args:
+        job: Tuple of (cells, distance_km, min_overlap, top) where cells holds
+            (cell, neighbour cells) entries; top <= 0 keeps every candidate
+
+    Returns:
+        Tuple of (candidate arrays, number of frequency-overlapping pairs examined)
+    """
+    cells, distance_km, min_overlap, top = job
+    cell_starts = _shared['cell_starts']
+    lows, highs, owners = _shared['lows'], _shared['highs'], _shared['owners']
+    split_owners = _shared['split_owners']
+    lat, lon = _shared['latitude'], _shared['longitude']
+
+    parts = {name: [] for name in ('a', 'b', 'distance', 'overlap')}
+    examined = 0
+    for cell, neighbours in cells:
+        # Segments of the cell come first, then those of its forward neighbours
+        ranges = [cell] + neighbours
+        segments = np.concatenate([np.arange(cell_starts[c], cell_starts[c + 1]) for c in ranges])
+        own = cell_starts[cell + 1] - cell_starts[cell]
+        order = np.argsort(lows[segments], kind='stable')
+        segments = segments[order]
+        in_cell = order < own
+
+        pair_a, pair_b, pair_overlap = [], [], []
+        for i, j, overlap in iter_sweep_pairs(lows[segments], highs[segments]):
+            examined += len(i)
+            # Pairs between two neighbour cells belong to another cell's sweep
+            keep = (in_cell[i] | in_cell[j]) & (overlap > 0)
+            a, b = owners[segments[i[keep]]], owners[segments[j[keep]]]
+            overlap = overlap[keep]
+            distance = haversine_km(lat[a], lon[a], lat[b], lon[b])
+            near = (distance <= distance_km) & (a != b)
+            pair_a.append(np.minimum(a, b)[near])
+            pair_b.append(np.maximum(a, b)[near])
+            pair_overlap.append(overlap[near])
+        if not pair_a:
+            continue
+        a, b, overlap = np.concatenate(pair_a), np.concatenate(pair_b), np.concatenate(pair_overlap)
+
+        # Assignments split by excluded bands contribute one pair per segment pair
+        split = split_owners[a] | split_owners[b]
+        if split.any():
+            keys, inverse = np.unique(a[split] * len(split_owners) + b[split], return_inverse=True)
+            merged = np.bincount(inverse, weights=overlap[split])
+            a = np.concatenate([a[~split], keys // len(split_owners)])
+            b = np.concatenate([b[~split], keys % len(split_owners)])
+            overlap = np.concatenate([overlap[~split], merged])
+
+        keep = overlap > min_overlap
+        a, b, overlap = a[keep], b[keep], overlap[keep]
+        parts['a'].append(a)
+        parts['b'].append(b)
+        parts['overlap'].append(overlap)
+        parts['distance'].append(haversine_km(lat[a], lon[a], lat[b], lon[b]))
+
+    candidates = {name: np.concatenate(values) if values else
+                  np.zeros(0, dtype=np.int64 if name in ('a', 'b') else float)
+                  for name, values in parts.items()}
+    return _rank(candidates, top, _shared), examined
+
+
+def _rank(candidates: Dict[str, np.ndarray], top: int, shared: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Score candidate pairs in both directions and keep the top ranked, best first."""
+    a, b = candidates['a'], candidates['b']
+    power, center, bandwidth = shared['power_dbw'], shared['center_frequency'], shared['bandwidth']
+    a_to_b = _score(power[a], center[a], bandwidth[b], candidates['distance'], candidates['overlap'])
+    b_to_a = _score(power[b], center[b], bandwidth[a], candidates['distance'], candidates['overlap'])
+    candidates['score'] = np.maximum(a_to_b, b_to_a)
+    candidates['victim'] = np.where(a_to_b >= b_to_a, b, a)
+
+    order = np.lexsort((b, a, -candidates['score']))
+    if top > 0:
+        order = order[:top]
+    return {name: values[order] for name, values in candidates.items()}
+
+
+def _plan_jobs(cell_counts: np.ndarray, cell_neighbours: List[List[int]], jobs: int) -> List[List[Tuple[int, List[int]]]]:
+    """Split the non-empty cells into groups of similar estimated sweep cost."""
+    costs = np.array([cell_counts[c] * (cell_counts[c] + sum(cell_counts[n] for n in neighbours))
+                      for c, neighbours in enumerate(cell_neighbours)], dtype=float)
+    cells = [c for c in range(len(cell_counts)) if cell_counts[c]]
+    budget = max(costs.sum() / max(jobs, 1), 1.0)
+    groups, current, spent = [], [], 0.0
+    for c in cells:
+        current.append((c, cell_neighbours[c]))
+        spent += costs[c]
+        if spent >= budget:
+            groups.append(current)
+            current, spent = [], 0.0
+    if current:
+        groups.append(current)
+    return groups
+
+
+def find_candidates(assignments: Dict[str, np.ndarray], distance_km: float, min_overlap: float = 0.0,
+                    top: int = DEFAULT_TOP, workers: int = 1,
+                    counts: Optional[Dict[str, int]] = None) -> Dict[str, np.ndarray]:
+    """
+    Rank assignment pairs that are within distance_km and overlap in frequency.
+
+    Args:
+        assignments: Arrays as returned by load_assignments()
+        distance_km: Maximum great-circle distance between the two assignments
+        min_overlap: Minimum spectrum overlap in Hz
+        top: Number of candidates to keep; 0 keeps every candidate
+        workers: Number of worker processes; 1 evaluates in this process
+        counts: Optional dictionary updated with 'cells', 'jobs' and 'examined' totals
+
+    Returns:
+        Dictionary of arrays 'a', 'b' (assignment indices, a < b), 'distance' (km),
+        'overlap' (Hz), 'score' (dBW) and 'victim' (assignment index), best first
+    """
+    latitude = np.asarray(assignments['latitude'], dtype=float)
+    longitude = np.asarray(assignments['longitude'], dtype=float)
+    power = np.asarray(assignments.get('transmitter_power', np.full(len(latitude), np.nan)), dtype=float)
+    power = np.where(np.isnan(power) | (power <= 0), DEFAULT_POWER_WATTS, power)
+
+    index = FrequencyIndex(assignments['center_frequency'], assignments['bandwidth'],
+                           assignments.get('excluded_bands'))
+    lows, highs, owners = index.lows, index.highs, index.owners
+    located = np.isfinite(latitude[owners]) & np.isfinite(longitude[owners]) & \
+        ~((latitude[owners] == 0) & (longitude[owners] == 0))
+    lows, highs, owners = lows[located], highs[located], owners[located]
+
+    lat_size, lon_size = _cell_size(distance_km, latitude[owners])
+    columns = int(360 // lon_size)
+    if columns < 3:
+        # Wrapping around the antimeridian needs three distinct columns
+        columns, lon_size = 1, 360.0
+    rows = int(math.ceil(180 / lat_size)) + 1
+    row = np.floor((latitude[owners] + 90) / lat_size).astype(np.int64)
+    col = np.minimum(np.floor((longitude[owners] + 180) / lon_size).astype(np.int64), columns - 1)
+
+    # Number the non-empty cells and sort the segments by cell
+    raw_keys = row * columns + col
+    cell_keys, cell_of = np.unique(raw_keys, return_inverse=True)
+    order = np.argsort(cell_of, kind='stable')
+    lows, highs, owners, cell_of = lows[order], highs[order], owners[order], cell_of[order]
+    cell_counts = np.bincount(cell_of, minlength=len(cell_keys))
+    cell_starts = np.concatenate([[0], np.cumsum(cell_counts)])
+
+    position = {int(key): n for n, key in enumerate(cell_keys)}
+    cell_neighbours = []
+    for key in cell_keys.tolist():
+        r, c = divmod(key, columns)
+        found = []
+        for dr, dc in _FORWARD_NEIGHBOURS:
+            if r + dr >= rows or (columns == 1 and dc):
+                continue
+            n = position.get((r + dr) * columns + (c + dc) % columns)
+            if n is not None:
+                found.append(n)
+        cell_neighbours.append(found)
+
+    shared = {
+        'cell_starts': cell_starts,
+        'lows': lows, 'highs': highs, 'owners': owners, 'split_owners': index.split_owners,
+        'latitude': latitude, 'longitude': longitude, 'power_dbw': 10 * np.log10(power),
+        'center_frequency': index.centers, 'bandwidth': index.bandwidths,
+    }
+    groups = _plan_jobs(cell_counts, cell_neighbours, workers * 4 if workers > 1 else 1)
+    jobs = [(group, distance_km, min_overlap, top) for group in groups]
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared,)) as executor:
+            results = list(executor.map(_evaluate_cells, jobs))
+    else:
+        _init_worker(shared)
+        results = [_evaluate_cells(job) for job in jobs]
+        _shared.clear()
+
+    merged = {name: np.concatenate([r[name] for r, _ in results])
+              for name in ('a', 'b', 'distance', 'overlap')}
+    ranked = _rank(merged, top, shared)
+
+    if counts is not None:
+        counts['cells'] = counts.get('cells', 0) + len(cell_keys)
+        counts['jobs'] = counts.get('jobs', 0) + len(jobs)
+        counts['examined'] = counts.get('examined', 0) + sum(examined for _, examined in results)
+    return ranked
+
+
+def iter_report_rows(candidates: Dict[str, np.ndarray], assignments: Dict[str, np.ndarray]) -> Iterator[list]:
+    """Format ranked candidates as report rows (see REPORT_HEADER)."""
+    serials = assignments['agency_serial']
+    centers = np.asarray(assignments['center_frequency'], dtype=float)
+    bandwidths = np.asarray(assignments['bandwidth'], dtype=float)
+    for rank, (a, b, distance, overlap, score, victim) in enumerate(zip(
+            candidates['a'].tolist(), candidates['b'].tolist(), candidates['distance'].tolist(),
+            candidates['overlap'].tolist(), candidates['score'].tolist(), candidates['victim'].tolist()), 1):
+        yield [rank, serials[a], centers[a], bandwidths[a], serials[b], centers[b], bandwidths[b],
+               round(distance, 3), overlap, round(score, 2), serials[victim]]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description='Rank SFAF assignment pairs that are close together and overlap in frequency'
+    )
+    parser.add_argument('source', help='SFAF file (uses excluded bands), records.json, JSON Lines '
+                                       'file or columnar cache directory')
+    parser.add_argument('--distance', '-d', type=float, required=True,
+                       help='Maximum distance between the two assignments in km')
+    parser.add_argument('--min-overlap', type=float, default=0.0,
+                       help='Minimum spectrum overlap in Hz (default: 0)')
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP,
+                       help=f'Number of ranked candidates to report, 0 for all (default: {DEFAULT_TOP})')
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                       help='Number of worker processes (default: 1)')
+    parser.add_argument('--output', '-o', default=None,
+                       help='Output CSV file (default: print the candidates)')
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        print("Error: --workers must be at least 1")
+        sys.exit(1)
+    configure_logging()
+
+    try:
+        assignments = load_assignments(args.source)
+    except FileNotFoundError:
+        print(f"Error: File {args.source} not found")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    counts = {}
+    start = time.perf_counter()
+    candidates = find_candidates(assignments, args.distance, args.min_overlap, args.top, args.workers, counts)
+    elapsed = time.perf_counter() - start
+    print(f"Examined {counts['examined']} frequency-overlapping pairs in {counts['cells']} cells "
+          f"({counts['jobs']} jobs) in {elapsed:.2f} s, ranked {len(candidates['a'])} candidates")
+
+    rows = iter_report_rows(candidates, assignments)
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(REPORT_HEADER)
+            writer.writerows(rows)
+        print(f"Wrote {len(candidates['a'])} candidates to {args.output}")
+    else:
+        for row in rows:
+            print('\t'.join(str(value) for value in row))
+
+
+if __name__ == "__main__":
+    main()
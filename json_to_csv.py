@@ -1,35 +1,175 @@
 #!/usr/bin/env python3
 """
 Convert JSON output from SFAF parser to a comprehensive CSV file.
+
+The input may also be a columnar cache directory written by
+main.py --columnar-output.
 """
 import json
 import csv
 import argparse
+import os
 import sys
 
+import main as sfaf
+
+
+# Fields of the records written by main.py, used by --schema known
+SFAF_RECORD_FIELDS = tuple(sfaf.OUTPUT_FIELDS)
+
+# Characters read from the input at a time by iter_json_array
+READ_SIZE = 1 << 16
+
+
+def iter_json_array(fp, read_size=READ_SIZE):
+    """
+    Incrementally decode the elements of a top-level JSON array.
+
+    Only the element being decoded and one read buffer are held in memory.
+
+    Args:
+        fp: Text file positioned at the start of the array
+        read_size: Number of characters to read at a time
+
+    Yields:
+        Decoded array elements in order
 
-def json_to_csv(json_file, csv_file):
+    Raises:
+        json.JSONDecodeError: If the input is not a JSON array
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+    expect = '['
+
+    while True:
+        # Drop consumed text and skip whitespace, reading more input as needed
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            chunk = fp.read(read_size)
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+        if pos >= len(buffer):
+            raise json.JSONDecodeError("Unexpected end of JSON array", buffer, pos)
+
+        char = buffer[pos]
+        if expect == '[':
+            if char != '[':
+                raise json.JSONDecodeError("Expecting '['", buffer, pos)
+            pos += 1
+            expect = 'first'
+            continue
+        if expect in ('first', 'next') and char == ']':
+            return
+        if expect == 'next':
+            if char != ',':
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+            pos += 1
+            expect = 'value'
+            continue
+
+        # Decode one element; an element at the end of the buffer may be truncated
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                if end < len(buffer) or eof:
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            chunk = fp.read(read_size)
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+        pos = end
+        expect = 'next'
+        yield value
+
+
+def iter_json_lines(fp):
+    """
+    Decode JSON Lines input, one record per non-blank line.
+
+    Args:
+        fp: Text file of JSON Lines
+
+    Yields:
+        Decoded records in order
+    """
+    for line in fp:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_json_records(json_file):
+    """
+    Stream the records of a JSON array or JSON Lines file.
+
+    The format is detected from the first non-whitespace character: '[' for a
+    JSON array, anything else is read as JSON Lines.
+
+    Args:
+        json_file: Path to the input file
+
+    Yields:
+        Record dictionaries in file order
+    """
+    with open(json_file, 'r', encoding='utf-8') as f:
+        first = ''
+        while True:
+            char = f.read(1)
+            if not char or not char.isspace():
+                first = char
+                break
+        f.seek(0)
+        if first == '[':
+            yield from iter_json_array(f)
+        else:
+            yield from iter_json_lines(f)
+
+
+def json_to_csv(json_file, csv_file, schema='auto'):
     """
     Convert JSON file to CSV with all fields.
+
+    Records are streamed, so memory use is bounded by the largest record.
     
     Args:
-        json_file: Path to input JSON file
+        json_file: Path to input JSON array, JSON Lines file or columnar cache directory
         csv_file: Path to output CSV file
+        schema: 'auto' to collect the columns in a first pass over the input that
+            keeps only the keys, or 'known' to use SFAF_RECORD_FIELDS and convert
+            in a single pass (other keys are dropped)
     """
     try:
-        # Read JSON data
-        with open(json_file, 'r') as f:
-            data = json.load(f)
-        
-        if not data:
+        record_count = None
+        if os.path.isdir(json_file):
+            # Columnar cache: column names come from its index, rows are rebuilt lazily
+            import columnar
+
+            meta = columnar.read_meta(json_file)
+            record_count = meta['tables'][columnar.RECORDS_TABLE]['rows']
+            all_keys = {name for name, _ in meta['tables'][columnar.RECORDS_TABLE]['columns']}
+            if columnar.has_record_stations(meta):
+                all_keys.add(columnar.STATIONS_TABLE)
+            data = columnar.iter_records(json_file)
+        elif schema == 'known':
+            all_keys = set(SFAF_RECORD_FIELDS)
+            data = iter_json_records(json_file)
+        else:
+            # First pass: get all unique keys from all records, discarding the values
+            all_keys = set()
+            record_count = 0
+            for record in iter_json_records(json_file):
+                all_keys.update(record.keys())
+                record_count += 1
+            data = iter_json_records(json_file)
+
+        if record_count == 0:
             print(f"Warning: {json_file} is empty or contains no records")
             return
         
-        # Get all unique keys from all records
-        all_keys = set()
-        for record in data:
-            all_keys.update(record.keys())
-        
         # Remove 'name' field if present
         all_keys.discard('name')
         
@@ -38,9 +178,10 @@ def json_to_csv(json_file, csv_file):
         
         # Write CSV
         with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore' if schema == 'known' else 'raise')
             writer.writeheader()
             
+            written = 0
             for record in data:
                 # Remove 'name' field from record
                 record.pop('name', None)
@@ -57,8 +198,11 @@ def json_to_csv(json_file, csv_file):
                 if 'stations' in record and isinstance(record['stations'], list):
                     record['stations'] = str(record['stations'])
                 writer.writerow(record)
-        
-        print(f"Successfully converted {len(data)} records from {json_file} to {csv_file}")
+                written += 1
+
+        if written == 0:
+            print(f"Warning: {json_file} is empty or contains no records")
+        print(f"Successfully converted {written} records from {json_file} to {csv_file}")
         print(f"CSV contains {len(fieldnames)} columns: {', '.join(fieldnames[:5])}...")
         
     except FileNotFoundError:
@@ -76,9 +220,12 @@ def main():
     parser = argparse.ArgumentParser(
         description='Convert SFAF JSON output to comprehensive CSV format'
     )
-    parser.add_argument('json_file', help='Input JSON file')
+    parser.add_argument('json_file', help='Input JSON array, JSON Lines file or columnar cache directory')
     parser.add_argument('--output', '-o', default=None,
                        help='Output CSV file (default: same name as JSON with .csv extension)')
+    parser.add_argument('--schema', choices=['auto', 'known'], default='auto',
+                       help='Column discovery: auto scans the input for keys first, known uses '
+                            'the main.py record fields and converts in one pass (default: auto)')
     
     args = parser.parse_args()
     
@@ -88,7 +235,7 @@ def main():
     else:
         csv_file = args.json_file.rsplit('.', 1)[0] + '_full.csv'
     
-    json_to_csv(args.json_file, csv_file)
+    json_to_csv(args.json_file, csv_file, args.schema)
 
 
 if __name__ == "__main__":
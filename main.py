@@ -1,4 +1,3 @@
-import pandas
 import re
 import json
 import itertools
@@ -6,139 +5,593 @@ import csv
 import argparse
 import sys
 import logging
-from typing import List, Dict, Tuple, Optional
+import io
+import os
+import collections
+import concurrent.futures
+import contextlib
+import functools
+import glob
+import hashlib
+import time
+from typing import List, Dict, Tuple, Optional, NamedTuple, Iterable, Iterator, FrozenSet
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from diagnostics import Diagnostics, log_record_problem
+
+# Logging is configured by configure_logging() when run as a script, not on import
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
 logger = logging.getLogger(__name__)
 
 
-def col_import(col_file: str) -> List[Dict[str, str]]:
+# SFAF 1-column lines are "TTT.     value": a 3-digit item tag, a period and five spaces
+SFAF_SEPARATOR = '.     '
+RECORD_START_TAG = '005'
+RECORD_END_TAG = '924'
+# Upper bound on the size of the byte ranges handed to worker processes
+PARALLEL_CHUNK_BYTES = 32 * 1024 * 1024
+# Bytes of a memory-mapped file split into lines at a time by iter_mapped_lines()
+MMAP_BLOCK_BYTES = 4 * 1024 * 1024
+# Ends every serialized record in the JSON parts of a merged batch; JSON text never contains it unescaped
+JSON_PART_SEPARATOR = '\x1e'
+
+# Line 110 frequency and line 114 emission designator formats
+LINE_110_PATTERN = re.compile(
+    "([KMGT])([0-9]{1,6}[.]?[0-9]{0,4})(-?)([KMGT]?)([0-9]{0,6}[.]?[0-9]{0,4})([(]?)"
+    "([0-9]{0,6}[.]?[0-9]{0,4})([)]?)")
+LINE_114_PATTERN = re.compile("([0-9]{1,3})([HKMG])([0-9]{0,2})([A-Z])([0-9])([A-Z])")
+# Number after the W/K unit of a line 115 power: a plain decimal, so float() spellings
+# such as "nan", "inf" or "1_0" are rejected by both the scalar and the batch converters
+POWER_NUMBER_PATTERN = re.compile("[+-]?([0-9]+[.]?[0-9]*|[.][0-9]+)([eE][+-]?[0-9]+)?")
+# Bandwidth assumed when an emission designator cannot be parsed
+DEFAULT_BANDWIDTH = 10000.0
+# Number of distinct raw strings memoized by each decode cache
+DECODE_CACHE_SIZE = 4096
+# Days in each month of a non-leap year, for validating SXXI dates
+DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+# Format version of the --incremental state file; bump when conversion output changes
+INCREMENTAL_STATE_VERSION = 4
+# Output formats of the JSON file
+JSON_FORMATS = ('pretty', 'compact', 'jsonl')
+# Pipeline stages timed by --stats, and the converters whose calls it counts
+STATS_STAGES = ('parse', 'convert', 'write_json', 'write_csv', 'write_columnar')
+INSTRUMENTED_CONVERTERS = ('convert_dms_to_dd', 'convert_frequency', 'convert_emission_designator',
+                           'convert_power', 'convert_date')
+# Format version of the --stats-json metrics
+STATS_VERSION = 1
+# Items read from raw records by scan_sfaf_versions(): TYPE OF ACTION, AGENCY SERIAL NUMBER
+# and the REQUIRED, EXPIRATION and REVIEW DATEs
+VERSION_TAGS = ('010', '102', '140', '141', '142')
+# TYPE OF ACTION precedence between versions of an assignment with the same dates;
+# other actions (e.g. N, new) rank lowest
+ACTION_PRECEDENCE = {'R': 1, 'M': 2, 'D': 3}
+# Bytes of the hash identifying exact duplicate records
+RECORD_DIGEST_BYTES = 8
+# Record boundary lines in raw SFAF bytes, found by the line break before them;
+# the CR variant is only used for files with CR line breaks
+_BOUNDARY_PATTERN = rb'%s(' + RECORD_START_TAG.encode() + rb'|' + RECORD_END_TAG.encode() + rb')'
+_RECORD_BOUNDARY = re.compile(_BOUNDARY_PATTERN % rb'\n')
+_RECORD_BOUNDARY_CR = re.compile(_BOUNDARY_PATTERN % rb'[\r\n]')
+_VERSION_TAG_LINES = tuple(b'\n' + tag.encode() for tag in VERSION_TAGS)
+
+
+def configure_logging(verbose: bool = False) -> None:
     """
-    Parse SFAF 1-column file and return list of dictionaries.
-    
+    Send log messages to stderr in the converter's format.
+
+    Called by the command line entry points; importing this module leaves the
+    logging configuration of the host application alone.
+
     Args:
-        col_file: Path to the SFAF 1-column format file
-        
+        verbose: Log DEBUG messages as well
+    """
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    if verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+
+
+class FieldSpec(NamedTuple):
+    """
+    Parsing rule for a single SFAF item.
+
+    Attributes:
+        name: Key used for the item in the parsed record dictionary
+        repeatable: True if the item may occur several times per record, in which
+            case keys are suffixed with a two digit occurrence number ("NAME[01]")
+        slot: Index of the per-record occurrence counter for repeatable items,
+            None for single-valued items
+        index: Position of the item in SfafRecord.values
+    """
+    name: str
+    repeatable: bool = False
+    slot: Optional[int] = None
+    index: int = 0
+
+
+# Dispatch table of SFAF item tag -> FieldSpec, consulted once per line by col_import
+SFAF_FIELDS: Dict[str, FieldSpec] = {}
+# Bumped by every register_sfaf_field() call, so cached dispatch tables are rebuilt
+_registry_generation = 0
+
+
+def register_sfaf_field(tag: str, name: str, repeatable: bool = False) -> FieldSpec:
+    """
+    Register (or replace) the parsing rule for an SFAF item.
+
+    Args:
+        tag: 3-digit SFAF item number (e.g., "110")
+        name: Key to store the item value under
+        repeatable: Whether the item may occur several times in one record
+
     Returns:
-        List of dictionaries containing parsed SFAF data
-        
+        The FieldSpec stored in SFAF_FIELDS
+
+    Raises:
+        ValueError: If the tag is not a 3-digit item number or is a record delimiter
+    """
+    if len(tag) != 3 or not tag.isdigit():
+        raise ValueError(f"Invalid SFAF tag: {tag!r}")
+    if tag in (RECORD_START_TAG, RECORD_END_TAG):
+        raise ValueError(f"SFAF tag {tag} is a record delimiter and cannot be registered")
+
+    existing = SFAF_FIELDS.get(tag)
+    slot = None
+    if repeatable:
+        if existing is not None and existing.slot is not None:
+            slot = existing.slot
+        else:
+            slot = sum(1 for spec in SFAF_FIELDS.values() if spec.slot is not None)
+    index = existing.index if existing is not None else len(SFAF_FIELDS)
+    spec = FieldSpec(name, repeatable, slot, index)
+    SFAF_FIELDS[tag] = spec
+    global _registry_generation
+    _registry_generation += 1
+    return spec
+
+
+@functools.lru_cache(maxsize=1024)
+def _occurrence_keys(name: str, count: int) -> Tuple[str, ...]:
+    """Dictionary keys of the first count occurrences of a repeatable item, e.g. "STATION CLASS[01]"."""
+    return tuple(f'{name}[{n:02d}]' for n in range(1, count + 1))
+
+
+class SfafRecord:
+    """
+    Parsed SFAF record held as a list of values instead of a dictionary.
+
+    values[spec.index] holds the value of each registered item: a string for
+    single-valued items, a list of strings in input order for repeatable items,
+    or None if the item is absent. Occurrence-numbered keys such as
+    "TRANSMITTER POWER[02]" are only built by to_dict().
+    """
+    __slots__ = ('values',)
+
+    def __init__(self, values: Optional[list] = None):
+        self.values = values if values is not None else [None] * len(SFAF_FIELDS)
+
+    def get(self, tag: str, default=None):
+        """
+        Return the value of an item: a string, a list of strings for repeatable
+        items, or default if the item is absent.
+        """
+        index = SFAF_FIELDS[tag].index
+        value = self.values[index] if index < len(self.values) else None
+        return default if value is None else value
+
+    def to_dict(self) -> Dict[str, str]:
+        """
+        Return the record in the dictionary layout of iter_sfaf_records().
+
+        Keys are in registration order rather than input order.
+        """
+        record = {}
+        # SFAF_FIELDS is in index order: replacing an item keeps its position and index
+        for spec, value in zip(SFAF_FIELDS.values(), self.values):
+            if value is None:
+                continue
+            if isinstance(value, list):
+                record.update(zip(_occurrence_keys(spec.name, len(value)), value))
+            else:
+                record[spec.name] = value
+        return record
+
+    @classmethod
+    def from_dict(cls, record: Dict[str, str]) -> 'SfafRecord':
+        """
+        Build a record from the dictionary layout of iter_sfaf_records().
+
+        Occurrences of repeatable items are kept in key order; missing values
+        (NaN, e.g. from a pandas DataFrame) and unregistered keys are dropped.
+        """
+        specs = {spec.name: spec for spec in SFAF_FIELDS.values()}
+        values = [None] * len(SFAF_FIELDS)
+        for key, value in record.items():
+            if str(value) == 'nan':
+                continue
+            spec = specs.get(key)
+            if spec is None and key.endswith(']'):
+                spec = specs.get(key[:key.rfind('[')])
+                if spec is None or not spec.repeatable:
+                    continue
+                if values[spec.index] is None:
+                    values[spec.index] = [value]
+                else:
+                    values[spec.index].append(value)
+            elif spec is not None and not spec.repeatable:
+                values[spec.index] = value
+        return cls(values)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, SfafRecord):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f'SfafRecord({self.to_dict()!r})'
+
+
+for _tag, _name, _repeatable in (
+        ('010', 'TYPE OF ACTION', False),
+        ('102', 'AGENCY SERIAL NUMBER', False),
+        ('105', 'LIST SERIAL NUMBER', False),
+        ('110', 'FREQUENCY', False),
+        ('111', 'EXCLUDED FREQUENCY BAND', True),
+        ('113', 'STATION CLASS', True),
+        ('114', 'EMISSION DESIGNATOR', True),
+        ('115', 'TRANSMITTER POWER', True),
+        ('117', 'EFFECTIVE RADIATED POWER', True),
+        ('140', 'REQUIRED DATE (YYYYMMDD)', False),
+        ('141', 'EXPIRATION DATE (YYYYMMDD)', False),
+        ('142', 'REVIEW DATE (YYYYMMDD)', False),
+        ('200', 'AGENCY', False),
+        ('203', 'BUREAU', False),
+        ('204', 'COMMAND', False),
+        ('205', 'SUBCOMMAND', False),
+        ('206', 'INSTALLATION FREQUENCY MANAGER', False),
+        ('207', 'OPERATING UNIT', True),
+        ('208', 'USER NET/CODE', True),
+        ('303', 'TX ANTENNA COORDINATES', False),
+        ('306', 'TX AUTHORIZED RADIUS', False),
+        ('340', 'EQUIPMENT NOMENCLATURE', False),
+        ('346', 'PULSE DURATION', False),
+        ('347', 'PULSE REPETITION RATE', False),
+        ('357', 'ANTENNA GAIN', False),
+        ('359', 'TX ANTENNA FEEDPOINT HEIGHT', False),
+        ('511', 'MAJOR FUNCTION IDENTIFIER', False),
+        ('512', 'INTERMEDIATE FUNCTION IDENTIFIER', False)):
+    register_sfaf_field(_tag, _name, _repeatable)
+del _tag, _name, _repeatable
+
+
+def iter_sfaf_lines(lines: Iterable[str], diagnostics: Optional[Diagnostics] = None,
+                    tags: Optional[Iterable[str]] = None) -> Iterator[Dict[str, str]]:
+    """
+    Parse SFAF 1-column lines and yield one dictionary per record.
+
+    The records are those of iter_sfaf_line_records(), in the dictionary
+    layout of SfafRecord.to_dict().
+
+    Args:
+        lines: Iterable of SFAF 1-column lines (e.g., an open text file)
+        diagnostics: Optional Diagnostics receiving malformed lines (see iter_sfaf_line_records())
+        tags: Optional SFAF items to extract (see iter_sfaf_line_records())
+
+    Yields:
+        Dictionaries containing parsed SFAF data, in input order
+    """
+    for record in _iter_records(lines, False, diagnostics, tags):
+        yield record.to_dict()
+
+
+def _select_fields(tags: Iterable[str], ignored: object) -> Dict:
+    """SFAF_FIELDS with the entries of items not in tags replaced by ignored, for the parsers' tags argument."""
+    tags = set(tags)
+    return {tag: spec if tag in tags else ignored for tag, spec in SFAF_FIELDS.items()}
+
+
+# Dispatch table entries of the record delimiters and of registered items left out by a parser's tags
+_RECORD_START, _RECORD_END, _IGNORED = object(), object(), object()
+
+
+@functools.lru_cache(maxsize=32)
+def _dispatch_table(tags: Optional[FrozenSet[str]], encoded: bool, generation: int) -> Dict:
+    """
+    Line tag -> FieldSpec or delimiter sentinel, shared by all runs of _iter_records() with the same tags.
+
+    generation is _registry_generation, so that registering or replacing an
+    item builds new tables. The tables are never modified after they are built.
+    """
+    fields = SFAF_FIELDS if tags is None else _select_fields(tags, _IGNORED)
+    fields = dict(fields)
+    fields[RECORD_START_TAG] = _RECORD_START
+    fields[RECORD_END_TAG] = _RECORD_END
+    if encoded:
+        fields = {tag.encode(): spec for tag, spec in fields.items()}
+    return fields
+
+
+def _report_malformed_lines(diagnostics: Diagnostics, n: int, serial: Optional[str], lines: List[str]) -> None:
+    """Report the malformed lines of record n, collected by the parsers while it was assembled."""
+    for line in lines:
+        diagnostics.report('malformed_line', n, serial, line)
+
+
+def count_sfaf_tags(lines: Iterable[str], counts: Dict[str, int]) -> Iterator[str]:
+    """
+    Pass lines through while counting them by tag under 'tag_<TTT>' keys of counts.
+
+    Every line is counted, including delimiters and tags that are not registered.
+    Lines may be str or bytes.
+    """
+    for line in lines:
+        tag = line[:3]
+        key = 'tag_' + (tag if isinstance(tag, str) else tag.decode('utf-8', 'replace'))
+        counts[key] = counts.get(key, 0) + 1
+        yield line
+
+
+def iter_sfaf_records(col_file: str, tag_counts: Optional[Dict[str, int]] = None,
+                      compact: bool = False, diagnostics: Optional[Diagnostics] = None,
+                      tags: Optional[Iterable[str]] = None) -> Iterator:
+    """
+    Lazily parse an SFAF 1-column file, yielding one record dictionary at a time.
+
+    Only the record being assembled is held in memory, so memory use does not
+    grow with the size of the file.
+
+    Args:
+        col_file: Path to the SFAF 1-column format file
+        tag_counts: Optional dictionary updated with the number of lines of each
+            tag (see count_sfaf_tags())
+        compact: Yield SfafRecord objects instead of dictionaries
+        diagnostics: Optional Diagnostics receiving malformed lines
+        tags: Optional SFAF items to extract, e.g. ConversionPlan.tags; others are
+            skipped without being split
+
+    Yields:
+        Dictionaries (SfafRecord objects if compact) containing parsed SFAF data,
+        in file order
+
     Raises:
         FileNotFoundError: If the input file doesn't exist
         ValueError: If the file format is invalid
     """
-    list_of_dict = []
     count_of_items = 0
-
     try:
         with open(col_file, 'r', encoding='utf-8') as sfaf1col:
+            lines = sfaf1col if tag_counts is None else count_sfaf_tags(sfaf1col, tag_counts)
+            for data_dict in (iter_sfaf_line_records if compact else iter_sfaf_lines)(lines, diagnostics, tags):
+                count_of_items += 1
+                yield data_dict
+    except FileNotFoundError:
+        logger.error(f"File not found: {col_file}")
+        raise
+    except Exception as e:
+        logger.error(f"Error reading file {col_file}: {e}")
+        raise ValueError(f"Invalid file format: {e}")
+
+    logger.info(f"Successfully parsed {count_of_items} SFAF records from {col_file}")
+
+
+def iter_mapped_lines(buffer, start: int = 0, end: Optional[int] = None,
+                      block_size: int = MMAP_BLOCK_BYTES) -> Iterator[bytes]:
+    """
+    Iterate over the lines of a byte buffer (e.g. an mmap) between two offsets.
+
+    The buffer is split a block at a time, cut at the last line break of each
+    block, so only one block of lines exists at once. Lines end at \\n, \\r or
+    \\r\\n like in text mode and are yielded without their line break.
+
+    Args:
+        buffer: bytes-like object supporting find/rfind and slicing
+        start: Offset of the first line
+        end: Offset after the last line, the end of the buffer if None
+        block_size: Approximate number of bytes split at a time
+
+    Returns:
+        Iterator of lines as bytes
+    """
+    if end is None:
+        end = len(buffer)
+    return itertools.chain.from_iterable(_iter_mapped_blocks(buffer, start, end, block_size))
+
+
+def _iter_mapped_blocks(buffer, start: int, end: int, block_size: int) -> Iterator[List[bytes]]:
+    """Split buffer[start:end] into lists of lines of about block_size bytes for iter_mapped_lines()."""
+    while start < end:
+        stop = min(start + block_size, end)
+        if stop < end:
+            newline = buffer.rfind(b'\n', start, stop)
+            if newline < 0:
+                newline = buffer.find(b'\n', stop, end)
+            stop = end if newline < 0 else newline + 1
+        yield buffer[start:stop].splitlines()
+        start = stop
+
+
+def iter_sfaf_line_records(lines: Iterable[str], diagnostics: Optional[Diagnostics] = None,
+                           tags: Optional[Iterable[str]] = None) -> Iterator[SfafRecord]:
+    """
+    Parse SFAF 1-column lines into SfafRecord objects.
+
+    Each line is dispatched on its 3-digit tag through SFAF_FIELDS; lines with
+    unregistered tags are ignored. A record ends at a 924 line, at the next 005
+    line or at the end of the input. A 924 line outside any record yields the
+    last record ended by a 924 line again, or an empty record if there is none
+    (see scan_sfaf_versions(), which follows the same rules).
+
+    Args:
+        lines: Iterable of SFAF 1-column lines (e.g., an open text file)
+        diagnostics: Optional Diagnostics receiving malformed lines, reported
+            when their record is complete; they are logged as warnings otherwise
+        tags: Optional SFAF items to extract (e.g. ConversionPlan.tags); lines
+            of other items are ignored like unregistered tags
+
+    Yields:
+        SfafRecord objects, in input order
+    """
+    return _iter_records(lines, False, diagnostics, tags)
+
+
+def iter_sfaf_byte_records(lines: Iterable[bytes], diagnostics: Optional[Diagnostics] = None,
+                           tags: Optional[Iterable[str]] = None) -> Iterator[SfafRecord]:
+    """
+    Parse SFAF 1-column lines given as bytes into SfafRecord objects.
+
+    Lines with unregistered tags are skipped without being split or decoded,
+    and only the values that are stored are decoded from UTF-8.
+
+    Args:
+        lines: Iterable of SFAF 1-column lines as bytes (e.g. from iter_mapped_lines())
+        diagnostics: Optional Diagnostics receiving malformed lines (see iter_sfaf_line_records())
+        tags: Optional SFAF items to extract (see iter_sfaf_line_records())
+
+    Yields:
+        SfafRecord objects, in input order
+    """
+    return _iter_records(lines, True, diagnostics, tags)
+
+
+def _iter_records(lines: Iterable, encoded: bool, diagnostics: Optional[Diagnostics],
+                  tags: Optional[Iterable[str]] = None) -> Iterator[SfafRecord]:
+    """
+    Record assembly shared by all SFAF parsers (see iter_sfaf_line_records()).
+
+    Each line costs a single dispatch table lookup on its tag.
+    """
+    record_start, record_end, ignored = _RECORD_START, _RECORD_END, _IGNORED
+    get_spec = _dispatch_table(None if tags is None else frozenset(tags), encoded,
+                               _registry_generation).get
+    separator = SFAF_SEPARATOR.encode() if encoded else SFAF_SEPARATOR
+    size = len(SFAF_FIELDS)
+    serial_index = SFAF_FIELDS['102'].index
+    parse = False
+    values = [None] * size
+    n = 0
+    malformed = []
+    # A record of ignored items still counts as a record, as if they were parsed
+    ignored_items = False
+    for line in lines:
+        spec = get_spec(line[:3])
+        if spec is None:
+            continue
+        if spec is record_start:
+            if parse and (ignored_items or any(value is not None for value in values)):
+                if malformed:
+                    _report_malformed_lines(diagnostics, n, values[serial_index], malformed)
+                yield SfafRecord(values)
+                n += 1
+                logger.debug("Yielded record (implicit terminator)")
+            values = [None] * size
+            malformed = []
+            ignored_items = False
+            parse = True
+        elif spec is record_end:
             parse = False
-            data_dict = {}
-            for line in sfaf1col:
-                if line.startswith('005'):
-                    if parse and data_dict:
-                        list_of_dict.append(data_dict)
-                        logger.debug(f"Added record {len(list_of_dict)} to list (implicit terminator)")
-                    data_dict = {}
-                    exclude_n = 1
-                    station_class_n = 1
-                    transmitter_power_n = 1
-                    emission_designator_n = 1
-                    erp_n = 1
-                    user_net_code_n = 1
-                    operating_unit_n = 1
+            if malformed:
+                _report_malformed_lines(diagnostics, n, values[serial_index], malformed)
+                malformed = []
+            yield SfafRecord(values)
+            n += 1
+        elif spec is ignored:
+            ignored_items = True
+        elif parse:
+            try:
+                value = line.split(separator, 2)[1]
+            except IndexError:
+                text = (line.decode('utf-8', 'replace') if encoded else line).strip()
+                if diagnostics is None:
+                    logger.warning("Failed to parse line: %s", text)
+                else:
+                    malformed.append(text)
+                continue
+            value = value.decode('utf-8').strip() if encoded else value.strip()
+            if spec.repeatable:
+                occurrences = values[spec.index]
+                if occurrences is None:
+                    values[spec.index] = [value]
+                else:
+                    occurrences.append(value)
+            else:
+                values[spec.index] = value
+
+    if parse and (ignored_items or any(value is not None for value in values)):
+        if malformed:
+            _report_malformed_lines(diagnostics, n, values[serial_index], malformed)
+        yield SfafRecord(values)
+        logger.debug("Yielded record (end of file)")
+
+
+def iter_sfaf_records_mmap(col_file: str, tag_counts: Optional[Dict[str, int]] = None,
+                           compact: bool = False, diagnostics: Optional[Diagnostics] = None,
+                           tags: Optional[Iterable[str]] = None) -> Iterator:
+    """
+    Parse an SFAF 1-column file through a memory map, yielding the same records as iter_sfaf_records().
+
+    The file is read as bytes (see iter_sfaf_byte_records()) instead of being
+    decoded line by line, and pages are loaded by the operating system as the
+    parser reaches them. Invalid UTF-8 is only detected in stored values.
+
+    Args:
+        col_file: Path to the SFAF 1-column format file
+        tag_counts: Optional dictionary updated with the number of lines of each tag
+        compact: Yield SfafRecord objects instead of dictionaries
+        diagnostics: Optional Diagnostics receiving malformed lines
+        tags: Optional SFAF items to extract, e.g. ConversionPlan.tags
+
+    Yields:
+        Dictionaries (SfafRecord objects if compact) containing parsed SFAF data,
+        in file order
+
+    Raises:
+        FileNotFoundError: If the input file doesn't exist
+        ValueError: If the file format is invalid
+    """
+    import mmap
+
+    count_of_items = 0
+    try:
+        with open(col_file, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                buffer = b''
+            else:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                lines = iter_mapped_lines(buffer)
+                if tag_counts is not None:
+                    lines = count_sfaf_tags(lines, tag_counts)
+                for record in iter_sfaf_byte_records(lines, diagnostics, tags):
                     count_of_items += 1
-                    parse = True
-                    continue
-                elif line.startswith('924'):
-                    parse = False
-                    list_of_dict.append(data_dict)
-                    logger.debug(f"Added record {len(list_of_dict)} to list")
-                elif parse:
-                    try:
-                        if line.startswith('010'):
-                            data_dict['TYPE OF ACTION'] = line.split('.     ')[1].strip()
-                        if line.startswith('102'):
-                            data_dict['AGENCY SERIAL NUMBER'] = line.split('.     ')[1].strip()
-                        if line.startswith('105'):
-                            data_dict['LIST SERIAL NUMBER'] = line.split('.     ')[1].strip()
-                        if line.startswith('110'):
-                            data_dict['FREQUENCY'] = line.split('.     ')[1].strip()
-                        if line.startswith('111'):
-                            data_dict[f'EXCLUDED FREQUENCY BAND[{"{0:0=2d}".format(station_class_n)}]'] = line.split('.     ')[
-                                1].strip()
-                            exclude_n += 1
-                        if line.startswith('113'):
-                            data_dict[f'STATION CLASS[{"{0:0=2d}".format(station_class_n)}]'] = line.split('.     ')[1].strip()
-                            station_class_n += 1
-                        if line.startswith('114'):
-                            data_dict[f'EMISSION DESIGNATOR[{"{0:0=2d}".format(emission_designator_n)}]'] = \
-                                line.split('.     ')[1].strip()
-                            emission_designator_n += 1
-                        if line.startswith('115'):
-                            data_dict[f'TRANSMITTER POWER[{"{0:0=2d}".format(transmitter_power_n)}]'] = line.split('.     ')[
-                                1].strip()
-                            transmitter_power_n += 1
-                        if line.startswith('117'):
-                            data_dict[f'EFFECTIVE RADIATED POWER[{"{0:0=2d}".format(erp_n)}]'] = line.split('.     ')[1].strip()
-                            erp_n += 1
-                        if line.startswith('140'):
-                            data_dict['REQUIRED DATE (YYYYMMDD)'] = line.split('.     ')[1].strip()
-                        if line.startswith('141'):
-                            data_dict['EXPIRATION DATE (YYYYMMDD)'] = line.split('.     ')[1].strip()
-                        if line.startswith('142'):
-                            data_dict['REVIEW DATE (YYYYMMDD)'] = line.split('.     ')[1].strip()
-                        if line.startswith('200'):
-                            data_dict['AGENCY'] = line.split('.     ')[1].strip()
-                        if line.startswith('203'):
-                            data_dict['BUREAU'] = line.split('.     ')[1].strip()
-                        if line.startswith('204'):
-                            data_dict['COMMAND'] = line.split('.     ')[1].strip()
-                        if line.startswith('205'):
-                            data_dict['SUBCOMMAND'] = line.split('.     ')[1].strip()
-                        if line.startswith('206'):
-                            data_dict['INSTALLATION FREQUENCY MANAGER'] = line.split('.     ')[1].strip()
-                        if line.startswith('207'):
-                            data_dict[f'OPERATING UNIT[{"{0:0=2d}".format(operating_unit_n)}]'] = line.split('.     ')[
-                                1].strip()
-                            operating_unit_n += 1
-                        if line.startswith('208'):
-                            data_dict[f'USER NET/CODE[{"{0:0=2d}".format(user_net_code_n)}]'] = line.split('.     ')[1].strip()
-                            user_net_code_n += 1
-                        if line.startswith('303'):
-                            data_dict['TX ANTENNA COORDINATES'] = line.split('.     ')[1].strip()
-                        if line.startswith('306'):
-                            data_dict['TX AUTHORIZED RADIUS'] = line.split('.     ')[1].strip()
-                        if  line.startswith('340'):
-                            data_dict['EQUIPMENT NOMENCLATURE'] = line.split('.     ')[1].strip()
-                        if line.startswith('346'):
-                            data_dict['PULSE DURATION'] = line.split('.     ')[1].strip()
-                        if line.startswith('347'):
-                            data_dict['PULSE REPETITION RATE'] = line.split('.     ')[1].strip()
-                        if line.startswith('357'):
-                            data_dict['ANTENNA GAIN'] = line.split('.     ')[1].strip()
-                        if line.startswith('359'):
-                            data_dict['TX ANTENNA FEEDPOINT HEIGHT'] = line.split('.     ')[1].strip()
-                        if line.startswith('511'):
-                            data_dict['MAJOR FUNCTION IDENTIFIER'] = line.split('.     ')[1].strip()
-                        if line.startswith('512'):
-                            data_dict['INTERMEDIATE FUNCTION IDENTIFIER'] = line.split('.     ')[1].strip()
-                    except IndexError as e:
-                        logger.warning(f"Failed to parse line: {line.strip()}. Error: {e}")
-                        continue
-
-            if parse and data_dict:
-                list_of_dict.append(data_dict)
-                logger.debug(f"Added record {len(list_of_dict)} to list (end of file)")
-                        
+                    yield record if compact else record.to_dict()
+            finally:
+                if isinstance(buffer, mmap.mmap):
+                    buffer.close()
     except FileNotFoundError:
         logger.error(f"File not found: {col_file}")
         raise
     except Exception as e:
         logger.error(f"Error reading file {col_file}: {e}")
         raise ValueError(f"Invalid file format: {e}")
-        
+
     logger.info(f"Successfully parsed {count_of_items} SFAF records from {col_file}")
+
+
+def col_import(col_file: str) -> List[Dict[str, str]]:
+    """
+    Parse SFAF 1-column file and return list of dictionaries.
+
+    Loads every record into memory; use iter_sfaf_records() to stream large files.
+    
+    Args:
+        col_file: Path to the SFAF 1-column format file
+        
+    Returns:
+        List of dictionaries containing parsed SFAF data
+        
+    Raises:
+        FileNotFoundError: If the input file doesn't exist
+        ValueError: If the file format is invalid
+    """
+    list_of_dict = list(iter_sfaf_records(col_file))
     logger.info(f"Actual records in list: {len(list_of_dict)}")
     return list_of_dict
 
@@ -193,6 +646,8 @@ def convert_dms_to_dd(dms_coords: str) -> Tuple[float, float]:
 def convert_frequency(f: str) -> Tuple[float, Optional[float]]:
     """
     Convert SXXI formatted frequency line 110 into center frequency in Hz.
+
+    Results are memoized per raw string (see decode_cache_counts()).
     
     Args:
         f: Frequency string in SXXI format (e.g., "M138.025")
@@ -203,11 +658,14 @@ def convert_frequency(f: str) -> Tuple[float, Optional[float]]:
     Raises:
         ValueError: If frequency format is invalid
     """
+    return _decode_frequency(f)
+
+
+@functools.lru_cache(maxsize=DECODE_CACHE_SIZE)
+def _decode_frequency(f: str) -> Tuple[float, Optional[float]]:
+    """Uncached body of convert_frequency()."""
     try:
-        line_110_pattern = re.compile(
-            "([KMGT])([0-9]{1,6}[.]?[0-9]{0,4})(-?)([KMGT]?)([0-9]{0,6}[.]?[0-9]{0,4})([(]?)"
-            "([0-9]{0,6}[.]?[0-9]{0,4})([)]?)")
-        matches = line_110_pattern.match(f)
+        matches = LINE_110_PATTERN.match(f)
         
         if not matches:
             raise ValueError(f"Invalid frequency format: {f}")
@@ -242,20 +700,28 @@ def convert_frequency(f: str) -> Tuple[float, Optional[float]]:
 def convert_emission_designator(e: str) -> float:
     """
     Extract bandwidth from emission designator line 114.
+
+    Results are memoized per raw string (see decode_cache_counts()).
     
     Args:
         e: Emission designator string
         
     Returns:
-        Bandwidth in Hz
-        
-    Raises:
-        ValueError: If emission designator format is invalid
+        Bandwidth in Hz, or the 10 kHz default if the designator cannot be parsed
     """
+    bw = _decode_emission_designator(e)
+    if bw is None:
+        logger.debug("Could not parse emission designator: %s, using default bandwidth", e)
+        return DEFAULT_BANDWIDTH
+    return bw
+
+
+@functools.lru_cache(maxsize=DECODE_CACHE_SIZE)
+def _decode_emission_designator(e: str) -> Optional[float]:
+    """Uncached body of convert_emission_designator(); returns None if e cannot be parsed."""
     try:
         bw = 0
-        line_114_pattern = re.compile("([0-9]{1,3})([HKMG])([0-9]{0,2})([A-Z])([0-9])([A-Z])")
-        matches = line_114_pattern.match(e)
+        matches = LINE_114_PATTERN.match(e)
         
         if matches:
             bw_1 = int(matches.group(1))
@@ -278,17 +744,43 @@ def convert_emission_designator(e: str) -> float:
                 
             return bw
         else:
-            logger.warning(f"Could not parse emission designator: {e}, using default bandwidth")
-            return 10000.0
+            return None
             
-    except Exception as e:
-        logger.warning(f"Failed to parse emission designator '{e}': {e}, using default bandwidth")
-        return 10000.0
+    except Exception:
+        return None
+
+
+# Converter call/failure counters, filled once instrument_converters() is called
+_converter_counts: Dict[str, int] = {}
+
+
+def decode_cache_counts() -> Dict[str, int]:
+    """
+    Report hit/miss counters of the frequency, emission designator and date decode caches.
+
+    Returns:
+        Dictionary of cumulative counters for the current process
+    """
+    frequency = _decode_frequency.cache_info()
+    emission = _decode_emission_designator.cache_info()
+    date = _decode_date.cache_info()
+    return {
+        'frequency_cache_hits': frequency.hits,
+        'frequency_cache_misses': frequency.misses,
+        'emission_cache_hits': emission.hits,
+        'emission_cache_misses': emission.misses,
+        'date_cache_hits': date.hits,
+        'date_cache_misses': date.misses,
+    }
 
 
 def convert_power(p: str) -> float:
     """
     Convert SXXI line 110 formatted power into a float.
+
+    The number after the unit must be a plain decimal (POWER_NUMBER_PATTERN,
+    surrounding whitespace allowed) with a finite value in Watts; "Wnan",
+    "Kinf" or "W1_0" are rejected like any other malformed power.
     
     Args:
         p: Power string (e.g., "W100" or "K1.5")
@@ -301,12 +793,17 @@ def convert_power(p: str) -> float:
     """
     try:
         power = 0
+        number = p[1:].strip()
+        if not POWER_NUMBER_PATTERN.fullmatch(number):
+            raise ValueError(f"Invalid power value: {number!r}")
         if p[0] == "W":
-            power += float(p[1:])
+            power += float(number)
         elif p[0] == "K":
-            power += float(p[1:]) * 1000
+            power += float(number) * 1000
         else:
             raise ValueError(f"Unsupported power unit: {p[0]}")
+        if power in (float('inf'), float('-inf')):
+            raise ValueError("Power out of range")
         return power
         
     except Exception as e:
@@ -316,6 +813,8 @@ def convert_power(p: str) -> float:
 def convert_date(d: str) -> str:
     """
     Convert SXXI date format to ISO format.
+
+    Results are memoized per raw string (see decode_cache_counts()).
     
     Args:
         d: Date string in YYYYMMDD format
@@ -326,6 +825,12 @@ def convert_date(d: str) -> str:
     Raises:
         ValueError: If date format is invalid
     """
+    return _decode_date(d)
+
+
+@functools.lru_cache(maxsize=DECODE_CACHE_SIZE)
+def _decode_date(d: str) -> str:
+    """Uncached body of convert_date()."""
     try:
         if len(d) != 8:
             raise ValueError(f"Invalid date length: expected 8 characters, got {len(d)}")
@@ -339,7 +844,10 @@ def convert_date(d: str) -> str:
             raise ValueError(f"Invalid year: {year}")
         if not (1 <= int(month) <= 12):
             raise ValueError(f"Invalid month: {month}")
-        if not (1 <= int(day) <= 31):
+        month_days = DAYS_IN_MONTH[int(month) - 1]
+        if month == '02' and int(year) % 4 == 0 and (int(year) % 100 != 0 or int(year) % 400 == 0):
+            month_days = 29
+        if not (1 <= int(day) <= month_days):
             raise ValueError(f"Invalid day: {day}")
             
         output = f"{year}-{month}-{day}T00:00:00Z"
@@ -349,197 +857,1819 @@ def convert_date(d: str) -> str:
         raise ValueError(f"Failed to parse date '{d}': {e}")
 
 
-def main() -> None:
+class OutputField(NamedTuple):
     """
-    Main function to process SFAF files and convert to CSV/JSON formats.
-    
-    Parses command line arguments, processes the SFAF file, and outputs
-    results in CSV and JSON formats for use with CRFS tools.
+    A field of the records produced by process_record().
+
+    Attributes:
+        tags: SFAF items the field is converted from
+        kind: Type of its values, as stored in a columnar cache: 'str', 'float',
+            'json' (any JSON value, including null) or 'stations' (the nested
+            list of stations)
     """
-    # Set up argument parser
-    parser = argparse.ArgumentParser(description='Process SFAF 1-column file and convert to CSV with lat, long, center freq, bandwidth, and serial number')
-    parser.add_argument('sfaf_file', help='Path to the SFAF 1-column file to process')
-    parser.add_argument('--output', '-o', default='recordsspreadsheet.csv', 
-                       help='Output CSV filename (default: recordsspreadsheet.csv)')
-    parser.add_argument('--json-output', '-j', default='records.json',
-                       help='Output JSON filename (default: records.json)')
-    parser.add_argument('--verbose', '-v', action='store_true',
-                       help='Enable verbose logging')
-    
-    # Parse arguments
-    args = parser.parse_args()
-    
-    # Set logging level
-    if args.verbose:
-        logging.getLogger().setLevel(logging.DEBUG)
-    
-    logger.info(f"Starting SFAF processing for file: {args.sfaf_file}")
-    
-    # Check if input file exists
-    try:
-        with open(args.sfaf_file, 'r') as f:
-            pass
-    except FileNotFoundError:
-        logger.error(f"File not found: {args.sfaf_file}")
-        sys.exit(1)
-    
-    # Process the SFAF file
-    try:
-        data_dict = col_import(args.sfaf_file)
-    except Exception as e:
-        logger.error(f"Failed to process SFAF file: {e}")
-        sys.exit(1)
-    
-    processed_records = []
-    csv_records = []
-    skipped_count = 0
-    
-    logger.info(f"Processing {len(data_dict)} records...")
-    
-    for n in range(0, len(data_dict)):
-        try:
-            processed_dict = {}
-            csv_sfaf = []
-            current_dict = data_dict[n]
-            clean_current_dict = {k: v for k, v in current_dict.items() if str(v) != 'nan'}
-
-            if convert_frequency(clean_current_dict['FREQUENCY'])[0] != 0:
-                # Get serial number for error reporting
-                serial_number = clean_current_dict.get('AGENCY SERIAL NUMBER', 'UNKNOWN')
-                
-                # Check if required fields exist
-                if "EMISSION DESIGNATOR[01]" not in clean_current_dict:
-                    logger.warning(f"Skipping record {n+1} (Serial: {serial_number}) - missing EMISSION DESIGNATOR")
-                    skipped_count += 1
-                    continue
-                    
-                transmitter_power_list = [k for k, v in clean_current_dict.items() if "TRANSMITTER" in k]
-                emission_designator_list = [k for k, v in clean_current_dict.items() if "EMISSION" in k]
-                station_class_list = [k for k, v in clean_current_dict.items() if "STATION" in k]
-                erp_list = [k for k, v in clean_current_dict.items() if "EFFECTIVE" in k]
-                
-                # Handle missing coordinates by setting to 0 (won't show on map)
-                if "TX ANTENNA COORDINATES" not in clean_current_dict:
-                    logger.warning(f"Record {n+1} (Serial: {serial_number}) - missing TX ANTENNA COORDINATES, setting lat/long to 0")
-                    latlong = (0, 0)
-                else:
-                    try:
-                        latlong = convert_dms_to_dd(clean_current_dict["TX ANTENNA COORDINATES"])
-                    except ValueError as e:
-                        logger.warning(f"Record {n+1} (Serial: {serial_number}) - invalid coordinates: {e}, setting lat/long to 0")
-                        latlong = (0, 0)
-                        
-                try:
-                    converted_frequencies = convert_frequency(clean_current_dict['FREQUENCY'])
-                except ValueError as e:
-                    logger.warning(f"Record {n+1} (Serial: {serial_number}) - invalid frequency: {e}, skipping")
-                    skipped_count += 1
-                    continue
-                    
-                emissions_list = []
-                for (sc, tp, ec) in itertools.zip_longest(station_class_list, transmitter_power_list, erp_list):
-                    if sc in clean_current_dict.keys():
-                        station_class = clean_current_dict[sc]
-                    else:
-                        station_class = "FX"
-                    if tp in clean_current_dict.keys():
-                        try:
-                            transmitter_power = convert_power(clean_current_dict[tp])
-                        except ValueError:
-                            logger.warning(f"Record {n+1} (Serial: {serial_number}) - invalid transmitter power, using default")
-                            transmitter_power = 1
-                    else:
-                        transmitter_power = 1
-                    if ec in clean_current_dict.keys():
-                        erp = clean_current_dict[ec]
-                    else:
-                        erp = 0
-
-                    emissions_group = {"station_class": station_class,
-                                       "transmitter_power": transmitter_power,
-                                       "effective_radiated_power": erp}
-                    emissions_list.append(emissions_group)
-
-                # Extract optional fields with defaults
-                list_serial = clean_current_dict.get("LIST SERIAL NUMBER", "")
-                bureau = clean_current_dict.get("BUREAU", "")
-                agency = clean_current_dict.get("AGENCY", "")
-                command = clean_current_dict.get("COMMAND", "")
-                subcommand = clean_current_dict.get("SUBCOMMAND", "")
-                ism = clean_current_dict.get("INSTALLATION FREQUENCY MANAGER", "")
-                user_net_code = clean_current_dict.get("USER NET/CODE[01]", "")
-                major_function = clean_current_dict.get("MAJOR FUNCTION IDENTIFIER", "")
-                inter_function = clean_current_dict.get("INTERMEDIATE FUNCTION IDENTIFIER", "")
-                equipment_nomenclature = clean_current_dict.get("EQUIPMENT NOMENCLATURE", "")
-                pulse_duration = clean_current_dict.get("PULSE DURATION", "")
-                pulse_repetition_rate = clean_current_dict.get("PULSE REPETITION RATE", "")
-                antenna_gain = clean_current_dict.get("ANTENNA GAIN", "")
-                transmitter_power_raw = clean_current_dict.get("TRANSMITTER POWER[01]", "")
-                # Build processed dictionary
-                processed_dict["stations"] = emissions_list
-                processed_dict["name"] = clean_current_dict['AGENCY SERIAL NUMBER']
-                processed_dict["center_frequency"] = converted_frequencies[0]
-                processed_dict["bandwidth"] = convert_emission_designator(clean_current_dict['EMISSION DESIGNATOR[01]'])
-                processed_dict["agency_serial"] = clean_current_dict['AGENCY SERIAL NUMBER']
-                processed_dict["list_serial"] = list_serial
-                processed_dict["reference_frequency"] = converted_frequencies[1]
-                processed_dict["agency"] = agency
-                processed_dict["bureau"] = bureau
-                processed_dict["command"] = command
-                processed_dict["subcommand"] = subcommand
-                processed_dict["installation_frequency_manager"] = ism
-                processed_dict["user_net"] = user_net_code
-                processed_dict["latitude"] = latlong[0]
-                processed_dict["longitude"] = latlong[1]
-                processed_dict["major_function_identifier"] = major_function
-                processed_dict["intermediate_function_identifier"] = inter_function
-                processed_dict["equipment_nomenclature"] = equipment_nomenclature
-                processed_dict["pulse_duration"] = pulse_duration
-                processed_dict["pulse_repetition_rate"] = pulse_repetition_rate
-                processed_dict["antenna_gain"] = antenna_gain
-                processed_dict["transmitter_power"] = transmitter_power_raw
-
-                # Build CSV record
-                csv_sfaf.append(latlong[0])
-                csv_sfaf.append(latlong[1])
-                csv_sfaf.append(converted_frequencies[0])
-                csv_sfaf.append(convert_emission_designator(clean_current_dict['EMISSION DESIGNATOR[01]']))
-                csv_sfaf.append(clean_current_dict['AGENCY SERIAL NUMBER'])
-                csv_records.append(csv_sfaf)
-
-                processed_records.append(processed_dict)
-            else:
-                # Debug: Show which records are being filtered out due to frequency being 0
-                serial_number = clean_current_dict.get('AGENCY SERIAL NUMBER', 'UNKNOWN')
-                frequency_value = clean_current_dict.get('FREQUENCY', 'MISSING')
-                logger.warning(f"Record {n+1} (Serial: {serial_number}) - frequency converts to 0: {frequency_value}")
-                skipped_count += 1
-                
-        except Exception as e:
-            logger.error(f"Error processing record {n+1}: {e}")
-            skipped_count += 1
-            continue
+    tags: Tuple[str, ...]
+    kind: str
 
-    logger.info(f"Successfully processed {len(csv_records)} records, skipped {skipped_count} records")
-    logger.debug(f"CSV records: {csv_records}")
 
-    # Write output files
-    try:
-        json_file = json.dumps(processed_records, indent=4)
+# Fields of process_record() output, in output order; the schema used by columnar.py and json_to_csv.py
+OUTPUT_FIELDS = {
+    'stations': OutputField(('113', '115', '117'), 'stations'),
+    'name': OutputField(('102',), 'str'),
+    'center_frequency': OutputField(('110',), 'float'),
+    'bandwidth': OutputField(('114',), 'float'),
+    'agency_serial': OutputField(('102',), 'str'),
+    'list_serial': OutputField(('105',), 'str'),
+    'reference_frequency': OutputField(('110',), 'float'),
+    'agency': OutputField(('200',), 'str'),
+    'bureau': OutputField(('203',), 'str'),
+    'command': OutputField(('204',), 'str'),
+    'subcommand': OutputField(('205',), 'str'),
+    'installation_frequency_manager': OutputField(('206',), 'str'),
+    'user_net': OutputField(('208',), 'str'),
+    'latitude': OutputField(('303',), 'float'),
+    'longitude': OutputField(('303',), 'float'),
+    'major_function_identifier': OutputField(('511',), 'str'),
+    'intermediate_function_identifier': OutputField(('512',), 'str'),
+    'equipment_nomenclature': OutputField(('340',), 'str'),
+    'pulse_duration': OutputField(('346',), 'str'),
+    'pulse_repetition_rate': OutputField(('347',), 'str'),
+    'antenna_gain': OutputField(('357',), 'str'),
+    'transmitter_power': OutputField(('115',), 'str'),
+    # ISO 8601 timestamps or null
+    'required_date': OutputField(('140',), 'json'),
+    'expiration_date': OutputField(('141',), 'json'),
+    'review_date': OutputField(('142',), 'json'),
+}
+# Output fields holding the value of their SFAF item unchanged ("" if it is missing)
+RAW_OUTPUT_FIELDS = {
+    'list_serial': '105',
+    'agency': '200',
+    'bureau': '203',
+    'command': '204',
+    'subcommand': '205',
+    'installation_frequency_manager': '206',
+    'major_function_identifier': '511',
+    'intermediate_function_identifier': '512',
+    'equipment_nomenclature': '340',
+    'pulse_duration': '346',
+    'pulse_repetition_rate': '347',
+    'antenna_gain': '357',
+}
+# Output fields holding a date item converted by convert_date() (null if it is missing or invalid)
+DATE_OUTPUT_FIELDS = {
+    'required_date': '140',
+    'expiration_date': '141',
+    'review_date': '142',
+}
+# Columns of the CSV output, in order
+CSV_FIELDS = ('latitude', 'longitude', 'center_frequency', 'bandwidth', 'agency_serial')
+# Items that decide whether a record is converted or skipped, parsed under every plan
+SELECTION_TAGS = ('102', '110', '114')
 
-        with open(args.output, 'w', newline='') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerows(csv_records)
 
-        with open(args.json_output, mode="w") as file:
-            file.write(json_file)
-        
-        logger.info(f"CSV output saved to: {args.output}")
-        logger.info(f"JSON output saved to: {args.json_output}")
-        
-    except Exception as e:
-        logger.error(f"Failed to write output files: {e}")
-        sys.exit(1)
+class ConversionPlan(NamedTuple):
+    """
+    Outputs of a conversion and the work they need, compiled by compile_plan().
+
+    Attributes:
+        fields: Fields of the JSON records, in output order; empty if no JSON is written
+        csv_rows: True if CSV rows are built
+        outputs: Every field that is converted, for the JSON records or the CSV rows
+        tags: SFAF items the parsers need to extract (see iter_sfaf_records()), or
+            None to parse every registered item, as full conversions do
+    """
+    fields: Tuple[str, ...]
+    csv_rows: bool
+    outputs: FrozenSet[str]
+    tags: Optional[FrozenSet[str]]
+
+
+def compile_plan(fields: Optional[Iterable[str]] = None, csv_rows: bool = True) -> ConversionPlan:
+    """
+    Compile a projection of the outputs into the SFAF items and conversions it needs.
+
+    Records are selected the same way under every plan, so a projection only
+    changes which fields are filled in. Problems are only reported for the
+    items that are parsed and converted.
+
+    Args:
+        fields: Names of the OUTPUT_FIELDS the JSON records keep, or None for all;
+            an empty list writes no JSON
+        csv_rows: Also build the CSV rows, which need the CSV_FIELDS
+
+    Returns:
+        ConversionPlan for process_record() and the parsers
+
+    Raises:
+        ValueError: If a field name is not one of OUTPUT_FIELDS
+    """
+    if fields is None:
+        fields = OUTPUT_FIELDS
+    else:
+        fields = list(fields)
+        unknown = [name for name in fields if name not in OUTPUT_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown output fields: {', '.join(unknown)} "
+                             f"(expected some of: {', '.join(OUTPUT_FIELDS)})")
+    fields = tuple(name for name in OUTPUT_FIELDS if name in fields)
+    outputs = set(fields)
+    if csv_rows:
+        outputs.update(CSV_FIELDS)
+    if len(fields) == len(OUTPUT_FIELDS):
+        # Items no field uses are still parsed, so their malformed lines are reported
+        return ConversionPlan(fields, csv_rows, frozenset(outputs), None)
+    tags = set(SELECTION_TAGS)
+    for name in outputs:
+        tags.update(OUTPUT_FIELDS[name].tags)
+    return ConversionPlan(fields, csv_rows, frozenset(outputs), frozenset(tags))
+
+
+def process_record(current_dict, n: int, diagnostics: Optional[Diagnostics] = None,
+                   plan: Optional[ConversionPlan] = None) -> Optional[Tuple[Dict, List]]:
+    """
+    Convert one parsed SFAF record into its JSON and CSV representations.
+
+    Args:
+        current_dict: SfafRecord, or record dictionary as produced by iter_sfaf_records()
+        n: Zero-based index of the record in the input, used to report problems
+        diagnostics: Optional Diagnostics receiving the record's problems; they
+            are logged as warnings otherwise
+        plan: Optional ConversionPlan restricting the fields that are converted;
+            all fields and the CSV row by default
+
+    Returns:
+        Tuple of (processed_dict, csv_row), or None if the record is skipped;
+        processed_dict only holds the plan's fields, and csv_row is None if the
+        plan builds no CSV rows
+
+    Raises:
+        KeyError: If the record has no FREQUENCY or AGENCY SERIAL NUMBER
+    """
+    if plan is None:
+        plan = FULL_PLAN
+    outputs = plan.outputs
+    report = log_record_problem if diagnostics is None else diagnostics.report
+    record = current_dict if isinstance(current_dict, SfafRecord) else SfafRecord.from_dict(current_dict)
+    values = record.values
+    size = len(values)
+
+    def field(tag, default=None):
+        index = SFAF_FIELDS[tag].index
+        value = values[index] if index < size else None
+        return default if value is None or value == 'nan' else value
+
+    def group(tag):
+        index = SFAF_FIELDS[tag].index
+        occurrences = values[index] if index < size else None
+        if occurrences is None:
+            return []
+        return [value for value in occurrences if value != 'nan']
+
+    frequency = field('110')
+    if frequency is None:
+        raise KeyError(SFAF_FIELDS['110'].name)
+    converted_frequencies = convert_frequency(frequency)
+
+    if converted_frequencies[0] != 0:
+        # Get serial number for error reporting
+        serial_number = field('102', 'UNKNOWN')
+
+        # Check if required fields exist
+        emission_designators = group('114')
+        if not emission_designators:
+            report('missing_emission_designator', n, serial_number)
+            return None
+
+        # Handle missing coordinates by setting to 0 (won't show on map)
+        if 'latitude' not in outputs and 'longitude' not in outputs:
+            latlong = (None, None)
+        else:
+            coordinates = field('303')
+            if coordinates is None:
+                report('missing_coordinates', n, serial_number)
+                latlong = (0, 0)
+            else:
+                try:
+                    latlong = convert_dms_to_dd(coordinates)
+                except ValueError as e:
+                    report('invalid_coordinates', n, serial_number, str(e))
+                    latlong = (0, 0)
+
+        if 'bandwidth' not in outputs:
+            bandwidth = None
+        else:
+            bandwidth = convert_emission_designator(emission_designators[0])
+            # Same test as the --stats failure counter of convert_emission_designator
+            if bandwidth == DEFAULT_BANDWIDTH and not LINE_114_PATTERN.match(emission_designators[0]):
+                report('invalid_emission_designator', n, serial_number, emission_designators[0])
+
+        # Stations pair up the n-th station class, transmitter power and ERP of the record
+        transmitter_powers = group('115')
+        emissions_list = []
+        if 'stations' in outputs:
+            for (sc, tp, ec) in itertools.zip_longest(group('113'), transmitter_powers, group('117')):
+                station_class = "FX" if sc is None else sc
+                if tp is not None:
+                    try:
+                        transmitter_power = convert_power(tp)
+                    except ValueError:
+                        report('invalid_transmitter_power', n, serial_number, tp)
+                        transmitter_power = 1
+                else:
+                    transmitter_power = 1
+                erp = 0 if ec is None else ec
+
+                emissions_group = {"station_class": station_class,
+                                   "transmitter_power": transmitter_power,
+                                   "effective_radiated_power": erp}
+                emissions_list.append(emissions_group)
+
+        # Assignment dates as ISO 8601 timestamps
+        dates = {}
+        for name, tag in DATE_OUTPUT_FIELDS.items():
+            value = field(tag) if name in outputs else None
+            if value is not None:
+                try:
+                    value = convert_date(value)
+                except ValueError:
+                    report('invalid_date', n, serial_number, f"{tag}: {value}")
+                    value = None
+            dates[name] = value
+
+        serial = field('102')
+        if serial is None:
+            raise KeyError(SFAF_FIELDS['102'].name)
+        user_net_codes = group('208')
+
+        if len(plan.fields) == len(OUTPUT_FIELDS):
+            # Build processed dictionary
+            processed_dict = {
+                "stations": emissions_list,
+                "name": serial,
+                "center_frequency": converted_frequencies[0],
+                "bandwidth": bandwidth,
+                "agency_serial": serial,
+                "list_serial": field('105', ""),
+                "reference_frequency": converted_frequencies[1],
+                "agency": field('200', ""),
+                "bureau": field('203', ""),
+                "command": field('204', ""),
+                "subcommand": field('205', ""),
+                "installation_frequency_manager": field('206', ""),
+                "user_net": user_net_codes[0] if user_net_codes else "",
+                "latitude": latlong[0],
+                "longitude": latlong[1],
+                "major_function_identifier": field('511', ""),
+                "intermediate_function_identifier": field('512', ""),
+                "equipment_nomenclature": field('340', ""),
+                "pulse_duration": field('346', ""),
+                "pulse_repetition_rate": field('347', ""),
+                "antenna_gain": field('357', ""),
+                "transmitter_power": transmitter_powers[0] if transmitter_powers else "",
+                "required_date": dates['required_date'],
+                "expiration_date": dates['expiration_date'],
+                "review_date": dates['review_date'],
+            }
+        else:
+            converted = {
+                "stations": emissions_list,
+                "name": serial,
+                "center_frequency": converted_frequencies[0],
+                "bandwidth": bandwidth,
+                "agency_serial": serial,
+                "reference_frequency": converted_frequencies[1],
+                "user_net": user_net_codes[0] if user_net_codes else "",
+                "latitude": latlong[0],
+                "longitude": latlong[1],
+                "transmitter_power": transmitter_powers[0] if transmitter_powers else "",
+                **dates,
+            }
+            processed_dict = {name: field(RAW_OUTPUT_FIELDS[name], "") if name in RAW_OUTPUT_FIELDS
+                              else converted[name] for name in plan.fields}
+
+        # Build CSV record
+        csv_sfaf = [latlong[0], latlong[1], converted_frequencies[0], bandwidth, serial] if plan.csv_rows else None
+
+        return processed_dict, csv_sfaf
+    else:
+        # Debug: Show which records are being filtered out due to frequency being 0
+        report('zero_frequency', n, field('102', 'UNKNOWN'), frequency)
+        return None
+
+
+# Plan of a full conversion: every field and the CSV rows
+FULL_PLAN = compile_plan()
+
+
+def iter_processed_records(records: Iterable[Dict[str, str]],
+                           counts: Optional[Dict[str, int]] = None,
+                           diagnostics: Optional[Diagnostics] = None,
+                           plan: Optional[ConversionPlan] = None) -> Iterator[Tuple[Dict, List]]:
+    """
+    Convert parsed SFAF records one at a time.
+
+    Args:
+        records: Iterable of SfafRecord objects or record dictionaries (e.g., from iter_sfaf_records())
+        counts: Optional dictionary updated in place with 'processed' and 'skipped' totals
+        diagnostics: Optional Diagnostics receiving the problems found in the records
+        plan: Optional ConversionPlan restricting the fields that are converted
+
+    Yields:
+        Tuples of (processed_dict, csv_row) for every record that is not skipped
+    """
+    if counts is None:
+        counts = {}
+    counts.setdefault('processed', 0)
+    counts.setdefault('skipped', 0)
+
+    for n, current_dict in enumerate(records):
+        result = _process_record_counted(current_dict, n, counts, diagnostics, plan)
+        if result is not None:
+            yield result
+
+
+def _process_record_counted(current_dict: Dict[str, str], n: int, counts: Dict[str, int],
+                            diagnostics: Optional[Diagnostics] = None,
+                            plan: Optional[ConversionPlan] = None) -> Optional[Tuple[Dict, List]]:
+    """Run process_record(), reporting failures and updating the processed/skipped counts."""
+    try:
+        result = process_record(current_dict, n, diagnostics, plan)
+    except Exception as e:
+        serial = (current_dict.get('102') if isinstance(current_dict, SfafRecord)
+                  else current_dict.get(SFAF_FIELDS['102'].name))
+        if isinstance(e, KeyError):
+            category, detail = 'missing_field', e.args[0]
+        else:
+            category, detail = 'conversion_error', str(e)
+        if diagnostics is None:
+            log_record_problem(category, n, serial, detail)
+        else:
+            diagnostics.report(category, n, serial, detail)
+        result = None
+    if result is None:
+        counts['skipped'] += 1
+    else:
+        counts['processed'] += 1
+    return result
+
+
+def format_json_record(record: Dict, json_format: str = 'pretty') -> str:
+    """
+    Serialize one record the way it appears in a JSON output of the given format.
+
+    Args:
+        record: Record to serialize
+        json_format: 'pretty' for an element of a 4-space indented array (as in
+            json.dumps(records, indent=4)), 'compact' or 'jsonl' for JSON without
+            whitespace, using orjson when it is installed
+
+    Returns:
+        JSON text of the record
+    """
+    if json_format == 'pretty':
+        return '    ' + json.dumps(record, indent=4).replace('\n', '\n    ')
+    orjson = _import_orjson()
+    if orjson is not None:
+        return orjson.dumps(record).decode('utf-8')
+    return json.dumps(record, separators=(',', ':'))
+
+
+@functools.lru_cache(maxsize=None)
+def _import_orjson():
+    """Import the optional orjson encoder on first use; None if it is not installed."""
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+def _orjson_version() -> Optional[str]:
+    """Version of the installed orjson encoder, None if it is not installed."""
+    orjson = _import_orjson()
+    return getattr(orjson, '__version__', 'unknown') if orjson is not None else None
+
+
+class JsonArrayWriter:
+    """
+    Incrementally write records as a JSON array.
+
+    In 'pretty' format the output is identical to json.dumps(records, indent=4);
+    in 'compact' format the array has no whitespace. Only one record is
+    serialized at a time.
+    """
+
+    def __init__(self, fp, json_format: str = 'pretty'):
+        self.fp = fp
+        self.json_format = json_format
+        self.newline = '\n' if json_format == 'pretty' else ''
+        self.count = 0
+
+    def write(self, record: Dict) -> None:
+        """Append one record to the array."""
+        self.write_formatted(format_json_record(record, self.json_format))
+
+    def write_formatted(self, text: str) -> None:
+        """Append one record already serialized with format_json_record()."""
+        self.fp.write(('[' if self.count == 0 else ',') + self.newline)
+        self.fp.write(text)
+        self.count += 1
+
+    def close(self) -> None:
+        """Terminate the array; an empty array is written as []."""
+        self.fp.write('[]' if self.count == 0 else self.newline + ']')
+
+
+class JsonLinesWriter:
+    """Incrementally write records as JSON Lines, one compact record per line."""
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.json_format = 'jsonl'
+        self.count = 0
+
+    def write(self, record: Dict) -> None:
+        """Append one record."""
+        self.write_formatted(format_json_record(record, self.json_format))
+
+    def write_formatted(self, text: str) -> None:
+        """Append one record already serialized with format_json_record()."""
+        self.fp.write(text)
+        self.fp.write('\n')
+        self.count += 1
+
+    def close(self) -> None:
+        """Nothing to terminate; present for symmetry with JsonArrayWriter."""
+
+
+def open_json_writer(fp, json_format: str = 'pretty'):
+    """
+    Create the incremental writer for a JSON output format.
+
+    Args:
+        fp: Text file to write to
+        json_format: One of JSON_FORMATS
+
+    Returns:
+        JsonArrayWriter or JsonLinesWriter
+
+    Raises:
+        ValueError: If json_format is unknown
+    """
+    if json_format == 'jsonl':
+        return JsonLinesWriter(fp)
+    if json_format in ('pretty', 'compact'):
+        return JsonArrayWriter(fp, json_format)
+    raise ValueError(f"Unknown JSON format: {json_format}")
+
+
+def find_record_boundaries(col_file: str, chunks: int) -> List[Tuple[int, int]]:
+    """
+    Split an SFAF file into byte ranges that each start at a 005 record line.
+
+    Args:
+        col_file: Path to the SFAF 1-column format file
+        chunks: Desired number of ranges; fewer are returned for small files
+
+    Returns:
+        List of (start, end) byte offsets covering the whole file in order
+    """
+    size = os.path.getsize(col_file)
+    if size == 0:
+        return []
+    chunks = max(1, chunks)
+    starts = [0]
+    with open(col_file, 'rb') as f:
+        for i in range(1, chunks):
+            target = size * i // chunks
+            if target <= starts[-1]:
+                continue
+            f.seek(target - 1)
+            f.readline()  # finish the line containing the target offset
+            while True:
+                position = f.tell()
+                line = f.readline()
+                if not line:
+                    position = size
+                    break
+                if line.startswith(RECORD_START_TAG.encode()):
+                    break
+            if starts[-1] < position < size:
+                starts.append(position)
+    return list(zip(starts, starts[1:] + [size]))
+
+
+def _convert_byte_range(job: Tuple[str, int, int, str, bool, bool, bool, ConversionPlan]
+                        ) -> Tuple[List[str], str, Dict[str, int], Diagnostics]:
+    """
+    Parse and convert one byte range of an SFAF file in a worker process.
+
+    Args:
+        job: Tuple of (col_file, start, end, json_format, collect_stats, use_mmap,
+            keep_problems, plan), with the byte range as returned by
+            find_record_boundaries(); with use_mmap the range is parsed in place
+            through a memory map
+
+    Returns:
+        Tuple of (json_fragments, csv_text, counts, diagnostics), where
+        json_fragments is empty if the plan has no JSON fields, counts
+        holds the processed/skipped totals and the decode cache counters for this
+        range, plus the --stats counters and stage times if collect_stats is set,
+        and diagnostics the problems found, each one kept if keep_problems is set;
+        record numbers are relative to the start of the range
+    """
+    col_file, start, end, json_format, collect_stats, use_mmap, keep_problems, plan = job
+    diagnostics = Diagnostics(keep_events=keep_problems)
+    if use_mmap:
+        import mmap
+        with open(col_file, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return _convert_lines(iter_mapped_lines(buffer, start, end), json_format, collect_stats, True,
+                                  diagnostics, plan)
+        finally:
+            buffer.close()
+    with open(col_file, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    lines = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8')
+    return _convert_lines(lines, json_format, collect_stats, False, diagnostics, plan)
+
+
+def _convert_lines(lines: Iterable, json_format: str, collect_stats: bool, byte_lines: bool,
+                   diagnostics: Diagnostics,
+                   plan: ConversionPlan) -> Tuple[List[str], str, Dict[str, int], Diagnostics]:
+    """Parse and convert SFAF lines (bytes if byte_lines) for _convert_byte_range()."""
+    counts = {}
+    before = decode_cache_counts()
+    format_record = format_json_record
+    csv_buffer = io.StringIO(newline='')
+    writerow = csv.writer(csv_buffer).writerow
+    if collect_stats:
+        instrument_converters()
+        before.update(converter_counts())
+        if byte_lines:
+            parsed = iter_sfaf_byte_records(count_sfaf_tags(lines, counts), diagnostics, plan.tags)
+        else:
+            parsed = iter_sfaf_line_records(count_sfaf_tags(lines, counts), diagnostics, plan.tags)
+        parsed = timed_iter(parsed, counts, 'parse')
+        records = timed_iter(iter_processed_records(parsed, counts, diagnostics, plan), counts, 'parse_convert')
+        format_record = timed_call(format_record, counts, 'write_json')
+        writerow = timed_call(writerow, counts, 'write_csv')
+    else:
+        if byte_lines:
+            parsed = iter_sfaf_byte_records(lines, diagnostics, plan.tags)
+        else:
+            parsed = iter_sfaf_line_records(lines, diagnostics, plan.tags)
+        records = iter_processed_records(parsed, counts, diagnostics, plan)
+
+    json_fragments = []
+    json_fields = bool(plan.fields)
+    for processed_dict, csv_sfaf in records:
+        if json_fields:
+            json_fragments.append(format_record(processed_dict, json_format))
+        if csv_sfaf is not None:
+            writerow(csv_sfaf)
+    after = decode_cache_counts()
+    if collect_stats:
+        after.update(converter_counts())
+    for key, value in after.items():
+        counts[key] = value - before.get(key, 0)
+    return json_fragments, csv_buffer.getvalue(), counts, diagnostics
+
+
+def iter_converted_chunks(col_file: str, workers: int, counts: Optional[Dict[str, int]] = None,
+                          json_format: str = 'pretty', collect_stats: bool = False,
+                          use_mmap: bool = False, diagnostics: Optional[Diagnostics] = None,
+                          plan: Optional[ConversionPlan] = None) -> Iterator[Tuple[List[str], str]]:
+    """
+    Parse and convert an SFAF file in a pool of worker processes.
+
+    The file is split at 005 record boundaries into more ranges than workers so
+    that the pool stays busy; converted ranges are yielded in file order, so
+    writing them out sequentially reproduces the serial output byte for byte.
+
+    Args:
+        col_file: Path to the SFAF 1-column format file
+        workers: Number of worker processes
+        counts: Optional dictionary updated in place with 'processed' and 'skipped'
+            totals and the workers' decode cache counters
+        json_format: Format of the returned JSON fragments (see format_json_record())
+        collect_stats: Also add up the workers' --stats counters and stage times
+        use_mmap: Parse the ranges as bytes through a memory map (see iter_sfaf_records_mmap())
+        diagnostics: Optional Diagnostics the workers' problems are merged into,
+            with record numbers counted from the start of the file
+        plan: Optional ConversionPlan restricting the fields that are converted;
+            no JSON fragments are returned if it has no JSON fields
+
+    Yields:
+        Tuples of (json_fragments, csv_text) per byte range, in file order
+    """
+    if counts is None:
+        counts = {}
+    counts.setdefault('processed', 0)
+    counts.setdefault('skipped', 0)
+
+    size = os.path.getsize(col_file)
+    chunks = max(workers * 4, size // PARALLEL_CHUNK_BYTES)
+    keep_problems = diagnostics is not None and diagnostics.rejects is not None
+    jobs = [(col_file, start, end, json_format, collect_stats, use_mmap, keep_problems, plan or FULL_PLAN)
+            for start, end in find_record_boundaries(col_file, chunks)]
+    logger.info(f"Converting {col_file} in {len(jobs)} chunks with {workers} workers")
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        for json_fragments, csv_text, chunk_counts, chunk_diagnostics in executor.map(_convert_byte_range, jobs):
+            if diagnostics is not None:
+                diagnostics.merge(chunk_diagnostics, counts['processed'] + counts['skipped'])
+            for key, value in chunk_counts.items():
+                counts[key] = counts.get(key, 0) + value
+            yield json_fragments, csv_text
+
+
+def record_fingerprint(record: Dict[str, str]) -> str:
+    """
+    Hash the contents of a parsed SFAF record.
+
+    Args:
+        record: Record dictionary as produced by iter_sfaf_records()
+
+    Returns:
+        Hex digest that changes whenever any item of the record changes
+    """
+    digest = hashlib.sha1()
+    for key, value in record.items():
+        digest.update(f'{key}\x1f{value}\x1e'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def load_incremental_state(state_file: str, json_format: str = 'pretty') -> Dict[str, list]:
+    """
+    Load the per-record state written by a previous incremental run.
+
+    Args:
+        state_file: Path to the JSON state file
+        json_format: JSON output format the stored fragments must have been written in
+
+    Returns:
+        Dictionary of record key -> [fingerprint, json_fragment, csv_text]; empty if
+        the file does not exist or was written by another state version or format
+    """
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        logger.warning(f"Ignoring unreadable incremental state {state_file}: {e}")
+        return {}
+    if state.get('version') != INCREMENTAL_STATE_VERSION or state.get('json_format', 'pretty') != json_format:
+        logger.info(f"Incremental state {state_file} has a different version or JSON format, "
+                    f"converting all records")
+        return {}
+    return state['records']
+
+
+def _replace_file(path: str, write) -> None:
+    """Write a file through write(fp) into a temporary sibling, then move it into place."""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def convert_incremental(col_file: str, csv_file: str, json_file: str, state_file: str,
+                        counts: Optional[Dict[str, int]] = None, columnar_writer=None,
+                        json_format: str = 'pretty', diagnostics: Optional[Diagnostics] = None) -> None:
+    """
+    Convert only the records that changed since the last run with the same state file.
+
+    Records are keyed by AGENCY SERIAL NUMBER (with an occurrence suffix for repeated
+    serials) and compared by record_fingerprint(). Unchanged records reuse the JSON
+    and CSV output stored in the state file; new or modified records are converted;
+    records no longer in the input are dropped. The outputs and the state file are
+    rewritten in input order and replaced atomically.
+
+    Args:
+        col_file: Path to the SFAF 1-column format file
+        csv_file: Path of the CSV output
+        json_file: Path of the JSON output
+        state_file: Path of the JSON state file kept between runs
+        counts: Optional dictionary updated in place with 'processed', 'skipped',
+            'added', 'modified', 'unchanged' and 'deleted' totals
+        columnar_writer: Optional columnar.ColumnarWriter that also receives every
+            converted record
+        json_format: One of JSON_FORMATS
+        diagnostics: Optional Diagnostics receiving the problems of the new and
+            modified records (unchanged records are not converted again)
+    """
+    if counts is None:
+        counts = {}
+    for key in ('processed', 'skipped', 'added', 'modified', 'unchanged', 'deleted'):
+        counts.setdefault(key, 0)
+
+    previous = load_incremental_state(state_file, json_format)
+    current = {}
+    occurrences = {}
+    csv_buffer = io.StringIO(newline='')
+    writer = csv.writer(csv_buffer)
+
+    for n, record in enumerate(iter_sfaf_records(col_file, diagnostics=diagnostics)):
+        serial = record.get('AGENCY SERIAL NUMBER', '')
+        occurrences[serial] = occurrences.get(serial, 0) + 1
+        key = serial if occurrences[serial] == 1 else f'{serial}#{occurrences[serial]}'
+        fingerprint = record_fingerprint(record)
+
+        entry = previous.get(key)
+        if entry is not None and entry[0] == fingerprint:
+            counts['unchanged'] += 1
+            counts['processed' if entry[1] is not None else 'skipped'] += 1
+            current[key] = entry
+            continue
+
+        counts['modified' if entry is not None else 'added'] += 1
+        result = _process_record_counted(record, n, counts, diagnostics)
+        if result is None:
+            current[key] = [fingerprint, None, None]
+        else:
+            processed_dict, csv_sfaf = result
+            writer.writerow(csv_sfaf)
+            current[key] = [fingerprint, format_json_record(processed_dict, json_format), csv_buffer.getvalue()]
+            csv_buffer.seek(0)
+            csv_buffer.truncate()
+
+    counts['deleted'] = sum(1 for key in previous if key not in current)
+    converted = [entry for entry in current.values() if entry[1] is not None]
+
+    def write_json(f):
+        json_writer = open_json_writer(f, json_format)
+        for entry in converted:
+            json_writer.write_formatted(entry[1])
+        json_writer.close()
+
+    if columnar_writer is not None:
+        for entry in converted:
+            columnar_writer.write(json.loads(entry[1]))
+
+    _replace_file(csv_file, lambda f: f.writelines(entry[2] for entry in converted))
+    _replace_file(json_file, write_json)
+    _replace_file(state_file, lambda f: json.dump({'version': INCREMENTAL_STATE_VERSION,
+                                                   'json_format': json_format,
+                                                   'records': current}, f))
+
+
+def instrument_converters() -> None:
+    """
+    Replace the module's convert_* functions with wrappers that count calls and failures.
+
+    A failure is a ValueError raised by a converter, or for
+    convert_emission_designator a designator that falls back to the default
+    bandwidth. Calling this again has no effect; read the counters with
+    converter_counts().
+    """
+    module_globals = globals()
+    for name in INSTRUMENTED_CONVERTERS:
+        if not hasattr(module_globals[name], '__wrapped__'):
+            module_globals[name] = _counting_converter(name, module_globals[name])
+
+
+def _counting_converter(name: str, convert):
+    """Wrap one converter for instrument_converters()."""
+    calls_key, failures_key = f'{name}_calls', f'{name}_failures'
+    falls_back = name == 'convert_emission_designator'
+
+    @functools.wraps(convert)
+    def counted(value):
+        _converter_counts[calls_key] = _converter_counts.get(calls_key, 0) + 1
+        try:
+            result = convert(value)
+        except ValueError:
+            _converter_counts[failures_key] = _converter_counts.get(failures_key, 0) + 1
+            raise
+        if falls_back and not (isinstance(value, str) and LINE_114_PATTERN.match(value)):
+            _converter_counts[failures_key] = _converter_counts.get(failures_key, 0) + 1
+        return result
+    return counted
+
+
+def converter_counts() -> Dict[str, int]:
+    """
+    Report the '<converter>_calls' and '<converter>_failures' counters of this process.
+
+    Returns:
+        Dictionary of cumulative counters, zero until instrument_converters() is called
+    """
+    counts = {}
+    for name in INSTRUMENTED_CONVERTERS:
+        counts[f'{name}_calls'] = _converter_counts.get(f'{name}_calls', 0)
+        counts[f'{name}_failures'] = _converter_counts.get(f'{name}_failures', 0)
+    return counts
+
+
+def timed_iter(iterable: Iterable, counts: Dict[str, float], stage: str) -> Iterator:
+    """Yield from iterable, adding the time spent producing items to counts['seconds_<stage>']."""
+    key = f'seconds_{stage}'
+    perf_counter = time.perf_counter
+    iterator = iter(iterable)
+    while True:
+        start = perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            counts[key] = counts.get(key, 0.0) + perf_counter() - start
+            return
+        counts[key] = counts.get(key, 0.0) + perf_counter() - start
+        yield item
+
+
+def timed_call(func, counts: Dict[str, float], stage: str):
+    """Wrap func so that the time spent in it is added to counts['seconds_<stage>']."""
+    key = f'seconds_{stage}'
+    perf_counter = time.perf_counter
+
+    def timed(*args):
+        start = perf_counter()
+        try:
+            return func(*args)
+        finally:
+            counts[key] = counts.get(key, 0.0) + perf_counter() - start
+    return timed
+
+
+def peak_memory_kb() -> Optional[int]:
+    """Peak resident set size of this process and its finished workers in KiB, None if unavailable."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def build_stats(counts: Dict[str, float], wall_seconds: float, col_file: str, workers: int = 1) -> Dict:
+    """
+    Assemble the --stats metrics of a conversion run.
+
+    Stage times come from 'seconds_<stage>' keys of counts; the convert stage
+    is the time spent in iter_processed_records minus the parse stage it
+    pulls from. With several workers, stage times are summed over the workers
+    and the main process, so they can exceed the wall time.
+
+    Args:
+        counts: Counters filled by the conversion with stats collection enabled
+        wall_seconds: Wall time of the whole conversion
+        col_file: Path of the converted file
+        workers: Number of worker processes used
+
+    Returns:
+        JSON-serializable dictionary of metrics
+    """
+    records = counts.get('processed', 0) + counts.get('skipped', 0)
+    seconds = {stage: counts.get(f'seconds_{stage}', 0.0) for stage in STATS_STAGES}
+    seconds['convert'] = max(counts.get('seconds_parse_convert', 0.0) - seconds['parse'], 0.0)
+    stages = {}
+    for stage in STATS_STAGES:
+        items = records if stage in ('parse', 'convert') else counts.get('processed', 0)
+        stages[stage] = {
+            'seconds': round(seconds[stage], 6),
+            'records_per_second': round(items / seconds[stage], 1) if seconds[stage] > 0 else None,
+        }
+    return {
+        'version': STATS_VERSION,
+        'input': col_file,
+        'input_bytes': os.path.getsize(col_file),
+        'workers': workers,
+        'wall_seconds': round(wall_seconds, 6),
+        'records': records,
+        'processed': counts.get('processed', 0),
+        'skipped': counts.get('skipped', 0),
+        'records_per_second': round(records / wall_seconds, 1) if wall_seconds > 0 else None,
+        'peak_memory_kb': peak_memory_kb(),
+        'stages': stages,
+        'tags': {key[4:]: value for key, value in sorted(counts.items()) if key.startswith('tag_')},
+        'converters': {name: {'calls': counts.get(f'{name}_calls', 0), 'failures': counts.get(f'{name}_failures', 0)}
+                       for name in INSTRUMENTED_CONVERTERS},
+        'decode_cache': {key: counts.get(key, 0) for key in decode_cache_counts()},
+    }
+
+
+def log_stats(stats: Dict) -> None:
+    """Log the metrics returned by build_stats() in readable form."""
+    logger.info(f"Stats: {stats['records']} records in {stats['wall_seconds']:.3f} s "
+                f"({stats['records_per_second'] or 0:.0f} records/sec, {stats['workers']} workers)")
+    if stats['peak_memory_kb'] is not None:
+        logger.info(f"Stats: peak memory {stats['peak_memory_kb'] / 1024:.1f} MiB")
+    for stage, values in stats['stages'].items():
+        rate = values['records_per_second']
+        logger.info(f"Stats: stage {stage:<14} {values['seconds']:9.3f} s"
+                    + (f"  {rate:12,.0f} records/sec" if rate else ''))
+    for name, values in stats['converters'].items():
+        logger.info(f"Stats: {name:<28} {values['calls']:9d} calls {values['failures']:7d} failures")
+    logger.info("Stats: tags " + ', '.join(f"{tag}={count}" for tag, count in stats['tags'].items()))
+
+
+def converter_version() -> str:
+    """
+    Digest identifying the conversion code, for the keys of --cache-dir.
+
+    Covers the source of this module, columnar.py and diagnostics.py and the registered
+    SFAF fields, so any change to them invalidates cached conversions.
+    """
+    digest = hashlib.sha256()
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in ('main.py', 'columnar.py', 'diagnostics.py'):
+        try:
+            with open(os.path.join(module_dir, name), 'rb') as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(name.encode('utf-8'))
+    digest.update(repr(sorted(SFAF_FIELDS.items())).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def conversion_options(json_format: str, outputs: List[str], plan: Optional[ConversionPlan] = None) -> Dict:
+    """
+    Options that determine the bytes of a conversion's outputs, for the keys of --cache-dir.
+
+    Args:
+        json_format: JSON output format
+        outputs: Names of the outputs written ('csv', 'json', 'columnar', 'rejects')
+        plan: ConversionPlan of the conversion, all fields by default
+
+    Returns:
+        JSON-serializable dictionary of the options
+    """
+    return {
+        'converter': converter_version(),
+        'fields': list((plan or FULL_PLAN).fields),
+        'json_format': json_format,
+        # Compact and JSON Lines output is written by orjson when it is installed, and
+        # its bytes may change between orjson versions
+        'orjson': _orjson_version() if json_format != 'pretty' else None,
+        'outputs': outputs,
+    }
+
+
+def expand_sfaf_paths(paths: Iterable[str]) -> List[str]:
+    """
+    Expand input arguments into a list of SFAF files.
+
+    Args:
+        paths: File paths, directories (every regular file directly inside,
+            sorted by name) and glob patterns (matches sorted by name)
+
+    Returns:
+        File paths in argument order, without duplicates
+
+    Raises:
+        FileNotFoundError: If an argument matches no file
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            matches = sorted(os.path.join(path, name) for name in os.listdir(path)
+                             if os.path.isfile(os.path.join(path, name)))
+        elif glob.has_magic(path):
+            matches = sorted(match for match in glob.glob(path) if os.path.isfile(match))
+        elif os.path.isfile(path):
+            matches = [path]
+        else:
+            matches = []
+        if not matches:
+            raise FileNotFoundError(f"No SFAF files found for: {path}")
+        files.extend(matches)
+    return list(dict.fromkeys(files))
+
+
+def batch_output_paths(col_file: str, output_dir: str, json_format: str = 'pretty') -> Tuple[str, str]:
+    """Return the (csv_file, json_file) written for one input of a per-file batch run."""
+    stem = os.path.splitext(os.path.basename(col_file))[0]
+    json_extension = '.jsonl' if json_format == 'jsonl' else '.json'
+    return os.path.join(output_dir, stem + '.csv'), os.path.join(output_dir, stem + json_extension)
+
+
+class ScannedRecord(NamedTuple):
+    """A raw record found by scan_sfaf_versions(), with what merging needs to know about it."""
+    index: int
+    start: int
+    end: int
+    digest: bytes
+    serial: Optional[str]
+    rank: Tuple[int, int, int, int]
+
+
+@functools.lru_cache(maxsize=DECODE_CACHE_SIZE)
+def _date_number(value: Optional[bytes]) -> int:
+    """YYYYMMDD date of a raw SFAF value as an integer, 0 if missing or invalid."""
+    if value is None:
+        return 0
+    try:
+        value = value.decode('ascii')
+        convert_date(value)
+    except ValueError:
+        return 0
+    return int(value)
+
+
+def version_rank(action: Optional[bytes], required: Optional[bytes], review: Optional[bytes],
+                 expiration: Optional[bytes]) -> Tuple[int, int, int, int]:
+    """
+    Order versions of the same assignment, the newest version ranking highest.
+
+    Versions are compared by REQUIRED DATE (140), then REVIEW DATE (142), then
+    TYPE OF ACTION (010, see ACTION_PRECEDENCE), then EXPIRATION DATE (141).
+    Missing or invalid dates rank below any valid date.
+
+    Args:
+        action, required, review, expiration: Raw values of items 010, 140, 142
+            and 141, or None if the record does not have them
+
+    Returns:
+        Tuple comparing higher for newer versions
+    """
+    action = ACTION_PRECEDENCE.get(action.decode('ascii', 'replace').upper(), 0) if action else 0
+    return _date_number(required), _date_number(review), action, _date_number(expiration)
+
+
+def scan_sfaf_versions(col_file: str) -> Iterator[ScannedRecord]:
+    """
+    Find the records of an SFAF file without parsing them.
+
+    The file is searched through a memory map for record boundaries and the
+    last lines of VERSION_TAGS; every record is hashed (ignoring the line
+    break style) to recognize exact duplicates. Record boundaries follow the
+    rules of iter_sfaf_line_records(), so parsing a record's byte range yields
+    exactly that record, and records are numbered like the parser's: a stray
+    924 line, outside any record, is the parser's empty record at the start of
+    the input and a repeat of the last record ended by a 924 line after it, so
+    it is scanned as the 924 line alone or as that record's byte range.
+
+    Args:
+        col_file: Path to the SFAF 1-column format file
+
+    Yields:
+        ScannedRecord for every record the parser would yield, in file order
+    """
+    import mmap
+
+    with open(col_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        carriage_returns = buffer.find(b'\r') >= 0
+        boundaries = _RECORD_BOUNDARY_CR if carriage_returns else _RECORD_BOUNDARY
+        start_tag, end_tag = RECORD_START_TAG.encode(), RECORD_END_TAG.encode()
+        delimiters = ((boundary.start() + 1, boundary.group(1)) for boundary in boundaries.finditer(buffer))
+        if buffer[:3] in (start_tag, end_tag):
+            delimiters = itertools.chain([(0, buffer[:3])], delimiters)
+        n = 0
+        start = None
+        # Last record ended by a 924 line, yielded again by the parser for a stray 924
+        terminated = None
+        for line_start, tag in delimiters:
+            if tag == start_tag:
+                if start is not None and _has_items(buffer[start:line_start]):
+                    yield _scan_record(n, start, line_start, buffer[start:line_start], carriage_returns)
+                    n += 1
+                start = line_start
+                continue
+            end = buffer.find(b'\n', line_start)
+            end = len(buffer) if end < 0 else end + 1
+            if carriage_returns:
+                line_end = buffer.find(b'\r', line_start, end)
+                if 0 <= line_end < end - 2:
+                    end = line_end + 1
+            if start is not None:
+                terminated = _scan_record(n, start, end, buffer[start:end], carriage_returns)
+                yield terminated
+            elif terminated is not None:
+                yield terminated._replace(index=n)
+            else:
+                # A stray 924 before any record: parsing the 924 line alone yields the same empty record
+                yield _scan_record(n, line_start, end, buffer[line_start:end], carriage_returns)
+            n += 1
+            start = None
+        if start is not None and _has_items(buffer[start:]):
+            yield _scan_record(n, start, len(buffer), buffer[start:], carriage_returns)
+    finally:
+        buffer.close()
+
+
+def _has_items(record: bytes) -> bool:
+    """Whether a record without 924 terminator has a value, i.e. whether the parser yields it."""
+    separator = SFAF_SEPARATOR.encode()
+    registered = {tag.encode() for tag in SFAF_FIELDS}
+    return any(line[:3] in registered and separator in line for line in record.splitlines()[1:])
+
+
+def _scan_record(n: int, start: int, end: int, record: bytes, carriage_returns: bool) -> ScannedRecord:
+    """ScannedRecord of the record bytes found by scan_sfaf_versions()."""
+    if carriage_returns:
+        record = record.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    separator = SFAF_SEPARATOR.encode()
+    # The value the parser keeps for each item: that of its last well-formed line
+    versions = []
+    for tag_line in _VERSION_TAG_LINES:
+        value = None
+        line_start = record.rfind(tag_line)
+        while line_start >= 0:
+            line_end = record.find(b'\n', line_start + 1)
+            fields = record[line_start + 1:line_end if line_end >= 0 else len(record)].split(separator, 2)
+            if len(fields) > 1:
+                value = fields[1].strip()
+                break
+            line_start = record.rfind(tag_line, 0, line_start)
+        versions.append(value)
+    action, serial, required, expiration, review = versions
+    return ScannedRecord(n, start, end, hashlib.blake2b(record, digest_size=RECORD_DIGEST_BYTES).digest(),
+                         serial.decode('utf-8', 'replace') if serial else None,
+                         version_rank(action, required, review, expiration))
+
+
+class MergeIndex:
+    """
+    The winning version of every assignment in a set of SFAF files, chosen before conversion.
+
+    Records are added in input order. Records with the same AGENCY SERIAL
+    NUMBER are versions of one assignment: identical ones (same digest) are
+    exact duplicates, and of the distinct versions the one with the highest
+    version_rank() wins, the first one on a tie. An assignment whose winning
+    version has TYPE OF ACTION D (deletion) is left out. Records without a
+    serial number, or with a blank one, are all kept.
+
+    Only one entry per assignment is kept, with the location of the winning
+    version and the digests of its versions, so memory grows with the number
+    of assignments, not with the number or size of input files. Indexes of
+    consecutive files can be built separately and combined with update().
+    """
+
+    def __init__(self):
+        # serial -> [rank, location, digest or set of distinct digests, number of records]
+        self.versions: Dict[str, list] = {}
+        self.unkeyed: List[Tuple[int, int, int, int]] = []
+        self.records = 0
+
+    def add_file(self, file_index: int, col_file: str) -> 'MergeIndex':
+        """Add every record of col_file, the file_index-th input; returns self."""
+        versions = self.versions
+        for record in scan_sfaf_versions(col_file):
+            self.records += 1
+            location = (file_index, record.index, record.start, record.end)
+            if record.serial is None:
+                self.unkeyed.append(location)
+                continue
+            entry = versions.get(record.serial)
+            if entry is None:
+                versions[record.serial] = [record.rank, location, record.digest, 1]
+                continue
+            entry[3] += 1
+            digests = entry[2]
+            if isinstance(digests, set):
+                digests.add(record.digest)
+            elif digests != record.digest:
+                entry[2] = {digests, record.digest}
+            if record.rank > entry[0]:
+                entry[0], entry[1] = record.rank, location
+        return self
+
+    def update(self, other: 'MergeIndex') -> None:
+        """Add the records of another index built from later input files."""
+        self.records += other.records
+        self.unkeyed.extend(other.unkeyed)
+        versions = self.versions
+        for serial, other_entry in other.versions.items():
+            entry = versions.get(serial)
+            if entry is None:
+                versions[serial] = other_entry
+                continue
+            entry[3] += other_entry[3]
+            digests = entry[2] if isinstance(entry[2], set) else {entry[2]}
+            if isinstance(other_entry[2], set):
+                digests.update(other_entry[2])
+            else:
+                digests.add(other_entry[2])
+            entry[2] = digests if len(digests) > 1 else digests.pop()
+            if other_entry[0] > entry[0]:
+                entry[0], entry[1] = other_entry[0], other_entry[1]
+
+    def counts(self) -> Dict[str, int]:
+        """
+        Summarize the merge.
+
+        Returns:
+            Dictionary with 'records' scanned, 'assignments' (distinct serial
+            numbers), 'duplicates' (exact copies of another version),
+            'superseded' (distinct versions that lost) and 'deleted'
+            (assignments left out because their winning version is a deletion)
+        """
+        duplicates = superseded = deleted = 0
+        for rank, _, digests, records in self.versions.values():
+            distinct = len(digests) if isinstance(digests, set) else 1
+            duplicates += records - distinct
+            superseded += distinct - 1
+            deleted += rank[2] == ACTION_PRECEDENCE['D']
+        return {'records': self.records, 'assignments': len(self.versions),
+                'duplicates': duplicates, 'superseded': superseded, 'deleted': deleted}
+
+    def selected_ranges(self, files: int) -> List[List[Tuple[int, int, int]]]:
+        """
+        Byte ranges of the records to convert.
+
+        Args:
+            files: Number of input files
+
+        Returns:
+            For every input file, the (index, start, end) of its kept records in file order
+        """
+        ranges = [[] for _ in range(files)]
+        for rank, (file_index, index, start, end), _, _ in self.versions.values():
+            if rank[2] != ACTION_PRECEDENCE['D']:
+                ranges[file_index].append((index, start, end))
+        for file_index, index, start, end in self.unkeyed:
+            ranges[file_index].append((index, start, end))
+        for file_ranges in ranges:
+            file_ranges.sort()
+        return ranges
+
+
+def _scan_merge_file(job: Tuple[int, str]) -> MergeIndex:
+    """Build the MergeIndex of one input file, in a worker process or in the main process."""
+    file_index, col_file = job
+    return MergeIndex().add_file(file_index, col_file)
+
+
+def _iter_byte_ranges(col_file: str, ranges: Iterable[Tuple[int, int, int]]) -> Iterator[bytes]:
+    """Iterate over the lines (without line breaks) of the given records of a file, reading adjacent records at once."""
+    with open(col_file, 'rb') as f:
+        block_start = block_end = None
+        for _, start, end in itertools.chain(ranges, [(None, None, None)]):
+            if start is not None and start == block_end and end - block_start <= MMAP_BLOCK_BYTES:
+                block_end = end
+                continue
+            if block_start is not None:
+                f.seek(block_start)
+                yield from f.read(block_end - block_start).splitlines()
+            block_start, block_end = start, end
+
+
+class _RenumberedDiagnostics:
+    """Diagnostics proxy reporting the n-th converted record under its index in the input file."""
+
+    def __init__(self, diagnostics: Diagnostics, indexes: List[int]):
+        self.diagnostics = diagnostics
+        self.indexes = indexes
+
+    def report(self, category: str, n: int, serial: Optional[str], detail: Optional[str] = None) -> None:
+        self.diagnostics.report(category, self.indexes[n], serial, detail)
+
+
+class _JsonPartWriter:
+    """Write serialized records to a part of a merged batch output, each followed by JSON_PART_SEPARATOR."""
+
+    def __init__(self, fp, json_format: str):
+        self.fp = fp
+        self.json_format = json_format
+
+    def write(self, record: Dict) -> None:
+        self.fp.write(format_json_record(record, self.json_format))
+        self.fp.write(JSON_PART_SEPARATOR)
+
+    def close(self) -> None:
+        """Nothing to terminate; present for symmetry with JsonArrayWriter."""
+
+
+def _iter_json_part(json_part: str) -> Iterator[str]:
+    """Iterate over the serialized records of a part written by _JsonPartWriter."""
+    with open(json_part, 'r', encoding='utf-8') as f:
+        rest = ''
+        for block in iter(functools.partial(f.read, MMAP_BLOCK_BYTES), ''):
+            fragments = (rest + block).split(JSON_PART_SEPARATOR)
+            rest = fragments.pop()
+            yield from fragments
+
+
+def _convert_batch_file(job: Tuple[str, str, Optional[str], str, bool, ConversionPlan,
+                                   Optional[List[Tuple[int, int, int]]]]
+                        ) -> Tuple[str, Dict[str, int], Diagnostics]:
+    """
+    Convert one file of a batch run, in a worker process or in the main process.
+
+    Args:
+        job: Tuple of (col_file, csv_file, json_file, json_format, keep_problems,
+            plan, ranges); no JSON is written if the plan has no JSON fields.
+            If ranges is not None, only the records at those (index, start, end)
+            byte ranges are converted (see MergeIndex) and the outputs are parts
+            of a merged output: json_file then holds the serialized records
+            separated by JSON_PART_SEPARATOR instead of a complete JSON document
+
+    Returns:
+        Tuple of (col_file, counts, diagnostics), where diagnostics holds the
+        problems found in the file (each one kept if keep_problems is set)
+    """
+    col_file, csv_file, json_file, json_format, keep_problems, plan, ranges = job
+    counts = {}
+    diagnostics = Diagnostics(keep_events=keep_problems)
+    if ranges is None:
+        parsed = iter_sfaf_records(col_file, compact=True, diagnostics=diagnostics, tags=plan.tags)
+        record_diagnostics = diagnostics
+    else:
+        record_diagnostics = _RenumberedDiagnostics(diagnostics, [index for index, _, _ in ranges])
+        parsed = iter_sfaf_byte_records(_iter_byte_ranges(col_file, ranges), record_diagnostics, plan.tags)
+    records = iter_processed_records(parsed, counts, record_diagnostics, plan)
+
+    with open(csv_file, 'w', newline='') as csvfile, \
+            (open(json_file, 'w', encoding='utf-8') if plan.fields else contextlib.nullcontext()) as file:
+        writer = csv.writer(csvfile)
+        if file is None:
+            for _, csv_sfaf in records:
+                writer.writerow(csv_sfaf)
+        else:
+            json_writer = open_json_writer(file, json_format) if ranges is None \
+                else _JsonPartWriter(file, json_format)
+            for processed_dict, csv_sfaf in records:
+                json_writer.write(processed_dict)
+                writer.writerow(csv_sfaf)
+            json_writer.close()
+    return col_file, counts, diagnostics
+
+
+def _map_bounded(executor: Optional[concurrent.futures.Executor], function, jobs: List, limit: int) -> Iterator:
+    """Like executor.map(), but with at most limit jobs submitted ahead of the result being consumed."""
+    if executor is None:
+        yield from map(function, jobs)
+        return
+    jobs = iter(jobs)
+    pending = collections.deque(executor.submit(function, job) for job in itertools.islice(jobs, limit))
+    while pending:
+        result = pending.popleft().result()
+        pending.extend(executor.submit(function, job) for job in itertools.islice(jobs, 1))
+        yield result
+
+
+def convert_batch(col_files: List[str], workers: int = 1, output_dir: Optional[str] = None,
+                  csv_file: Optional[str] = None, json_file: Optional[str] = None,
+                  counts: Optional[Dict[str, int]] = None, columnar_writer=None,
+                  json_format: str = 'pretty', diagnostics: Optional[Diagnostics] = None,
+                  plan: Optional[ConversionPlan] = None) -> None:
+    """
+    Convert several SFAF files, one file per worker process at a time.
+
+    With output_dir every input gets its own CSV and JSON file (see
+    batch_output_paths()). Otherwise the records of all inputs are merged into
+    csv_file and json_file in input order. Merging happens before conversion:
+    the files are first scanned for versions of each AGENCY SERIAL NUMBER
+    (see MergeIndex), then only the winning version of every assignment is
+    parsed and converted, so exact duplicates, superseded versions and deleted
+    assignments cost no conversion work. Converted files are written to
+    temporary parts next to csv_file and appended to the outputs in input
+    order, so memory does not grow with the size of the output.
+
+    Args:
+        col_files: Paths of the SFAF 1-column format files
+        workers: Number of files converted concurrently; 1 converts in this process
+        output_dir: Directory for per-file outputs, or None to merge
+        csv_file: Path of the merged CSV output
+        json_file: Path of the merged JSON output
+        counts: Optional dictionary updated in place with 'files', 'processed',
+            'skipped' and (when merging) 'duplicates', 'superseded' and
+            'deleted' totals (see MergeIndex.counts())
+        columnar_writer: Optional columnar.ColumnarWriter receiving the merged records
+        json_format: One of JSON_FORMATS
+        diagnostics: Optional Diagnostics the problems of every file are merged
+            into, with record numbers counted per file
+        plan: Optional ConversionPlan restricting the fields that are converted;
+            it must build CSV rows, and JSON outputs are not written if it has
+            no JSON fields
+
+    Raises:
+        ValueError: If output files would collide or the plan builds no CSV rows
+    """
+    if counts is None:
+        counts = {}
+    for key in ('files', 'processed', 'skipped'):
+        counts.setdefault(key, 0)
+    if plan is None:
+        plan = FULL_PLAN
+    if not plan.csv_rows:
+        raise ValueError("Batch conversion needs a plan that builds CSV rows")
+
+    import shutil
+    import tempfile
+
+    keep_problems = diagnostics is not None and diagnostics.rejects is not None
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+        jobs = [(col_file,) + batch_output_paths(col_file, output_dir, json_format)
+                + (json_format, keep_problems, plan, None) for col_file in col_files]
+        targets = [job[1] for job in jobs]
+        if len(set(targets)) != len(targets):
+            raise ValueError("Input files with the same name would overwrite each other's output")
+
+    def merge(results, csvfile, json_writer):
+        for (col_file, file_counts, file_diagnostics), job in zip(results, jobs):
+            csv_part, json_part = job[1], job[2]
+            yield col_file, file_counts, file_diagnostics
+            with open(csv_part, 'r', newline='') as part:
+                shutil.copyfileobj(part, csvfile)
+            os.remove(csv_part)
+            if json_writer is not None:
+                for json_fragment in _iter_json_part(json_part):
+                    json_writer.write_formatted(json_fragment)
+                    if columnar_writer is not None:
+                        columnar_writer.write(json.loads(json_fragment))
+                os.remove(json_part)
+
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    parts_dir = None
+    try:
+        if output_dir is None:
+            index = MergeIndex()
+            scan_jobs = list(enumerate(col_files))
+            for file_merge_index in (executor.map(_scan_merge_file, scan_jobs) if executor
+                                     else map(_scan_merge_file, scan_jobs)):
+                index.update(file_merge_index)
+            merge_counts = index.counts()
+            logger.info(f"Scanned {merge_counts['records']} records of {merge_counts['assignments']} "
+                        f"assignments in {len(col_files)} files")
+            for key in ('duplicates', 'superseded', 'deleted'):
+                counts[key] = counts.get(key, 0) + merge_counts[key]
+            ranges = index.selected_ranges(len(col_files))
+            del index
+            # Every file is converted into part files next to the output, which are
+            # appended to it in input order, so no converted records are held in memory
+            parts_dir = tempfile.mkdtemp(prefix='.sfaf_merge_', dir=os.path.dirname(os.path.abspath(csv_file)))
+            jobs = [(col_file, os.path.join(parts_dir, f'{n}.csv'), os.path.join(parts_dir, f'{n}.json'),
+                     json_format, keep_problems, plan, file_ranges)
+                    for n, (col_file, file_ranges) in enumerate(zip(col_files, ranges))]
+            del ranges
+        # At most two files per worker are converted ahead of the one being written out
+        results = _map_bounded(executor, _convert_batch_file, jobs, 2 * workers)
+        if output_dir is None:
+            with open(csv_file, 'w', newline='') as csvfile, \
+                    (open(json_file, 'w', encoding='utf-8') if plan.fields else contextlib.nullcontext()) as file:
+                json_writer = open_json_writer(file, json_format) if file is not None else None
+                _log_batch_progress(merge(results, csvfile, json_writer), len(jobs), counts, diagnostics)
+                if json_writer is not None:
+                    json_writer.close()
+        else:
+            _log_batch_progress(results, len(jobs), counts, diagnostics)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if parts_dir is not None:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+
+
+def _log_batch_progress(results: Iterable[Tuple[str, Dict[str, int], Diagnostics]], total: int,
+                        counts: Dict[str, int], diagnostics: Optional[Diagnostics] = None) -> None:
+    """Add up per-file counts and problems and log one progress line per converted file."""
+    for n, (col_file, file_counts, file_diagnostics) in enumerate(results, 1):
+        if diagnostics is not None:
+            diagnostics.merge(file_diagnostics, source=col_file)
+        counts['files'] += 1
+        counts['processed'] += file_counts['processed']
+        counts['skipped'] += file_counts['skipped']
+        logger.info(f"[{n}/{total}] {col_file}: {file_counts['processed']} records, "
+                    f"skipped {file_counts['skipped']}")
+
+
+def main() -> None:
+    """
+    Main function to process SFAF files and convert to CSV/JSON formats.
+    
+    Parses command line arguments, processes the SFAF file, and outputs
+    results in CSV and JSON formats for use with CRFS tools. Records are
+    streamed from the input file to both outputs one at a time.
+    """
+    # Set up argument parser
+    parser = argparse.ArgumentParser(description='Process SFAF 1-column file and convert to CSV with lat, long, center freq, bandwidth, and serial number')
+    parser.add_argument('sfaf_files', nargs='+', metavar='sfaf_file',
+                       help='SFAF 1-column file to process; several files, directories and glob '
+                            'patterns are converted as a batch')
+    parser.add_argument('--output', '-o', default='recordsspreadsheet.csv', 
+                       help='Output CSV filename (default: recordsspreadsheet.csv)')
+    parser.add_argument('--json-output', '-j', default='records.json',
+                       help='Output JSON filename (default: records.json)')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                       help='Enable verbose logging')
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                       help='Number of worker processes for parsing and conversion (default: 1)')
+    parser.add_argument('--incremental', metavar='STATE_FILE', default=None,
+                       help='Only convert records that changed since the last run with this state file')
+    parser.add_argument('--json-format', choices=JSON_FORMATS, default='pretty',
+                       help='JSON output layout: pretty (indented array), compact (array without '
+                            'whitespace) or jsonl (one record per line) (default: pretty)')
+    parser.add_argument('--fields', metavar='NAMES', default=None,
+                       help='Comma-separated fields of the JSON records (default: all); only the SFAF '
+                            'items these fields and the CSV columns need are parsed and converted')
+    parser.add_argument('--no-json', action='store_true',
+                       help='Only write the CSV output, skipping all JSON conversion')
+    parser.add_argument('--columnar-output', metavar='DIR', default=None,
+                       help='Also write a memory-mappable columnar cache of the records to DIR')
+    parser.add_argument('--output-dir', metavar='DIR', default=None,
+                       help='Batch mode: write <name>.csv and <name>.json for every input file to DIR')
+    parser.add_argument('--merge', action='store_true',
+                       help='Batch mode: merge all input files into --output/--json-output, keeping '
+                            'the newest version of each AGENCY SERIAL NUMBER by its dates (140/142) and '
+                            'TYPE OF ACTION (010) and dropping deleted assignments')
+    parser.add_argument('--mmap', action='store_true',
+                       help='Read the input through a memory map, parsing bytes and decoding only '
+                            'the stored values')
+    parser.add_argument('--cache-dir', metavar='DIR', default=None,
+                       help='Reuse the outputs of an identical earlier conversion from this (possibly '
+                            'shared) cache directory, and store new conversions in it')
+    parser.add_argument('--cache-max-mb', type=int, default=4096,
+                       help='Size limit of --cache-dir in MiB; least recently used entries are '
+                            'evicted beyond it (default: 4096)')
+    parser.add_argument('--rejects', metavar='FILE', default=None,
+                       help='Write every problem found in the records (skipped records, defaulted '
+                            'values, malformed lines) to FILE as JSON Lines')
+    parser.add_argument('--stats', action='store_true',
+                       help='Log per-stage timings, peak memory, SFAF tag counts and converter '
+                            'call/failure counts')
+    parser.add_argument('--stats-json', metavar='FILE', default=None,
+                       help='Write the --stats metrics as JSON to FILE')
+    parser.add_argument('--profile', metavar='FILE', default=None,
+                       help='Run the conversion under cProfile and dump the profile to FILE '
+                            '(main process only)')
+    
+    # Parse arguments
+    args = parser.parse_args()
+    
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.incremental and args.workers > 1:
+        parser.error('--incremental cannot be combined with --workers')
+    if args.merge and args.output_dir:
+        parser.error('--merge cannot be combined with --output-dir')
+    if args.mmap and args.incremental:
+        parser.error('--mmap cannot be combined with --incremental')
+    if args.no_json and (args.fields is not None or args.columnar_output):
+        parser.error('--no-json cannot be combined with --fields or --columnar-output')
+    if (args.fields is not None or args.no_json) and args.incremental:
+        parser.error('--fields and --no-json cannot be combined with --incremental')
+    try:
+        if args.no_json:
+            args.plan = compile_plan([])
+        elif args.fields is not None:
+            args.plan = compile_plan(name.strip() for name in args.fields.split(',') if name.strip())
+        else:
+            args.plan = FULL_PLAN
+    except ValueError as e:
+        parser.error(str(e))
+
+    configure_logging(args.verbose)
+
+    try:
+        sfaf_files = expand_sfaf_paths(args.sfaf_files)
+    except FileNotFoundError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+    collect_stats = args.stats or args.stats_json is not None
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    if len(sfaf_files) > 1 or args.merge or args.output_dir:
+        if collect_stats:
+            parser.error('--stats and --stats-json need a single input file')
+        if args.mmap:
+            parser.error('--mmap needs a single input file')
+        if args.cache_dir:
+            parser.error('--cache-dir needs a single input file')
+        if args.incremental:
+            parser.error('--incremental cannot be combined with several input files')
+        if args.columnar_output and not args.merge:
+            parser.error('--columnar-output with several input files requires --merge')
+        if not args.merge and not args.output_dir:
+            args.output_dir = '.'
+        _main_batch(args, sfaf_files)
+        _dump_profile(profiler, args.profile)
+        return
+    if collect_stats and args.incremental:
+        parser.error('--stats and --stats-json cannot be combined with --incremental')
+    if args.cache_dir and (args.incremental or collect_stats):
+        parser.error('--cache-dir cannot be combined with --incremental, --stats or --stats-json')
+
+    args.sfaf_file = sfaf_files[0]
+    
+    logger.info(f"Starting SFAF processing for file: {args.sfaf_file}")
+    
+    # Check if input file exists
+    try:
+        with open(args.sfaf_file, 'r') as f:
+            pass
+    except FileNotFoundError:
+        logger.error(f"File not found: {args.sfaf_file}")
+        sys.exit(1)
+    
+    counts = {}
+    columnar_writer = None
+    cache = cache_key = cached_counts = None
+    rejects = None
+    diagnostics = Diagnostics()
+    start = time.perf_counter()
+    plan = args.plan
+    outputs = {'csv': args.output}
+    if plan.fields:
+        outputs['json'] = args.json_output
+    if args.columnar_output:
+        outputs['columnar'] = args.columnar_output
+    if args.rejects:
+        outputs['rejects'] = args.rejects
+
+    try:
+        if args.cache_dir:
+            from conversion_cache import ConversionCache
+            cache = ConversionCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+            cache_key = cache.key(args.sfaf_file, conversion_options(args.json_format, sorted(outputs), plan))
+            cached_counts = cache.restore(cache_key, outputs)
+        if args.columnar_output and cached_counts is None:
+            from columnar import ColumnarWriter
+            columnar_writer = ColumnarWriter(args.columnar_output)
+        if args.rejects and cached_counts is None:
+            rejects = diagnostics.rejects = open(args.rejects, 'w', encoding='utf-8')
+        if collect_stats:
+            instrument_converters()
+
+        if cached_counts is not None:
+            diagnostics = Diagnostics.from_dict(cached_counts.pop('diagnostics', {}))
+            counts.update(cached_counts)
+            logger.info(f"Reused cached conversion {cache_key[:16]} from {args.cache_dir}")
+        elif args.incremental:
+            convert_incremental(args.sfaf_file, args.output, args.json_output, args.incremental, counts,
+                                columnar_writer, args.json_format, diagnostics)
+            counts.update(decode_cache_counts())
+        else:
+            # Stream records to the output files
+            with open(args.output, 'w', newline='') as csvfile, \
+                    (open(args.json_output, mode="w", encoding='utf-8') if plan.fields
+                     else contextlib.nullcontext()) as file:
+                writer = csv.writer(csvfile)
+                json_writer = open_json_writer(file, args.json_format) if file is not None else None
+                write_columnar = columnar_writer.write if columnar_writer is not None else None
+                if args.workers > 1:
+                    write_json = json_writer.write_formatted if json_writer is not None else None
+                    write_csv = csvfile.write
+                    if collect_stats:
+                        if write_json is not None:
+                            write_json = timed_call(write_json, counts, 'write_json')
+                        write_csv = timed_call(write_csv, counts, 'write_csv')
+                        if write_columnar is not None:
+                            write_columnar = timed_call(write_columnar, counts, 'write_columnar')
+                    chunks = iter_converted_chunks(args.sfaf_file, args.workers, counts, args.json_format,
+                                                   collect_stats, args.mmap, diagnostics, plan)
+                    for json_fragments, csv_text in chunks:
+                        for text in json_fragments:
+                            write_json(text)
+                            if write_columnar is not None:
+                                write_columnar(json.loads(text))
+                        write_csv(csv_text)
+                else:
+                    write_json = json_writer.write if json_writer is not None else None
+                    write_csv = writer.writerow
+                    read_records = iter_sfaf_records_mmap if args.mmap else iter_sfaf_records
+                    if collect_stats:
+                        parsed = timed_iter(read_records(args.sfaf_file, counts, compact=True,
+                                                         diagnostics=diagnostics, tags=plan.tags), counts, 'parse')
+                        records = timed_iter(iter_processed_records(parsed, counts, diagnostics, plan), counts,
+                                             'parse_convert')
+                        if write_json is not None:
+                            write_json = timed_call(write_json, counts, 'write_json')
+                        write_csv = timed_call(write_csv, counts, 'write_csv')
+                        if write_columnar is not None:
+                            write_columnar = timed_call(write_columnar, counts, 'write_columnar')
+                    else:
+                        records = iter_processed_records(read_records(args.sfaf_file, compact=True,
+                                                                      diagnostics=diagnostics, tags=plan.tags),
+                                                         counts, diagnostics, plan)
+                    if write_json is None:
+                        for _, csv_sfaf in records:
+                            write_csv(csv_sfaf)
+                    else:
+                        for processed_dict, csv_sfaf in records:
+                            write_json(processed_dict)
+                            write_csv(csv_sfaf)
+                            if write_columnar is not None:
+                                write_columnar(processed_dict)
+                    counts.update(decode_cache_counts())
+                    if collect_stats:
+                        counts.update(converter_counts())
+                if json_writer is not None:
+                    json_writer.close()
+
+        if columnar_writer is not None:
+            columnar_writer.close()
+            columnar_writer = None
+        if rejects is not None:
+            rejects.close()
+        if cache is not None and cached_counts is None:
+            cache.store(cache_key, outputs, dict(counts, diagnostics=diagnostics.to_dict()))
+    except ValueError as e:
+        logger.error(f"Failed to process SFAF file: {e}")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"Failed to write output files: {e}")
+        sys.exit(1)
+    finally:
+        if columnar_writer is not None:
+            columnar_writer.discard()
+        if rejects is not None:
+            rejects.close()
+    wall_seconds = time.perf_counter() - start
+    _dump_profile(profiler, args.profile)
+    diagnostics.log_summary()
+
+    if args.incremental:
+        logger.info(f"Incremental update: {counts['added']} added, {counts['modified']} modified, "
+                    f"{counts['unchanged']} unchanged, {counts['deleted']} deleted")
+    logger.info(f"Successfully processed {counts['processed']} records, skipped {counts['skipped']} records")
+    logger.debug(f"Frequency decode cache: {counts['frequency_cache_hits']} hits, "
+                 f"{counts['frequency_cache_misses']} misses")
+    logger.debug(f"Emission designator decode cache: {counts['emission_cache_hits']} hits, "
+                 f"{counts['emission_cache_misses']} misses")
+    logger.debug(f"Date decode cache: {counts['date_cache_hits']} hits, {counts['date_cache_misses']} misses")
+    logger.info(f"CSV output saved to: {args.output}")
+    if plan.fields:
+        logger.info(f"JSON output saved to: {args.json_output}")
+    if args.columnar_output:
+        logger.info(f"Columnar cache saved to: {args.columnar_output}")
+    if args.rejects:
+        logger.info(f"Rejects saved to: {args.rejects}")
+
+    if collect_stats:
+        stats = build_stats(counts, wall_seconds, args.sfaf_file, args.workers)
+        if args.stats:
+            log_stats(stats)
+        if args.stats_json:
+            with open(args.stats_json, 'w', encoding='utf-8') as f:
+                json.dump(stats, f, indent=4)
+            logger.info(f"Stats saved to: {args.stats_json}")
+
+
+def _dump_profile(profiler, profile_file: Optional[str]) -> None:
+    """Stop a --profile run and write its statistics (readable with pstats or snakeviz)."""
+    if profiler is None:
+        return
+    profiler.disable()
+    profiler.dump_stats(profile_file)
+    logger.info(f"Profile saved to: {profile_file}")
+
+
+def _main_batch(args: argparse.Namespace, sfaf_files: List[str]) -> None:
+    """Run a batch conversion for main() and log the throughput summary."""
+    logger.info(f"Starting SFAF batch processing of {len(sfaf_files)} files with {args.workers} workers")
+    counts = {}
+    columnar_writer = None
+    diagnostics = Diagnostics()
+    start = time.perf_counter()
+    try:
+        if args.columnar_output:
+            from columnar import ColumnarWriter
+            columnar_writer = ColumnarWriter(args.columnar_output)
+        if args.rejects:
+            diagnostics.rejects = open(args.rejects, 'w', encoding='utf-8')
+        convert_batch(sfaf_files, args.workers, None if args.merge else args.output_dir,
+                      args.output, args.json_output, counts, columnar_writer, args.json_format, diagnostics,
+                      args.plan)
+        if columnar_writer is not None:
+            columnar_writer.close()
+            columnar_writer = None
+    except ValueError as e:
+        logger.error(f"Failed to process SFAF files: {e}")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"Failed to write output files: {e}")
+        sys.exit(1)
+    finally:
+        if columnar_writer is not None:
+            columnar_writer.discard()
+        if diagnostics.rejects is not None:
+            diagnostics.rejects.close()
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    diagnostics.log_summary()
+
+    logger.info(f"Successfully processed {counts['processed']} records, skipped {counts['skipped']} records "
+                f"from {counts['files']} files")
+    if args.merge:
+        logger.info(f"Merged before conversion: dropped {counts['duplicates']} exact duplicates, "
+                    f"{counts['superseded']} superseded versions and {counts['deleted']} deleted assignments")
+        logger.info(f"CSV output saved to: {args.output}")
+        if args.plan.fields:
+            logger.info(f"JSON output saved to: {args.json_output}")
+        if args.columnar_output:
+            logger.info(f"Columnar cache saved to: {args.columnar_output}")
+    else:
+        logger.info(f"Output saved to: {args.output_dir}")
+    if args.rejects:
+        logger.info(f"Rejects saved to: {args.rejects}")
+    logger.info(f"Converted {counts['files']} files in {elapsed:.2f} s: {counts['files'] / elapsed:.2f} files/sec, "
+                f"{counts['processed'] / elapsed:.0f} records/sec")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,181 @@
+"""
+Library API for embedding the SFAF converter in long-running applications.
+
+SfafConverter wraps the parser and the convert_* functions of main.py behind
+an object that is configured once (JSON fields, CSV rows, JSON format) and
+then called for any number of files or in-memory exports. Nothing is read
+from the command line, no logging is configured and errors are raised as
+exceptions instead of exiting the process.
+
+The compiled conversion plan, the regular expressions, the parser's
+dispatch tables and the memoized frequency/emission designator decoders are
+built once and shared by all calls. A converter keeps no per-call state,
+so one instance can be shared by any number of threads; the counts and
+Diagnostics of a call belong to that call.
+
+Usage:
+    from sfaf_converter import SfafConverter
+    converter = SfafConverter(fields=['agency_serial', 'center_frequency', 'bandwidth'])
+    result = converter.convert_bytes(upload)
+    print(result.counts, result.csv)
+"""
+import contextlib
+import csv
+import io
+import itertools
+import logging
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import main as sfaf
+from diagnostics import Diagnostics
+
+
+logger = logging.getLogger(__name__)
+
+
+class ConversionResult(NamedTuple):
+    """
+    Outputs of SfafConverter.convert_bytes().
+
+    Attributes:
+        json: JSON output in the converter's JSON format, '' if it has no JSON fields
+        csv: CSV output, '' if the converter builds no CSV rows
+        counts: 'processed' and 'skipped' record counts
+        diagnostics: Problems found in the records
+    """
+    json: str
+    csv: str
+    counts: Dict[str, int]
+    diagnostics: Diagnostics
+
+
+class SfafConverter:
+    """
+    Reusable, thread-safe SFAF to CSV/JSON converter.
+
+    Args:
+        fields: JSON fields to convert (see main.compile_plan()), None for all
+        csv_rows: Build the CSV rows of the main CSV output
+        json_format: One of main.JSON_FORMATS
+
+    Raises:
+        ValueError: If a field or the JSON format is unknown
+    """
+
+    def __init__(self, fields: Optional[Iterable[str]] = None, csv_rows: bool = True,
+                 json_format: str = 'pretty'):
+        if json_format not in sfaf.JSON_FORMATS:
+            raise ValueError(f"Unknown JSON format: {json_format}")
+        self.plan = sfaf.compile_plan(fields, csv_rows)
+        self.json_format = json_format
+
+    def __repr__(self) -> str:
+        return (f"SfafConverter(fields={list(self.plan.fields)!r}, csv_rows={self.plan.csv_rows!r}, "
+                f"json_format={self.json_format!r})")
+
+    def iter_records(self, source: Union[str, bytes, Iterable], counts: Optional[Dict[str, int]] = None,
+                     diagnostics: Optional[Diagnostics] = None) -> Iterator[Tuple[Dict, Optional[List]]]:
+        """
+        Parse and convert records one at a time.
+
+        Args:
+            source: Path of an SFAF 1-column file, the contents of one as bytes,
+                or an iterable of its lines (str or bytes, e.g. an open file)
+            counts: Optional dictionary updated in place with 'processed' and 'skipped' totals
+            diagnostics: Optional Diagnostics receiving the problems found in the
+                records; problems are logged as warnings without one
+
+        Yields:
+            Tuples of (processed_dict, csv_row) for every record that is not
+            skipped; processed_dict holds the converter's JSON fields and
+            csv_row is None if it builds no CSV rows
+
+        Raises:
+            FileNotFoundError: If source is a path that doesn't exist
+            ValueError: If the input cannot be decoded as UTF-8
+        """
+        if isinstance(source, str):
+            records = sfaf.iter_sfaf_records(source, compact=True, diagnostics=diagnostics, tags=self.plan.tags)
+        elif isinstance(source, (bytes, bytearray)):
+            records = sfaf.iter_sfaf_byte_records(source.splitlines(), diagnostics, self.plan.tags)
+        else:
+            records = self._iter_line_records(source, diagnostics)
+        return sfaf.iter_processed_records(records, counts, diagnostics, self.plan)
+
+    def _iter_line_records(self, lines: Iterable, diagnostics: Optional[Diagnostics]) -> Iterator:
+        """Parse an iterable of str or bytes lines, choosing the parser from its first line."""
+        lines = iter(lines)
+        first = next(lines, None)
+        if first is None:
+            return iter(())
+        parse = sfaf.iter_sfaf_line_records if isinstance(first, str) else sfaf.iter_sfaf_byte_records
+        return parse(itertools.chain([first], lines), diagnostics, self.plan.tags)
+
+    def convert_bytes(self, data: Union[bytes, str], diagnostics: Optional[Diagnostics] = None
+                      ) -> ConversionResult:
+        """
+        Convert an SFAF export held in memory.
+
+        Args:
+            data: SFAF 1-column text, as bytes (UTF-8) or str
+            diagnostics: Optional Diagnostics receiving the problems found; a new
+                one is created if not given
+
+        Returns:
+            ConversionResult with the same JSON and CSV text that convert_file() writes
+
+        Raises:
+            ValueError: If the input cannot be decoded as UTF-8
+        """
+        if diagnostics is None:
+            diagnostics = Diagnostics()
+        counts = {}
+        lines = data.splitlines() if isinstance(data, str) else data
+        json_buffer, csv_buffer = io.StringIO(), io.StringIO(newline='')
+        self._write(self.iter_records(lines, counts, diagnostics), json_buffer, csv_buffer)
+        return ConversionResult(json_buffer.getvalue(), csv_buffer.getvalue(), counts, diagnostics)
+
+    def convert_file(self, col_file: str, csv_file: Optional[str] = None, json_file: Optional[str] = None,
+                     diagnostics: Optional[Diagnostics] = None) -> Dict[str, int]:
+        """
+        Convert an SFAF file, streaming the records to the output files.
+
+        Args:
+            col_file: Path to the SFAF 1-column format file
+            csv_file: Path of the CSV output, or None to skip it
+            json_file: Path of the JSON output, or None to skip it
+            diagnostics: Optional Diagnostics receiving the problems found
+
+        Returns:
+            Dictionary with the 'processed' and 'skipped' record counts
+
+        Raises:
+            FileNotFoundError: If the input file doesn't exist
+            ValueError: If the input file is invalid, or an output is requested
+                that the converter does not build
+        """
+        if csv_file is not None and not self.plan.csv_rows:
+            raise ValueError("This converter builds no CSV rows")
+        if json_file is not None and not self.plan.fields:
+            raise ValueError("This converter has no JSON fields")
+        counts = {}
+        with (open(json_file, 'w', encoding='utf-8') if json_file is not None
+              else contextlib.nullcontext()) as json_out, \
+                (open(csv_file, 'w', newline='') if csv_file is not None
+                 else contextlib.nullcontext()) as csv_out:
+            self._write(self.iter_records(col_file, counts, diagnostics), json_out, csv_out)
+        return counts
+
+    def _write(self, records: Iterator[Tuple[Dict, Optional[List]]], json_out, csv_out) -> None:
+        """Write converted records to open JSON and CSV text files, either of which may be None."""
+        json_writer = sfaf.open_json_writer(json_out, self.json_format) \
+            if json_out is not None and self.plan.fields else None
+        csv_writer = csv.writer(csv_out) if csv_out is not None and self.plan.csv_rows else None
+        for processed_dict, csv_row in records:
+            if json_writer is not None:
+                json_writer.write(processed_dict)
+            if csv_writer is not None:
+                csv_writer.writerow(csv_row)
+        if json_writer is not None:
+            json_writer.close()
+
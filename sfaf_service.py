@@ -0,0 +1,527 @@
+#!/usr/bin/env python3
+"""
+Asynchronous SFAF conversion service.
+
+Runs an HTTP server that converts SFAF 1-column uploads on the fly. The
+request body is cut into batches of whole records as it arrives, each batch is
+parsed and converted in a pool of worker processes with the same code as
+main.py, and the converted records are streamed back in upload order as CSV
+(same rows as the main CSV output) or JSON Lines. Uploads beyond
+--max-uploads are rejected with 503 rather than queued.
+
+Endpoints:
+    POST /convert?format=csv|jsonl   SFAF file as the request body (plain or chunked)
+    GET  /health                     JSON with the number of active uploads
+
+The processed/skipped record counts are sent as HTTP trailers. The client
+subcommand is a minimal HTTP client for trying the service locally.
+
+Usage:
+    python sfaf_service.py serve --port 8080 --workers 4 --max-uploads 8
+    python sfaf_service.py client your_sfaf_file.txt --format csv -o records.csv
+    curl -T your_sfaf_file.txt 'http://localhost:8080/convert?format=jsonl'
+"""
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import csv
+import io
+import json
+import logging
+import sys
+import time
+import urllib.parse
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import main as sfaf
+from diagnostics import Diagnostics
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+# Approximate size of the batches of whole records handed to the workers
+UPLOAD_BATCH_BYTES = 1024 * 1024
+# Bytes read from the socket or the uploaded file at a time
+READ_SIZE = 64 * 1024
+# Upper bound on the request line and headers
+MAX_HEADER_BYTES = 64 * 1024
+# Seconds an error response waits for the client to stop uploading
+LINGER_SECONDS = 2.0
+# Output formats and their content types
+OUTPUT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson',
+}
+REASONS = {
+    100: 'Continue', 200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    411: 'Length Required', 413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable',
+}
+# 005 lines after a LF (or CRLF) and after a lone CR line break, where batches are cut
+_RECORD_START = b'\n' + sfaf.RECORD_START_TAG.encode()
+_RECORD_START_CR = b'\r' + sfaf.RECORD_START_TAG.encode()
+
+
+class HttpError(Exception):
+    """Request error answered with an HTTP status code."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def convert_upload_batch(data: bytes, output_format: str) -> Tuple[str, Dict[str, int], Diagnostics]:
+    """
+    Parse and convert a batch of whole SFAF records in a worker process.
+
+    Args:
+        data: SFAF 1-column text as bytes, cut at record boundaries
+        output_format: 'csv' or 'jsonl'
+
+    Returns:
+        Tuple of (text, counts, diagnostics) with the converted records in the
+        output format, the processed/skipped totals of the batch and the
+        problems found in it, numbered from the first record of the batch
+    """
+    counts = {}
+    diagnostics = Diagnostics()
+    records = sfaf.iter_processed_records(sfaf.iter_sfaf_byte_records(data.splitlines(), diagnostics),
+                                          counts, diagnostics)
+    out = io.StringIO(newline='')
+    if output_format == 'csv':
+        writerow = csv.writer(out).writerow
+        for _, csv_sfaf in records:
+            writerow(csv_sfaf)
+    else:
+        for processed_dict, _ in records:
+            out.write(sfaf.format_json_record(processed_dict, 'jsonl'))
+            out.write('\n')
+    return out.getvalue(), counts, diagnostics
+
+
+class RecordSplitter:
+    """
+    Cut a stream of SFAF bytes into batches that end at record boundaries.
+
+    A batch is released once at least batch_bytes are buffered, ending just
+    before the last 005 line seen, so no record is split between batches and
+    converting the batches one after another gives the same records as
+    converting the whole file. LF, CRLF and CR-only line breaks are all
+    recognized, so uploads with any of them are converted batch by batch.
+    """
+
+    def __init__(self, batch_bytes: int = UPLOAD_BATCH_BYTES):
+        self.batch_bytes = batch_bytes
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes) -> Optional[bytes]:
+        """Add received bytes; returns a batch of whole records if one is ready."""
+        self.buffer += data
+        if len(self.buffer) < self.batch_bytes:
+            return None
+        cut = max(self.buffer.rfind(_RECORD_START), self.buffer.rfind(_RECORD_START_CR))
+        if cut < 0:
+            return None
+        batch = bytes(self.buffer[:cut + 1])
+        del self.buffer[:cut + 1]
+        return batch
+
+    def close(self) -> bytes:
+        """Return whatever is left at the end of the upload."""
+        batch = bytes(self.buffer)
+        self.buffer.clear()
+        return batch
+
+
+async def read_request(reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str]]:
+    """
+    Read an HTTP request line and headers.
+
+    Returns:
+        Tuple of (method, target, headers) with lower-case header names
+
+    Raises:
+        HttpError: If the request is malformed or the headers are too large
+    """
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.LimitOverrunError:
+        raise HttpError(400, 'Request headers too large')
+    except asyncio.IncompleteReadError:
+        raise HttpError(400, 'Incomplete request')
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, _ = lines[0].split(' ', 2)
+    except ValueError:
+        raise HttpError(400, f'Malformed request line: {lines[0]!r}')
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+    return method, target, headers
+
+
+async def iter_body(reader: asyncio.StreamReader, headers: Dict[str, str],
+                    max_bytes: Optional[int] = None) -> AsyncIterator[bytes]:
+    """
+    Yield the request body as it arrives, plain (Content-Length) or chunked.
+
+    Raises:
+        HttpError: If the body has no length, is malformed or exceeds max_bytes
+    """
+    received = 0
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size_line = await reader.readline()
+            try:
+                size = int(size_line.split(b';', 1)[0], 16)
+            except ValueError:
+                raise HttpError(400, 'Malformed chunk size')
+            if size == 0:
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass  # skip trailers
+                return
+            received += size
+            if max_bytes is not None and received > max_bytes:
+                raise HttpError(413, f'Upload larger than {max_bytes} bytes')
+            try:
+                data = await reader.readexactly(size)
+                await reader.readexactly(2)
+            except asyncio.IncompleteReadError:
+                raise HttpError(400, 'Upload ended inside a chunk')
+            yield data
+    elif 'content-length' in headers:
+        try:
+            remaining = int(headers['content-length'])
+        except ValueError:
+            raise HttpError(400, 'Malformed Content-Length')
+        if max_bytes is not None and remaining > max_bytes:
+            raise HttpError(413, f'Upload larger than {max_bytes} bytes')
+        while remaining > 0:
+            data = await reader.read(min(READ_SIZE, remaining))
+            if not data:
+                raise HttpError(400, 'Upload ended before Content-Length bytes')
+            remaining -= len(data)
+            yield data
+    else:
+        raise HttpError(411, 'Content-Length or chunked Transfer-Encoding required')
+
+
+def _status_line(status: int) -> bytes:
+    return f'HTTP/1.1 {status} {REASONS.get(status, "Error")}\r\n'.encode('latin-1')
+
+
+async def send_response(writer: asyncio.StreamWriter, status: int, body: bytes,
+                        content_type: str = 'text/plain; charset=utf-8') -> None:
+    """Send a complete, non-streamed response."""
+    writer.write(_status_line(status))
+    writer.write(f'Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n'
+                 f'Connection: close\r\n\r\n'.encode('latin-1'))
+    writer.write(body)
+    await writer.drain()
+
+
+async def linger(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """
+    Half-close the connection and discard what the client is still uploading.
+
+    Closing with unread upload data pending makes the kernel reset the
+    connection, which can destroy an error response before the client reads it.
+    """
+    if writer.can_write_eof():
+        writer.write_eof()
+    try:
+        await asyncio.wait_for(_discard(reader), LINGER_SECONDS)
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+
+
+async def _discard(reader: asyncio.StreamReader) -> None:
+    while await reader.read(READ_SIZE):
+        pass
+
+
+async def write_chunk(writer: asyncio.StreamWriter, data: bytes) -> None:
+    """Send one chunk of a chunked response, waiting while the client is slow."""
+    writer.write(f'{len(data):x}\r\n'.encode('latin-1') + data + b'\r\n')
+    await writer.drain()
+
+
+class ConversionService:
+    """
+    HTTP handler converting uploads in a shared pool of worker processes.
+
+    Args:
+        workers: Number of worker processes
+        max_uploads: Uploads converted at once; further uploads get 503
+        batch_bytes: Approximate size of the record batches sent to the workers
+        max_upload_bytes: Reject uploads larger than this (no limit if None)
+    """
+
+    def __init__(self, workers: int = 1, max_uploads: int = 4, batch_bytes: int = UPLOAD_BATCH_BYTES,
+                 max_upload_bytes: Optional[int] = None):
+        self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        self.max_uploads = max_uploads
+        self.batch_bytes = batch_bytes
+        self.max_upload_bytes = max_upload_bytes
+        # Batches in flight per upload; reading pauses when they are all busy
+        self.pipeline_depth = workers * 2
+        self.active = 0
+
+    def close(self) -> None:
+        """Shut down the worker pool."""
+        self.executor.shutdown()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one connection (one request; the connection is closed afterwards)."""
+        peer = writer.get_extra_info('peername')
+        streaming = False
+        try:
+            method, target, headers = await read_request(reader)
+            url = urllib.parse.urlsplit(target)
+            if url.path == '/health':
+                if method != 'GET':
+                    raise HttpError(405, 'Use GET /health')
+                body = json.dumps({'active_uploads': self.active, 'max_uploads': self.max_uploads})
+                await send_response(writer, 200, body.encode('utf-8'), 'application/json')
+                return
+            if url.path != '/convert':
+                raise HttpError(404, f'Unknown path: {url.path}')
+            if method not in ('POST', 'PUT'):
+                raise HttpError(405, 'Upload the SFAF file with POST /convert')
+            query = urllib.parse.parse_qs(url.query)
+            output_format = query.get('format', ['jsonl'])[0]
+            if output_format not in OUTPUT_FORMATS:
+                raise HttpError(400, f'Unknown format: {output_format} (expected csv or jsonl)')
+            if headers.get('transfer-encoding', '').lower() != 'chunked':
+                if 'content-length' not in headers:
+                    raise HttpError(411, 'Content-Length or chunked Transfer-Encoding required')
+                if not headers['content-length'].isdigit():
+                    raise HttpError(400, 'Malformed Content-Length')
+                if self.max_upload_bytes is not None and int(headers['content-length']) > self.max_upload_bytes:
+                    raise HttpError(413, f'Upload larger than {self.max_upload_bytes} bytes')
+            if self.active >= self.max_uploads:
+                raise HttpError(503, f'{self.active} uploads in progress, try again later')
+
+            self.active += 1
+            try:
+                streaming = True
+                await self.convert_upload(reader, writer, headers, output_format, peer)
+            finally:
+                self.active -= 1
+        except HttpError as e:
+            if streaming:
+                logger.error(f"Upload from {peer} failed: {e}")
+            else:
+                logger.warning(f"Rejected request from {peer}: {e.status} {e}")
+                await send_response(writer, e.status, f'{e}\n'.encode('utf-8'))
+                await linger(reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            logger.warning(f"Connection from {peer} lost: {e}")
+        except Exception as e:
+            logger.error(f"Failed to convert upload from {peer}: {e}")
+            if not streaming:
+                await send_response(writer, 500, f'{e}\n'.encode('utf-8'))
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def convert_upload(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                             headers: Dict[str, str], output_format: str, peer) -> None:
+        """Stream the converted records of one upload back to the client."""
+        if headers.get('expect', '').lower() == '100-continue':
+            writer.write(_status_line(100) + b'\r\n')
+        writer.write(_status_line(200))
+        writer.write(f'Content-Type: {OUTPUT_FORMATS[output_format]}\r\nTransfer-Encoding: chunked\r\n'
+                     f'Trailer: X-Records-Processed, X-Records-Skipped\r\nConnection: close\r\n\r\n'
+                     .encode('latin-1'))
+
+        loop = asyncio.get_running_loop()
+        splitter = RecordSplitter(self.batch_bytes)
+        pending = collections.deque()
+        counts = {'processed': 0, 'skipped': 0}
+        diagnostics = Diagnostics()
+        received = 0
+        start = time.perf_counter()
+
+        async def send_oldest():
+            text, batch_counts, batch_diagnostics = await pending.popleft()
+            diagnostics.merge(batch_diagnostics, offset=counts['processed'] + counts['skipped'])
+            for key, value in batch_counts.items():
+                counts[key] = counts.get(key, 0) + value
+            if text:
+                await write_chunk(writer, text.encode('utf-8'))
+
+        try:
+            async for data in iter_body(reader, headers, self.max_upload_bytes):
+                received += len(data)
+                batch = splitter.feed(data)
+                if batch is not None:
+                    pending.append(loop.run_in_executor(self.executor, convert_upload_batch, batch, output_format))
+                    while len(pending) >= self.pipeline_depth:
+                        await send_oldest()
+            batch = splitter.close()
+            if batch:
+                pending.append(loop.run_in_executor(self.executor, convert_upload_batch, batch, output_format))
+            while pending:
+                await send_oldest()
+        finally:
+            for future in pending:
+                future.cancel()
+
+        writer.write(f'0\r\nX-Records-Processed: {counts["processed"]}\r\n'
+                     f'X-Records-Skipped: {counts["skipped"]}\r\n\r\n'.encode('latin-1'))
+        await writer.drain()
+        elapsed = time.perf_counter() - start
+        logger.info(f"Converted upload from {peer}: {received} bytes, {counts['processed']} records processed, "
+                    f"{counts['skipped']} skipped in {elapsed:.2f} s")
+        if diagnostics.counts:
+            logger.info(f"Problems in the records uploaded from {peer}:")
+            diagnostics.log_summary()
+
+
+async def serve(host: str, port: int, service: ConversionService) -> None:
+    """Run the service until cancelled."""
+    server = await asyncio.start_server(service.handle, host, port, limit=MAX_HEADER_BYTES)
+    addresses = ', '.join(str(sock.getsockname()) for sock in server.sockets)
+    logger.info(f"Serving SFAF conversion on {addresses}")
+    async with server:
+        await server.serve_forever()
+
+
+async def upload(host: str, port: int, sfaf_file: str, output_format: str, out) -> Dict[str, str]:
+    """
+    Upload an SFAF file to a running service and write the streamed response.
+
+    The file is sent with chunked transfer encoding while the response is
+    being read, so conversion starts before the upload finishes.
+
+    Args:
+        host: Service host
+        port: Service port
+        sfaf_file: SFAF 1-column file to upload
+        output_format: 'csv' or 'jsonl'
+        out: Binary file the converted records are written to
+
+    Returns:
+        Dictionary of response trailers (lower-case names), with the record counts
+
+    Raises:
+        HttpError: If the service answers with an error status
+    """
+    reader, writer = await asyncio.open_connection(host, port, limit=MAX_HEADER_BYTES)
+
+    async def send_file():
+        writer.write(f'POST /convert?format={output_format} HTTP/1.1\r\nHost: {host}:{port}\r\n'
+                     f'Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n'.encode('latin-1'))
+        with open(sfaf_file, 'rb') as f:
+            while True:
+                data = f.read(READ_SIZE)
+                if not data:
+                    break
+                await write_chunk(writer, data)
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+    sender = asyncio.ensure_future(send_file())
+    try:
+        while True:
+            status_line = await reader.readline()
+            if not status_line:
+                raise ConnectionError('Service closed the connection without a response')
+            status = int(status_line.split()[1])
+            await read_header_lines(reader)
+            if status != 100:
+                break
+        if status != 200:
+            body = await reader.read()
+            raise HttpError(status, body.decode('utf-8', 'replace').strip())
+        while True:
+            size_line = await reader.readline()
+            if not size_line:
+                raise ConnectionError('Response ended before the last chunk')
+            size = int(size_line.split(b';', 1)[0], 16)
+            if size == 0:
+                break
+            out.write(await reader.readexactly(size))
+            await reader.readexactly(2)
+        trailers = await read_header_lines(reader)
+        await sender
+        return trailers
+    finally:
+        sender.cancel()
+        writer.close()
+
+
+async def read_header_lines(reader: asyncio.StreamReader) -> Dict[str, str]:
+    """Read header (or trailer) lines up to the blank line; returns lower-case names."""
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1').strip()
+        if not line:
+            return headers
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Convert SFAF uploads to CSV or JSON Lines over HTTP')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = subparsers.add_parser('serve', help='Run the conversion service')
+    serve_parser.add_argument('--host', default=DEFAULT_HOST, help=f'Address to listen on (default: {DEFAULT_HOST})')
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port (default: {DEFAULT_PORT})')
+    serve_parser.add_argument('-w', '--workers', type=int, default=1,
+                              help='Number of conversion worker processes (default: 1)')
+    serve_parser.add_argument('--max-uploads', type=int, default=4,
+                              help='Uploads converted at once; more are rejected with 503 (default: 4)')
+    serve_parser.add_argument('--max-upload-bytes', type=int, default=None,
+                              help='Reject uploads larger than this many bytes')
+    serve_parser.add_argument('--batch-bytes', type=int, default=UPLOAD_BATCH_BYTES,
+                              help=f'Approximate size of the record batches sent to workers '
+                                   f'(default: {UPLOAD_BATCH_BYTES})')
+
+    client_parser = subparsers.add_parser('client', help='Upload a file to a running service')
+    client_parser.add_argument('sfaf_file', help='SFAF 1-column file to upload')
+    client_parser.add_argument('--host', default=DEFAULT_HOST, help=f'Service host (default: {DEFAULT_HOST})')
+    client_parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Service port (default: {DEFAULT_PORT})')
+    client_parser.add_argument('--format', choices=sorted(OUTPUT_FORMATS), default='jsonl',
+                               help='Output format (default: jsonl)')
+    client_parser.add_argument('-o', '--output', default=None,
+                               help='File to write the converted records to (default: stdout)')
+    args = parser.parse_args(argv)
+    sfaf.configure_logging()
+
+    if args.command == 'serve':
+        if args.workers < 1 or args.max_uploads < 1:
+            parser.error('--workers and --max-uploads must be at least 1')
+        service = ConversionService(args.workers, args.max_uploads, args.batch_bytes, args.max_upload_bytes)
+        try:
+            asyncio.run(serve(args.host, args.port, service))
+        except KeyboardInterrupt:
+            logger.info("Shutting down")
+        finally:
+            service.close()
+        return
+
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        trailers = asyncio.run(upload(args.host, args.port, args.sfaf_file, args.format, out))
+    except (HttpError, OSError) as e:
+        print(f"Error: upload failed: {e}")
+        sys.exit(1)
+    finally:
+        if args.output:
+            out.close()
+    logger.info(f"{trailers.get('x-records-processed', '?')} records processed, "
+                f"{trailers.get('x-records-skipped', '?')} skipped")
+
+
+if __name__ == "__main__":
+    main()
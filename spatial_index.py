@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Spatial index and site overlay cutter for converted SFAF assignments.
+
+Builds a latitude/longitude grid index over the records written by main.py
+(JSON, JSON Lines or a columnar cache) and answers bounding box, radius and
+k-nearest queries. Matching assignments can be written as a CRFS RFeye Site
+CSV overlay in the same 5-column format as main.py.
+
+Records without coordinates (converted to 0/0) are not indexed.
+
+Example:
+    python spatial_index.py records.json --radius 39.6390 22.4191 20 -o larissa_20km.csv
+"""
+import argparse
+import csv
+import math
+import os
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+import main as sfaf
+
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+DEFAULT_CELL_SIZE = 0.25
+
+# Record fields loaded alongside the coordinates, in main.py CSV column order
+OVERLAY_FIELDS = ('latitude', 'longitude', 'center_frequency', 'bandwidth', 'agency_serial')
+# Record fields loaded as float64 arrays; all others keep their JSON values (e.g. serials stay strings)
+NUMERIC_FIELDS = frozenset(name for name, field in sfaf.OUTPUT_FIELDS.items() if field.kind == 'float')
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in km; arguments may be scalars or NumPy arrays.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def load_assignments(path: str, fields: Iterable[str] = OVERLAY_FIELDS) -> Dict[str, np.ndarray]:
+    """
+    Load selected fields of converted records as arrays.
+
+    Args:
+        path: records.json (array or JSON Lines) or a columnar cache directory
+        fields: Record fields to load
+
+    Returns:
+        Dictionary of field name -> array: float64 (NaN where missing) for the
+        NUMERIC_FIELDS, object arrays of the stored values for the others
+    """
+    fields = list(fields)
+    if os.path.isdir(path):
+        import columnar
+
+        columns = columnar.read_columns(path, fields)
+        return {name: np.asarray(values) for name, values in columns.items()}
+
+    from json_to_csv import iter_json_records
+
+    values = {name: [] for name in fields}
+    for record in iter_json_records(path):
+        for name in fields:
+            values[name].append(record.get(name))
+    arrays = {}
+    for name, column in values.items():
+        if name in NUMERIC_FIELDS:
+            arrays[name] = np.array([np.nan if v is None else v for v in column], dtype=float)
+        else:
+            arrays[name] = np.empty(len(column), dtype=object)
+            arrays[name][:] = column
+    return arrays
+
+
+class SpatialIndex:
+    """
+    Uniform latitude/longitude grid over point positions.
+
+    Points are sorted by grid cell, so the points of a run of adjacent cells in
+    one latitude row are a contiguous slice found with two binary searches.
+    Query results are indices into the arrays the index was built from.
+    """
+
+    def __init__(self, latitudes, longitudes, cell_size: float = DEFAULT_CELL_SIZE):
+        """
+        Args:
+            latitudes: Latitudes in decimal degrees
+            longitudes: Longitudes in decimal degrees
+            cell_size: Grid cell size in degrees
+        """
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        located = np.isfinite(latitudes) & np.isfinite(longitudes) & ~((latitudes == 0) & (longitudes == 0))
+
+        self.cell_size = cell_size
+        self.lat_cells = int(math.ceil(180 / cell_size)) + 1
+        self.lon_cells = int(math.ceil(360 / cell_size)) + 1
+        self.size = len(latitudes)
+
+        ids = np.flatnonzero(located)
+        keys = self._cell_rows(latitudes[ids]) * self.lon_cells + self._cell_cols(longitudes[ids])
+        order = np.argsort(keys, kind='stable')
+        self.ids = ids[order]
+        self.keys = keys[order]
+        self.latitudes = latitudes[self.ids]
+        self.longitudes = longitudes[self.ids]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _cell_rows(self, latitudes):
+        return np.clip(np.floor((np.asarray(latitudes) + 90) / self.cell_size), 0, self.lat_cells - 1).astype(np.int64)
+
+    def _cell_cols(self, longitudes):
+        return np.clip(np.floor((np.asarray(longitudes) + 180) / self.cell_size), 0, self.lon_cells - 1).astype(np.int64)
+
+    def _candidates(self, min_lat: float, max_lat: float, lon_ranges: List[Tuple[float, float]]) -> np.ndarray:
+        """Positions (into the sorted arrays) of points in cells overlapping the given box."""
+        row_lo, row_hi = self._cell_rows([min_lat, max_lat])
+        slices = []
+        for lon_lo, lon_hi in lon_ranges:
+            col_lo, col_hi = self._cell_cols([lon_lo, lon_hi])
+            rows = np.arange(row_lo, row_hi + 1, dtype=np.int64) * self.lon_cells
+            starts = np.searchsorted(self.keys, rows + col_lo, side='left')
+            ends = np.searchsorted(self.keys, rows + col_hi, side='right')
+            slices.extend(np.arange(s, e) for s, e in zip(starts, ends) if e > s)
+        if not slices:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(slices)
+
+    @staticmethod
+    def _lon_ranges(min_lon: float, max_lon: float) -> List[Tuple[float, float]]:
+        """Split a longitude interval that crosses the antimeridian."""
+        if max_lon - min_lon >= 360:
+            return [(-180.0, 180.0)]
+        min_lon = (min_lon + 180) % 360 - 180
+        max_lon = (max_lon + 180) % 360 - 180
+        if min_lon <= max_lon:
+            return [(min_lon, max_lon)]
+        return [(min_lon, 180.0), (-180.0, max_lon)]
+
+    def bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> np.ndarray:
+        """
+        Find points inside a bounding box.
+
+        A box with min_lon > max_lon crosses the antimeridian.
+
+        Returns:
+            Sorted array of point indices
+        """
+        ranges = [(min_lon, max_lon)] if min_lon <= max_lon else [(min_lon, 180.0), (-180.0, max_lon)]
+        positions = self._candidates(min_lat, max_lat, ranges)
+        lat = self.latitudes[positions]
+        lon = self.longitudes[positions]
+        inside = (lat >= min_lat) & (lat <= max_lat)
+        if min_lon <= max_lon:
+            inside &= (lon >= min_lon) & (lon <= max_lon)
+        else:
+            inside &= (lon >= min_lon) | (lon <= max_lon)
+        return np.sort(self.ids[positions[inside]])
+
+    def radius(self, lat: float, lon: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find points within a great-circle distance of a position.
+
+        Returns:
+            Tuple of (point indices, distances in km), nearest first
+        """
+        dlat = radius_km / KM_PER_DEGREE
+        min_lat, max_lat = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+        cos_lat = min(math.cos(math.radians(min_lat)), math.cos(math.radians(max_lat)))
+        if min_lat <= -90 or max_lat >= 90 or cos_lat <= 1e-9:
+            ranges = [(-180.0, 180.0)]
+        else:
+            dlon = dlat / cos_lat
+            ranges = self._lon_ranges(lon - dlon, lon + dlon)
+
+        positions = self._candidates(min_lat, max_lat, ranges)
+        distances = haversine_km(lat, lon, self.latitudes[positions], self.longitudes[positions])
+        inside = distances <= radius_km
+        positions, distances = positions[inside], distances[inside]
+        order = np.lexsort((self.ids[positions], distances))
+        return self.ids[positions[order]], distances[order]
+
+    def nearest(self, lat: float, lon: float, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k points nearest to a position.
+
+        Searches growing radii until k points are inside the searched circle.
+
+        Returns:
+            Tuple of (point indices, distances in km), nearest first
+        """
+        if k <= 0 or not len(self):
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        radius_km = self.cell_size * KM_PER_DEGREE
+        max_radius = math.pi * EARTH_RADIUS_KM
+        while True:
+            ids, distances = self.radius(lat, lon, radius_km)
+            if len(ids) >= k or radius_km >= max_radius:
+                return ids[:k], distances[:k]
+            radius_km *= 2
+
+
+def write_overlay(csv_file: str, assignments: Dict[str, np.ndarray], ids: Iterable[int]) -> int:
+    """
+    Write selected assignments as a CRFS overlay CSV (lat, long, center freq, bandwidth, serial).
+
+    Returns:
+        Number of rows written
+    """
+    columns = [assignments[name] for name in OVERLAY_FIELDS]
+    count = 0
+    with open(csv_file, 'w', newline='') as f:
+        writer = csv.writer(f)
+        for i in ids:
+            writer.writerow([column[i].item() if hasattr(column[i], 'item') else column[i] for column in columns])
+            count += 1
+    return count
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description='Query converted SFAF assignments by location and cut CRFS CSV overlays'
+    )
+    parser.add_argument('records', help='records.json, JSON Lines file or columnar cache directory')
+    query = parser.add_mutually_exclusive_group(required=True)
+    query.add_argument('--bbox', nargs=4, type=float, metavar=('MIN_LAT', 'MIN_LON', 'MAX_LAT', 'MAX_LON'),
+                       help='Assignments inside a bounding box')
+    query.add_argument('--radius', nargs=3, type=float, metavar=('LAT', 'LON', 'KM'),
+                       help='Assignments within KM kilometres of a site')
+    query.add_argument('--nearest', nargs=3, type=float, metavar=('LAT', 'LON', 'K'),
+                       help='The K assignments nearest to a site')
+    parser.add_argument('--output', '-o', default=None,
+                       help='Output overlay CSV (default: print serial numbers and distances)')
+    parser.add_argument('--cell-size', type=float, default=DEFAULT_CELL_SIZE,
+                       help=f'Grid cell size in degrees (default: {DEFAULT_CELL_SIZE})')
+    args = parser.parse_args(argv)
+
+    try:
+        assignments = load_assignments(args.records)
+    except FileNotFoundError:
+        print(f"Error: File {args.records} not found")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    index = SpatialIndex(assignments['latitude'], assignments['longitude'], args.cell_size)
+    built = time.perf_counter()
+
+    distances = None
+    if args.bbox:
+        ids = index.bbox(*args.bbox)
+    elif args.radius:
+        ids, distances = index.radius(*args.radius)
+    else:
+        lat, lon, k = args.nearest
+        ids, distances = index.nearest(lat, lon, int(k))
+    queried = time.perf_counter()
+
+    print(f"Indexed {len(index)} of {index.size} assignments in {(built - start) * 1000:.1f} ms, "
+          f"query matched {len(ids)} in {(queried - built) * 1000:.3f} ms")
+
+    if args.output:
+        count = write_overlay(args.output, assignments, ids)
+        print(f"Wrote {count} assignments to {args.output}")
+    else:
+        serials = assignments['agency_serial']
+        for n, i in enumerate(ids):
+            suffix = f"\t{distances[n]:.3f} km" if distances is not None else ''
+            print(f"{serials[i]}{suffix}")
+
+
+if __name__ == "__main__":
+    main()